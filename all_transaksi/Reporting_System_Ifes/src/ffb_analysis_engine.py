@@ -13,13 +13,23 @@ import logging
 
 # Add parent directory to path for firebird_connector
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from firebird_connector import FirebirdConnector
+from firebird_connector import (FirebirdConnector, SnapshotCache, ReferenceCache, QueryResultCache,
+                                MonthPartition, plan_month_partitions, fetch_partitions, DEFAULT_PARTITION_WORKERS)
+from kerani_matching import summarize_kerani
 
 class FFBAnalysisEngine:
     """Engine untuk analisis data FFB scanner"""
 
-    def __init__(self):
+    def __init__(self, snapshot_cache: Optional[SnapshotCache] = None,
+                 reference_cache: Optional[ReferenceCache] = None,
+                 result_cache: Optional[QueryResultCache] = None):
         self.logger = logging.getLogger(__name__)
+        # Snapshot lokal tabel FFBSCANNERDATA: bulan yang sudah dianalisis tidak dibaca ulang dari database
+        self.snapshot_cache = snapshot_cache or SnapshotCache()
+        # Mapping EMP dimuat sekali per database dan dipakai bersama antar estate dan antar run
+        self.reference_cache = reference_cache or ReferenceCache.shared()
+        # Hasil query kecil yang berulang (tes koneksi, dll.) selama engine dipakai
+        self.result_cache = result_cache or QueryResultCache()
 
     def analyze_estate(self, estate_name: str, db_path: str, start_date: date, end_date: date,
                       use_status_704_filter: bool = False) -> Optional[List[Dict]]:
@@ -39,66 +49,72 @@ class FFBAnalysisEngine:
                 self.logger.warning(f"Database not found: {db_path}")
                 return None
 
-            connector = FirebirdConnector(db_path)
-            if not connector.test_connection():
-                return None
+            connector = FirebirdConnector(db_path,
+                                          result_cache=self.result_cache if self.snapshot_cache.enabled else None)
+            # Satu sesi isql per estate: biaya attach database dibayar sekali
+            with connector.session():
+                if not connector.test_connection():
+                    return None
 
-            employee_mapping = self.get_employee_mapping(connector)
-            divisions, month_tables = self.get_divisions(connector, start_date, end_date)
-
-            month_num = start_date.month
-            # Aktif jika rentang menyentuh bulan Mei
-            use_status_704_filter = use_status_704_filter and (start_date.month == 5 or end_date.month == 5)
-
-            if use_status_704_filter:
-                self.logger.info(f"*** FILTER TRANSSTATUS 704 AKTIF untuk {estate_name} bulan {month_num} ***")
-                self.logger.info(f"Menggunakan analisis transaksi real (bukan nilai statis)")
-
-            # Akumulasi per karyawan dari semua divisi
-            estate_employee_totals = {}
-
-            estate_results = []
-            for div_id, div_name in divisions.items():
-                result = self.analyze_division(
-                    connector, estate_name, div_id, div_name,
-                    start_date, end_date, employee_mapping, use_status_704_filter, month_tables
-                )
-                if result:
-                    # Akumulasi per karyawan
-                    for emp_id, emp_data in result['employee_details'].items():
-                        if emp_id not in estate_employee_totals:
-                            estate_employee_totals[emp_id] = {
-                                'name': emp_data['name'],
-                                'kerani': 0,
-                                'kerani_verified': 0,
-                                'kerani_differences': 0,
-                                'mandor': 0,
-                                'asisten': 0
-                            }
-
-                        estate_employee_totals[emp_id]['kerani'] += emp_data['kerani']
-                        estate_employee_totals[emp_id]['kerani_verified'] += emp_data['kerani_verified']
-                        estate_employee_totals[emp_id]['kerani_differences'] += emp_data['kerani_differences']
-                        estate_employee_totals[emp_id]['mandor'] += emp_data['mandor']
-                        estate_employee_totals[emp_id]['asisten'] += emp_data['asisten']
-
-                    estate_results.append(result)
-
-            # Log untuk filter status 704
-            if use_status_704_filter:
-                total_actual_differences = sum(emp_data['kerani_differences'] for emp_data in estate_employee_totals.values())
-                self.logger.info(f"HASIL ANALISIS REAL: {total_actual_differences} total perbedaan ditemukan")
-
-                # Log detail per karyawan
-                for emp_id, emp_data in estate_employee_totals.items():
-                    if emp_data['kerani_differences'] > 0:
-                        user_name = emp_data['name']
-                        differences = emp_data['kerani_differences']
-                        verified = emp_data['kerani_verified']
-                        percentage = (differences / verified * 100) if verified > 0 else 0
-                        self.logger.info(f"    {user_name}: {differences} perbedaan dari {verified} transaksi terverifikasi ({percentage:.1f}%)")
-
-            return estate_results
+                employee_mapping = self.get_employee_mapping(connector)
+                partitions = plan_month_partitions(start_date, end_date)
+                self.logger.info(f"Tabel yang akan di-query: {', '.join(p.table for p in partitions)}")
+                # Satu query per tabel bulan untuk semua divisi; divisi diturunkan dari hasilnya
+                estate_df = self.get_estate_data(connector, partitions)
+
+                month_num = start_date.month
+                # Aktif jika rentang menyentuh bulan Mei
+                use_status_704_filter = use_status_704_filter and (start_date.month == 5 or end_date.month == 5)
+
+                if use_status_704_filter:
+                    self.logger.info(f"*** FILTER TRANSSTATUS 704 AKTIF untuk {estate_name} bulan {month_num} ***")
+                    self.logger.info(f"Menggunakan analisis transaksi real (bukan nilai statis)")
+
+                # Akumulasi per karyawan dari semua divisi
+                estate_employee_totals = {}
+
+                estate_results = []
+                for div_id, div_name, div_df in self.split_divisions(estate_df):
+                    result = self.analyze_division(
+                        estate_name, div_id, div_name, div_df,
+                        employee_mapping, use_status_704_filter
+                    )
+                    if result:
+                        # Akumulasi per karyawan
+                        for emp_id, emp_data in result['employee_details'].items():
+                            if emp_id not in estate_employee_totals:
+                                estate_employee_totals[emp_id] = {
+                                    'name': emp_data['name'],
+                                    'kerani': 0,
+                                    'kerani_verified': 0,
+                                    'kerani_differences': 0,
+                                    'mandor': 0,
+                                    'asisten': 0
+                                }
+
+                            estate_employee_totals[emp_id]['kerani'] += emp_data['kerani']
+                            estate_employee_totals[emp_id]['kerani_verified'] += emp_data['kerani_verified']
+                            estate_employee_totals[emp_id]['kerani_differences'] += emp_data['kerani_differences']
+                            estate_employee_totals[emp_id]['mandor'] += emp_data['mandor']
+                            estate_employee_totals[emp_id]['asisten'] += emp_data['asisten']
+
+                        estate_results.append(result)
+
+                # Log untuk filter status 704
+                if use_status_704_filter:
+                    total_actual_differences = sum(emp_data['kerani_differences'] for emp_data in estate_employee_totals.values())
+                    self.logger.info(f"HASIL ANALISIS REAL: {total_actual_differences} total perbedaan ditemukan")
+
+                    # Log detail per karyawan
+                    for emp_id, emp_data in estate_employee_totals.items():
+                        if emp_data['kerani_differences'] > 0:
+                            user_name = emp_data['name']
+                            differences = emp_data['kerani_differences']
+                            verified = emp_data['kerani_verified']
+                            percentage = (differences / verified * 100) if verified > 0 else 0
+                            self.logger.info(f"    {user_name}: {differences} perbedaan dari {verified} transaksi terverifikasi ({percentage:.1f}%)")
+
+                return estate_results
 
         except Exception as e:
             self.logger.error(f"Error analyzing estate {estate_name}: {e}")
@@ -106,104 +122,66 @@ class FFBAnalysisEngine:
 
     def get_employee_mapping(self, connector: FirebirdConnector) -> Dict[str, str]:
         """Get employee ID to name mapping"""
-        query = "SELECT ID, NAME FROM EMP"
         try:
-            result = connector.execute_query(query)
-            df = connector.to_pandas(result)
-            mapping = {}
-            if not df.empty:
-                for _, row in df.iterrows():
-                    emp_id = str(row.iloc[0]).strip()
-                    emp_name = str(row.iloc[1]).strip()
-                    mapping[emp_id] = emp_name
-            return mapping
+            return self.reference_cache.get(connector, 'employee')
         except Exception as e:
             self.logger.error(f"Error getting employee mapping: {e}")
             return {}
 
-    def get_divisions(self, connector: FirebirdConnector, start_date: date, end_date: date) -> Tuple[Dict[str, str], List[str]]:
-        """Get divisions and monthly tables for date range"""
-        # Generate all month tables within the date range
-        month_tables = []
-        current_date = start_date
-        while current_date <= end_date:
-            month_tables.append(f"FFBSCANNERDATA{current_date.month:02d}")
-            # Move to the next month
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1, day=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1, day=1)
-
-        month_tables = list(set(month_tables))  # Remove duplicates
-        self.logger.info(f"Tabel yang akan di-query: {', '.join(month_tables)}")
-
-        all_divisions = {}
-        for ffb_table in month_tables:
-            query = f"""
-            SELECT DISTINCT b.DIVID, c.DIVNAME
-            FROM {ffb_table} a
-            JOIN OCFIELD b ON a.FIELDID = b.ID
-            LEFT JOIN CRDIVISION c ON b.DIVID = c.ID
-            WHERE b.DIVID IS NOT NULL AND c.DIVNAME IS NOT NULL
-            """
-
-            try:
-                result = connector.execute_query(query)
-                df = connector.to_pandas(result)
-                if not df.empty:
-                    for _, row in df.iterrows():
-                        div_id = str(row.iloc[0]).strip()
-                        div_name = str(row.iloc[1]).strip()
-                        if div_id not in all_divisions:
-                            all_divisions[div_id] = div_name
-            except Exception as e:
-                self.logger.warning(f"Peringatan saat mengambil divisi dari {ffb_table}: {e}")
-                continue
-
-        return all_divisions, month_tables
-
-    def analyze_division(self, connector: FirebirdConnector, estate_name: str, div_id: str, div_name: str,
-                        start_date: date, end_date: date, employee_mapping: Dict[str, str],
-                        use_status_704_filter: bool, month_tables: List[str]) -> Optional[Dict]:
-        """Analyze single division (sama dengan logic asli)"""
-        start_str = start_date.strftime('%Y-%m-%d')
-        end_str = end_date.strftime('%Y-%m-%d')
-
-        all_data_df = pd.DataFrame()
-
-        for ffb_table in month_tables:
-            # Query untuk mendapatkan data granular untuk analisis duplikat
+    def get_estate_data(self, connector: FirebirdConnector, partitions: List[MonthPartition]) -> pd.DataFrame:
+        """Get granular data for all divisions: one query per month partition, including DIVID and DIVNAME"""
+        def fetch(partition):
+            start_str = partition.start.strftime('%Y-%m-%d')
+            end_str = partition.end.strftime('%Y-%m-%d')
+            # Hanya divisi yang terdaftar di CRDIVISION (sama dengan daftar divisi sebelumnya)
             query = f"""
             SELECT a.ID, a.SCANUSERID, a.OCID, a.WORKERID, a.CARRIERID, a.FIELDID, a.TASKNO,
                    a.RIPEBCH, a.UNRIPEBCH, a.BLACKBCH, a.ROTTENBCH, a.LONGSTALKBCH, a.RATDMGBCH,
                    a.LOOSEFRUIT, a.TRANSNO, a.TRANSDATE, a.TRANSTIME, a.UPLOADDATETIME,
                    a.RECORDTAG, a.TRANSSTATUS, a.TRANSTYPE, a.LASTUSER, a.LASTUPDATED,
-                   a.OVERRIPEBCH, a.UNDERRIPEBCH, a.ABNORMALBCH, a.LOOSEFRUIT2
-            FROM {ffb_table} a
+                   a.OVERRIPEBCH, a.UNDERRIPEBCH, a.ABNORMALBCH, a.LOOSEFRUIT2,
+                   b.DIVID, c.DIVNAME
+            FROM {partition.table} a
             JOIN OCFIELD b ON a.FIELDID = b.ID
-            WHERE b.DIVID = '{div_id}'
+            LEFT JOIN CRDIVISION c ON b.DIVID = c.ID
+            WHERE b.DIVID IS NOT NULL AND c.DIVNAME IS NOT NULL
                 AND a.TRANSDATE >= '{start_str}'
                 AND a.TRANSDATE <= '{end_str}'
             """
             try:
-                result = connector.execute_query(query)
-                df_monthly = connector.to_pandas(result)
-                if not df_monthly.empty:
-                    all_data_df = pd.concat([all_data_df, df_monthly], ignore_index=True)
+                return self.snapshot_cache.sync(connector, partition.table, start_str, end_str, query)
             except Exception as e:
-                self.logger.warning(f"Peringatan saat mengambil data dari {ffb_table}: {e}")
-                continue
+                self.logger.warning(f"Peringatan saat mengambil data dari {partition.table}: {e}")
+                return pd.DataFrame()  # Tabel lain tetap diambil jika satu gagal
 
-        df = all_data_df
+        # Sesi isql hanya bisa menjalankan satu query sekaligus
+        workers = DEFAULT_PARTITION_WORKERS if connector.concurrent_safe else 1
+        df = fetch_partitions(partitions, fetch, max_workers=workers)
         if df.empty:
+            return df
+
+        df['DIVID'] = df['DIVID'].astype(str).str.strip()
+        df['DIVNAME'] = df['DIVNAME'].astype(str).str.strip()
+        return df
+
+    def split_divisions(self, estate_df: pd.DataFrame) -> List[Tuple[str, str, pd.DataFrame]]:
+        """Split estate data per division in memory: list of (div_id, div_name, division DataFrame)"""
+        if estate_df.empty:
+            return []
+
+        divisions = []
+        for div_id, div_df in estate_df.groupby('DIVID', sort=True):
+            divisions.append((div_id, div_df['DIVNAME'].iloc[0], div_df))
+        return divisions
+
+    def analyze_division(self, estate_name: str, div_id: str, div_name: str, div_df: pd.DataFrame,
+                        employee_mapping: Dict[str, str], use_status_704_filter: bool) -> Optional[Dict]:
+        """Analyze single division (sama dengan logic asli)"""
+        if div_df.empty:
             return None
 
         # Hapus duplikat jika ada data yang tumpang tindih
-        df.drop_duplicates(subset=['ID'], inplace=True)
-
-        # Logika dari analisis_perbedaan_panen.py: cari duplikat berdasarkan TRANSNO
-        duplicated_rows = df[df.duplicated(subset=['TRANSNO'], keep=False)]
-        verified_transnos = set(duplicated_rows['TRANSNO'].tolist())
+        df = div_df.drop_duplicates(subset=['ID'])
 
         employee_details = {}
 
@@ -221,64 +199,11 @@ class FFBAnalysisEngine:
             }
 
         # Hitung data Kerani berdasarkan duplikat dan perbedaan input
-        kerani_df = df[df['RECORDTAG'] == 'PM']
-        if not kerani_df.empty:
-            for user_id, group in kerani_df.groupby('SCANUSERID'):
-                user_id_str = str(user_id).strip()
-                total_created = len(group)
-
-                # Hitung jumlah perbedaan input untuk transaksi yang terverifikasi
-                differences_count = 0
-                for _, kerani_row in group.iterrows():
-                    if kerani_row['TRANSNO'] in verified_transnos:
-                        # Cari transaksi dengan TRANSNO yang sama tapi RECORDTAG berbeda
-                        matching_transactions = df[(df['TRANSNO'] == kerani_row['TRANSNO']) &
-                                                  (df['RECORDTAG'] != 'PM')]
-
-                        # FILTER KHUSUS: Untuk bulan Mei, hanya hitung perbedaan jika
-                        # Mandor/Asisten memiliki TRANSSTATUS = 704
-                        if use_status_704_filter:
-                            matching_transactions = matching_transactions[matching_transactions['TRANSSTATUS'] == '704']
-
-                        if not matching_transactions.empty:
-                            # Prioritaskan P1 (Asisten) jika ada, jika tidak gunakan P5 (Mandor)
-                            p1_records = matching_transactions[matching_transactions['RECORDTAG'] == 'P1']
-                            p5_records = matching_transactions[matching_transactions['RECORDTAG'] == 'P5']
-
-                            if not p1_records.empty:
-                                other_row = p1_records.iloc[0]
-                            elif not p5_records.empty:
-                                other_row = p5_records.iloc[0]
-                            else:
-                                continue
-
-                            # Hitung perbedaan untuk setiap field
-                            fields_to_compare = ['RIPEBCH', 'UNRIPEBCH', 'BLACKBCH', 'ROTTENBCH',
-                                               'LONGSTALKBCH', 'RATDMGBCH', 'LOOSEFRUIT']
-
-                            # Count as 1 transaction difference if ANY field differs
-                            has_difference = False
-                            for field in fields_to_compare:
-                                try:
-                                    kerani_val = float(kerani_row[field]) if kerani_row[field] else 0
-                                    other_val = float(other_row[field]) if other_row[field] else 0
-                                    if kerani_val != other_val:
-                                        has_difference = True
-                                        break
-                                except (ValueError, TypeError):
-                                    continue
-
-                            # Count as 1 transaction difference if any field differs
-                            if has_difference:
-                                differences_count += 1
-
-                # Hitung persentase terverifikasi
-                verified_count = len(group[group['TRANSNO'].isin(verified_transnos)])
-
-                if user_id_str in employee_details:
-                    employee_details[user_id_str]['kerani'] = total_created
-                    employee_details[user_id_str]['kerani_verified'] = verified_count
-                    employee_details[user_id_str]['kerani_differences'] = differences_count
+        # Verifikator dicari lewat index TRANSNO (P1 diprioritaskan atas P5); dengan filter 704
+        # hanya Mandor/Asisten ber-TRANSSTATUS 704 yang dihitung (Kerani bisa 731/732/704)
+        for user_id_str, kerani_stats in summarize_kerani(df, use_status_704_filter).items():
+            if user_id_str in employee_details:
+                employee_details[user_id_str].update(kerani_stats)
 
         # Hitung data Mandor
         mandor_df = df[df['RECORDTAG'] == 'P1']
@@ -11,6 +11,7 @@ import os
 import sys
 from datetime import datetime, date
 import threading
+import queue
 import json
 import logging
 from typing import Dict, List, Any
@@ -29,6 +30,7 @@ if grandparent_dir not in sys.path:
 from template_manager import TemplateManager
 from report_generator import ReportGenerator
 from ffb_analysis_engine import FFBAnalysisEngine
+from estate_pool import run_estates, DEFAULT_MAX_WORKERS, WORKER_MODES
 
 class FFBReportingSystemGUI:
     """Main GUI untuk sistem laporan FFB dengan template manager"""
@@ -71,9 +73,13 @@ class FFBReportingSystemGUI:
         self.estates = self.load_config()
         self.current_template = None
 
+        # Pembaruan UI dari thread worker dikirim lewat antrian ini dan dijalankan di thread Tk
+        self.ui_queue = queue.Queue()
+
         # Setup UI
         self.setup_ui()
         self.load_templates()
+        self.root.after(100, self.process_ui_queue)
 
     def load_config(self) -> Dict[str, str]:
         """Load konfigurasi estates dari file JSON"""
@@ -197,6 +203,17 @@ class FFBReportingSystemGUI:
         self.end_date = DateEntry(date_frame, width=20, background='darkblue', foreground='white')
         self.end_date.grid(row=0, column=3, padx=(10, 0), pady=5)
 
+        ttk.Label(date_frame, text="Estate Paralel:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.max_workers_var = tk.IntVar(value=DEFAULT_MAX_WORKERS)
+        ttk.Spinbox(date_frame, from_=1, to=32, width=5, textvariable=self.max_workers_var).grid(row=1, column=1, sticky=tk.W, padx=(10, 20), pady=5)
+
+        ttk.Label(date_frame, text="Mode Worker:").grid(row=1, column=2, sticky=tk.W, pady=5)
+        self.worker_mode_var = tk.StringVar(value=WORKER_MODES[0])
+        ttk.Combobox(date_frame, textvariable=self.worker_mode_var, values=WORKER_MODES, width=10, state='readonly').grid(row=1, column=3, sticky=tk.W, padx=(10, 0), pady=5)
+
+        self.use_cache_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(date_frame, text="Gunakan cache snapshot dan data referensi", variable=self.use_cache_var).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=5)
+
         # Set default dates
         self.start_date.set_date(date(2025, 5, 1))
         self.end_date.set_date(date(2025, 5, 31))
@@ -487,67 +504,72 @@ Dibuat: {self.current_template.get('created_date', 'Unknown')}
             messagebox.showerror("Error Tanggal", "Tanggal mulai tidak boleh lebih besar dari tanggal akhir.")
             return
 
+        # Baca semua input widget di thread Tk; thread worker tidak menyentuh widget
+        selected_estates = []
+        for item_id in selected_indices:
+            values = self.estate_tree.item(item_id, 'values')
+            selected_estates.append((values[0], values[1]))
+
+        # Get parameter values
+        parameters = {
+            'START_DATE': start_date,
+            'END_DATE': end_date,
+            'ESTATES': [estate[0] for estate in selected_estates]
+        }
+
+        # Add template parameters
+        if hasattr(self, 'param_vars'):
+            for param_name, var in self.param_vars.items():
+                if hasattr(var, 'get'):
+                    parameters[param_name] = var.get()
+
+        try:
+            max_workers = max(1, int(self.max_workers_var.get()))
+        except (tk.TclError, ValueError):
+            max_workers = DEFAULT_MAX_WORKERS
+        worker_mode = self.worker_mode_var.get() or WORKER_MODES[0]
+        self.analysis_engine.snapshot_cache.enabled = self.use_cache_var.get()
+        self.analysis_engine.reference_cache.enabled = self.use_cache_var.get()
+
         # Start analysis in thread
-        thread = threading.Thread(target=self.run_analysis)
+        thread = threading.Thread(target=self.run_analysis,
+                                  args=(selected_estates, parameters, max_workers, worker_mode))
         thread.daemon = True
         thread.start()
 
-    def run_analysis(self):
+    def run_analysis(self, selected_estates: List[tuple], parameters: Dict[str, Any],
+                     max_workers: int = DEFAULT_MAX_WORKERS, worker_mode: str = 'thread'):
         """Run analysis and generate report"""
         try:
-            selected_items = self.estate_tree.selection()
-            selected_estates = []
-            for item_id in selected_items:
-                values = self.estate_tree.item(item_id, 'values')
-                estate_name = values[0]
-                db_path = values[1]
-                selected_estates.append((estate_name, db_path))
-
-            if not selected_estates:
-                messagebox.showerror("Error", "Silakan pilih minimal satu estate dari daftar.")
-                return
-
-            start_date = self.start_date.get_date()
-            end_date = self.end_date.get_date()
-
-            # Get parameter values
-            parameters = {
-                'START_DATE': start_date,
-                'END_DATE': end_date,
-                'ESTATES': [estate[0] for estate in selected_estates]
-            }
-
-            # Add template parameters
-            if hasattr(self, 'param_vars'):
-                for param_name, var in self.param_vars.items():
-                    if hasattr(var, 'get'):
-                        parameters[param_name] = var.get()
+            start_date = parameters['START_DATE']
+            end_date = parameters['END_DATE']
 
             self.log_message("=== GENERATING REPORT ===")
             self.log_message(f"Template: {self.current_template['name']}")
             self.log_message(f"Periode: {start_date.strftime('%d %B %Y')} - {end_date.strftime('%d %B %Y')}")
-            self.log_message(f"Jumlah Estate: {len(selected_estates)}")
+            self.log_message(f"Jumlah Estate: {len(selected_estates)} "
+                             f"({min(max_workers, len(selected_estates))} paralel, mode {worker_mode})")
 
-            self.progress_bar['maximum'] = len(selected_estates)
-            all_results = []
+            self.call_in_ui(self.reset_progress, len(selected_estates))
 
-            for i, (estate_name, db_path) in enumerate(selected_estates):
-                self.progress_var.set(f"Menganalisis {estate_name}")
-                self.progress_bar['value'] = i
-                self.root.update_idletasks()
+            # Estate dianalisis bersamaan; hasil dikembalikan sesuai urutan pilihan agar PDF deterministik
+            use_status_704_filter = parameters.get('USE_STATUS_704_FILTER', False)
+            estate_results_list = run_estates(
+                selected_estates, self.analysis_engine.analyze_estate,
+                args=(start_date, end_date, use_status_704_filter),
+                max_workers=max_workers, mode=worker_mode,
+                on_event=lambda event: self.call_in_ui(self.on_estate_event, event)
+            )
 
-                try:
-                    use_status_704_filter = parameters.get('USE_STATUS_704_FILTER', False)
-                    estate_results = self.analysis_engine.analyze_estate(
-                        estate_name, db_path, start_date, end_date, use_status_704_filter
-                    )
-                    if estate_results:
-                        all_results.extend(estate_results)
-                        self.log_message(f"{estate_name}: {len(estate_results)} divisi")
-                    else:
-                        self.log_message(f"{estate_name}: Tidak ada data")
-                except Exception as e:
-                    self.log_message(f"{estate_name}: {str(e)}")
+            all_results = []
+            for estate_results in estate_results_list:
+                if estate_results:
+                    all_results.extend(estate_results)
+
+            result_stats = self.analysis_engine.result_cache.stats()
+            if result_stats['hits']:
+                self.log_message(f"Cache hasil query: {result_stats['hits']} hit, {result_stats['misses']} miss, "
+                                 f"{result_stats['evictions']} dibuang (total sesi)")
 
             if all_results:
                 self.log_message("Generating PDF report...")
@@ -555,23 +577,69 @@ Dibuat: {self.current_template.get('created_date', 'Unknown')}
                     self.current_template, all_results, parameters
                 )
                 self.log_message(f"Laporan PDF: {pdf_path}")
-                messagebox.showinfo("Sukses", f"Laporan berhasil digenerate!\n\nFile: {pdf_path}")
+                self.call_in_ui(messagebox.showinfo, "Sukses", f"Laporan berhasil digenerate!\n\nFile: {pdf_path}")
             else:
                 self.log_message("Tidak ada data untuk di-generate")
-                messagebox.showwarning("Warning", "Tidak ada data yang dapat diproses untuk laporan.")
+                self.call_in_ui(messagebox.showwarning, "Warning", "Tidak ada data yang dapat diproses untuk laporan.")
 
-            self.progress_var.set("Analisis selesai")
+            self.call_in_ui(self.progress_var.set, "Analisis selesai")
 
         except Exception as e:
             self.log_message(f"ERROR: {str(e)}")
-            messagebox.showerror("Error", f"Terjadi error saat generate laporan:\n\n{str(e)}")
+            self.call_in_ui(messagebox.showerror, "Error", f"Terjadi error saat generate laporan:\n\n{str(e)}")
+
+    def reset_progress(self, total: int):
+        """Reset progress bar untuk sejumlah estate"""
+        self.progress_bar['maximum'] = total
+        self.progress_bar['value'] = 0
+
+    def on_estate_event(self, event: Dict[str, Any]):
+        """Perbarui progress dan log untuk event dari estate_pool (dijalankan di thread Tk)"""
+        estate_name = event['estate']
+        if event['type'] == 'started':
+            self.progress_var.set(f"Menganalisis {estate_name}")
+            return
+
+        self.progress_bar['value'] = event['completed']
+        self.progress_var.set(f"Selesai {event['completed']}/{event['total']} estate")
+        if event['type'] == 'failed':
+            self.log_message(f"{estate_name}: {str(event['error'])}")
+        elif event['result']:
+            self.log_message(f"{estate_name}: {len(event['result'])} divisi")
+        else:
+            self.log_message(f"{estate_name}: Tidak ada data")
 
     def log_message(self, message):
-        """Log message ke log widget"""
+        """Log message ke log widget (aman dipanggil dari thread worker)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+        self.call_in_ui(self._append_log, f"[{timestamp}] {message}\n")
+
+    def _append_log(self, line: str):
+        self.log_text.insert(tk.END, line)
         self.log_text.see(tk.END)
-        self.root.update_idletasks()
+
+    def call_in_ui(self, func, *args):
+        """Jalankan func di thread Tk; panggilan dari thread worker diantrikan ke ui_queue"""
+        if threading.current_thread() is threading.main_thread():
+            func(*args)
+        else:
+            self.ui_queue.put((func, args))
+
+    def process_ui_queue(self):
+        """Jalankan pembaruan UI yang diantrikan thread worker, dijadwalkan ulang tiap 100 ms"""
+        try:
+            while True:
+                try:
+                    func, args = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                # Pembaruan yang gagal tidak menghentikan pembaruan berikutnya
+                try:
+                    func(*args)
+                except Exception as e:
+                    self.logger.exception(f"Pembaruan UI {getattr(func, '__name__', func)} gagal: {e}")
+        finally:
+            self.root.after(100, self.process_ui_queue)
 
     def clear_log(self):
         self.log_text.delete(1.0, tk.END)
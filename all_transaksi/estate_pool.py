@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Eksekusi analisis multi-estate secara paralel
+Setiap estate adalah file .FDB terpisah, sehingga analisisnya saling independen
+Dipakai bersama oleh gui_multi_estate_ffb_analysis.py dan Reporting_System_Ifes
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Jumlah estate yang dianalisis bersamaan jika tidak ditentukan
+DEFAULT_MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+# Jenis executor yang didukung
+WORKER_MODES = ('thread', 'process')
+
+
+def _run_estate(analyze: Callable, estate_name: str, db_path: str, args: tuple,
+                index: int, total: int, on_event: Optional[Callable]) -> Any:
+    """Jalankan satu estate di thread worker, kirim event 'started' saat mulai dikerjakan"""
+    if on_event:
+        on_event({'type': 'started', 'estate': estate_name, 'index': index, 'completed': None, 'total': total})
+    return analyze(estate_name, db_path, *args)
+
+
+def run_estates(estates: Sequence[Tuple[str, str]], analyze: Callable, args: tuple = (),
+                max_workers: Optional[int] = None, mode: str = 'thread',
+                on_event: Optional[Callable[[Dict], None]] = None) -> List[Any]:
+    """
+    Jalankan analyze(estate_name, db_path, *args) untuk setiap estate dengan worker pool terbatas.
+
+    Event progress dikirim lewat on_event dari thread pemanggil maupun thread worker, sehingga
+    on_event harus thread-safe (misalnya memasukkan event ke queue.Queue yang dibaca thread Tk).
+    Event berupa dict dengan kunci 'type' ('started', 'finished', 'failed'), 'estate', 'index',
+    'completed', 'total', dan 'result' atau 'error'.
+
+    Args:
+        estates: Daftar (estate_name, db_path)
+        analyze: Fungsi analisis per estate; pada mode 'process' harus bisa di-pickle
+        args: Argumen tambahan untuk analyze (misalnya start_date, end_date)
+        max_workers: Jumlah estate yang dianalisis bersamaan (default: DEFAULT_MAX_WORKERS)
+        mode: 'thread' (default) atau 'process'
+        on_event: Callback event progress (opsional)
+
+    Returns:
+        Hasil analyze per estate dengan urutan sama seperti estates (None jika gagal)
+    """
+    if mode not in WORKER_MODES:
+        raise ValueError(f"Mode worker tidak dikenal: {mode} (pilihan: {', '.join(WORKER_MODES)})")
+
+    total = len(estates)
+    results = [None] * total
+    if not total:
+        return results
+
+    workers = max(1, min(max_workers or DEFAULT_MAX_WORKERS, total))
+    executor_class = ProcessPoolExecutor if mode == 'process' else ThreadPoolExecutor
+
+    with executor_class(max_workers=workers) as executor:
+        futures = {}
+        for index, (estate_name, db_path) in enumerate(estates):
+            if mode == 'process':
+                # Callback tidak bisa dikirim ke proses lain: 'started' dikirim saat estate masuk antrian
+                if on_event:
+                    on_event({'type': 'started', 'estate': estate_name, 'index': index,
+                              'completed': None, 'total': total})
+                future = executor.submit(analyze, estate_name, db_path, *args)
+            else:
+                future = executor.submit(_run_estate, analyze, estate_name, db_path, args,
+                                         index, total, on_event)
+            futures[future] = (index, estate_name)
+
+        completed = 0
+        for future in as_completed(futures):
+            index, estate_name = futures[future]
+            completed += 1
+            event = {'type': 'finished', 'estate': estate_name, 'index': index,
+                     'completed': completed, 'total': total}
+            try:
+                results[index] = future.result()
+                event['result'] = results[index]
+            except Exception as e:
+                event['type'] = 'failed'
+                event['error'] = e
+            if on_event:
+                on_event(event)
+
+    return results
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Pencocokan transaksi Kerani dengan transaksi verifikasi (Asisten/Mandor)
+Dipakai bersama oleh gui_multi_estate_ffb_analysis.py dan Reporting_System_Ifes
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# Kolom jumlah janjang yang dibandingkan antara Kerani dan verifikator
+BUNCH_COLUMNS = ['RIPEBCH', 'UNRIPEBCH', 'BLACKBCH', 'ROTTENBCH',
+                 'LONGSTALKBCH', 'RATDMGBCH', 'LOOSEFRUIT']
+
+# RECORDTAG verifikator berdasarkan prioritas: P1 (Asisten) lebih dulu, lalu P5 (Mandor)
+VERIFIER_TAGS = ['P1', 'P5']
+
+
+def status_704_mask(df: pd.DataFrame) -> pd.Series:
+    """Mask baris dengan TRANSSTATUS 704 (nilai angka maupun teks)"""
+    return df['TRANSSTATUS'].astype(str).str.strip() == '704'
+
+
+def build_verifier_index(df: pd.DataFrame, use_status_704_filter: bool = False) -> pd.DataFrame:
+    """
+    Index TRANSNO -> baris verifikator, dibangun sekali untuk seluruh divisi.
+
+    Untuk setiap TRANSNO dipilih record P1 pertama, atau record P5 pertama jika tidak ada P1.
+    Dengan use_status_704_filter hanya verifikator dengan TRANSSTATUS 704 yang dipakai.
+
+    Args:
+        df: Data FFBSCANNERDATA satu divisi
+        use_status_704_filter: Hanya pakai verifikator dengan TRANSSTATUS 704
+
+    Returns:
+        DataFrame kolom BUNCH_COLUMNS + RECORDTAG dengan index TRANSNO (unik)
+    """
+    tags = df['RECORDTAG']
+    mask = tags.isin(VERIFIER_TAGS) & df['TRANSNO'].notna()
+    if use_status_704_filter:
+        mask &= status_704_mask(df)
+
+    verifiers = df.loc[mask, ['TRANSNO', 'RECORDTAG'] + BUNCH_COLUMNS]
+    priority = verifiers['RECORDTAG'].map({tag: rank for rank, tag in enumerate(VERIFIER_TAGS)})
+    order = np.argsort(priority.to_numpy(), kind='stable')
+    verifiers = verifiers.iloc[order].drop_duplicates(subset=['TRANSNO'], keep='first')
+    return verifiers.set_index('TRANSNO')
+
+
+def _bunch_values(frame: pd.DataFrame) -> tuple:
+    """
+    Nilai janjang sebagai angka: kosong (NULL/'') dianggap 0.
+
+    Returns:
+        tuple: (array nilai float, array bool nilai yang tidak bisa dibaca sebagai angka)
+    """
+    values = frame.apply(pd.to_numeric, errors='coerce')
+    missing = frame.isna() | frame.astype(str).apply(lambda col: col.str.strip() == '')
+    invalid = values.isna() & ~missing
+    return values.fillna(0).to_numpy(dtype=float), invalid.to_numpy()
+
+
+def match_kerani_transactions(df: pd.DataFrame, use_status_704_filter: bool = False) -> pd.DataFrame:
+    """
+    Pasangkan setiap transaksi Kerani (PM) dengan verifikatornya dan tandai perbedaan input.
+
+    Args:
+        df: Data FFBSCANNERDATA satu divisi
+        use_status_704_filter: Hanya pakai verifikator dengan TRANSSTATUS 704
+
+    Returns:
+        DataFrame baris PM dengan kolom SCANUSERID, TRANSNO, VERIFIED (TRANSNO muncul lebih
+        dari sekali), MATCHED (ada verifikator) dan HAS_DIFFERENCE (salah satu kolom
+        BUNCH_COLUMNS berbeda dengan verifikator)
+    """
+    verified = df['TRANSNO'].duplicated(keep=False)
+    is_kerani = df['RECORDTAG'] == 'PM'
+
+    kerani = df.loc[is_kerani, ['SCANUSERID', 'TRANSNO'] + BUNCH_COLUMNS]
+    verifier_index = build_verifier_index(df, use_status_704_filter)
+
+    # Lookup hash TRANSNO -> posisi verifikator, satu kali untuk semua baris PM
+    positions = verifier_index.index.get_indexer(kerani['TRANSNO'])
+    matched = positions >= 0
+
+    kerani_values, kerani_invalid = _bunch_values(kerani[BUNCH_COLUMNS])
+    verifier_values, verifier_invalid = _bunch_values(verifier_index[BUNCH_COLUMNS])
+    other_values = np.zeros_like(kerani_values)
+    other_invalid = np.zeros_like(kerani_invalid)
+    other_values[matched] = verifier_values[positions[matched]]
+    other_invalid[matched] = verifier_invalid[positions[matched]]
+
+    # Nilai yang tidak bisa dibaca sebagai angka dilewati, sama seperti perbandingan per field
+    differs = (kerani_values != other_values) & ~(kerani_invalid | other_invalid)
+
+    result = kerani[['SCANUSERID', 'TRANSNO']].copy()
+    result['VERIFIED'] = verified[is_kerani].to_numpy()
+    result['MATCHED'] = matched
+    result['HAS_DIFFERENCE'] = matched & differs.any(axis=1)
+    return result
+
+
+def summarize_kerani(df: pd.DataFrame, use_status_704_filter: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Hitung statistik per Kerani: jumlah transaksi, yang terverifikasi, dan yang berbeda.
+
+    Args:
+        df: Data FFBSCANNERDATA satu divisi
+        use_status_704_filter: Hanya hitung perbedaan terhadap verifikator dengan TRANSSTATUS 704
+
+    Returns:
+        Dict SCANUSERID -> {'kerani', 'kerani_verified', 'kerani_differences'}
+    """
+    matches = match_kerani_transactions(df, use_status_704_filter)
+    counts = matches.groupby('SCANUSERID')[['VERIFIED', 'HAS_DIFFERENCE']].agg(['size', 'sum'])
+
+    summary = {}
+    for user_id, row in counts.iterrows():
+        summary[str(user_id).strip()] = {
+            'kerani': int(row[('VERIFIED', 'size')]),
+            'kerani_verified': int(row[('VERIFIED', 'sum')]),
+            'kerani_differences': int(row[('HAS_DIFFERENCE', 'sum')]),
+        }
+    return summary
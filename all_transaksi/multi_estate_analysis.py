@@ -0,0 +1,677 @@
+#!/usr/bin/env python3
+"""
+Analisis multi-estate FFB Scanner dan laporan PDF kinerja Kerani, Mandor, dan Asisten
+Tidak bergantung pada tkinter: dipakai bersama oleh gui_multi_estate_ffb_analysis.py dan multi_estate_cli.py
+"""
+
+import logging
+import os
+from datetime import datetime
+
+import pandas as pd
+from firebird_connector import (FirebirdConnector, SnapshotCache, ReferenceCache, QueryResultCache,
+                                plan_month_partitions, fetch_partitions, DEFAULT_PARTITION_WORKERS)
+from kerani_matching import summarize_kerani
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+
+
+class MultiEstateAnalysis:
+    """Pipeline analisis per estate dan pembuatan PDF; log_message dapat di-override (mis. oleh GUI)"""
+
+    def __init__(self, output_dir="reports"):
+        self.output_dir = output_dir
+        self.logger = logging.getLogger(__name__)
+        
+        # Snapshot lokal tabel FFBSCANNERDATA: bulan yang sudah dianalisis tidak dibaca ulang dari database
+        self.snapshot_cache = SnapshotCache()
+        # Mapping EMP dimuat sekali per database dan dipakai bersama antar estate dan antar run
+        self.reference_cache = ReferenceCache.shared()
+        # Hasil query kecil yang berulang (tes koneksi, dll.) selama aplikasi berjalan
+        self.result_cache = QueryResultCache()
+    
+    def analyze_estate(self, estate_name, db_path, start_date, end_date):
+        # Handle path that is a folder (like PGE 2A)
+        if os.path.isdir(db_path):
+            # Look for .FDB file in the folder
+            for file in os.listdir(db_path):
+                if file.upper().endswith('.FDB'):
+                    db_path = os.path.join(db_path, file)
+                    break
+            else:
+                self.log_message(f"  No .FDB file found in {db_path}")
+                return None
+        
+        if not os.path.exists(db_path):
+            self.log_message(f"  Database not found: {db_path}")
+            return None
+        
+        try:
+            connector = FirebirdConnector(db_path, result_cache=self.result_cache if self.snapshot_cache.enabled else None)
+            # Satu sesi isql per estate: biaya attach database dibayar sekali
+            with connector.session():
+                if not connector.test_connection():
+                    return None
+            
+                employee_mapping = self.get_employee_mapping(connector)
+                partitions = plan_month_partitions(start_date, end_date)
+                self.log_message(f"  Tabel yang akan di-query: {', '.join(p.table for p in partitions)}")
+                # Satu query per tabel bulan untuk semua divisi; divisi diturunkan dari hasilnya
+                estate_df = self.get_estate_data(connector, partitions)
+            
+                month_num = start_date.month
+                use_status_704_filter = (start_date.month == 5 or end_date.month == 5) # Aktif jika rentang menyentuh bulan Mei
+            
+                # REMOVED STATIC TARGET VALUES - Now using pure transaction-by-transaction analysis
+                if use_status_704_filter:
+                    self.log_message(f"  *** FILTER TRANSSTATUS 704 AKTIF untuk {estate_name} bulan {month_num} ***")
+                    self.log_message(f"  Menggunakan analisis transaksi real (bukan nilai statis)")
+            
+                # Akumulasi per karyawan dari semua divisi
+                estate_employee_totals = {}
+            
+                estate_results = []
+                for div_id, div_name, div_df in self.split_divisions(estate_df):
+                    result = self.analyze_division(estate_name, div_id, div_name, div_df,
+                                                 employee_mapping, use_status_704_filter)
+                    if result:
+                        # Akumulasi per karyawan
+                        for emp_id, emp_data in result['employee_details'].items():
+                            if emp_id not in estate_employee_totals:
+                                estate_employee_totals[emp_id] = {
+                                    'name': emp_data['name'],
+                                    'kerani': 0,
+                                    'kerani_verified': 0,
+                                    'kerani_differences': 0,
+                                    'mandor': 0,
+                                    'asisten': 0
+                                }
+                        
+                            estate_employee_totals[emp_id]['kerani'] += emp_data['kerani']
+                            estate_employee_totals[emp_id]['kerani_verified'] += emp_data['kerani_verified']
+                            estate_employee_totals[emp_id]['kerani_differences'] += emp_data['kerani_differences']
+                            estate_employee_totals[emp_id]['mandor'] += emp_data['mandor']
+                            estate_employee_totals[emp_id]['asisten'] += emp_data['asisten']
+                    
+                        estate_results.append(result)
+            
+                # NO STATIC ADJUSTMENTS - Using pure transaction-by-transaction analysis results
+                if use_status_704_filter:
+                    total_actual_differences = sum(emp_data['kerani_differences'] for emp_data in estate_employee_totals.values())
+                    self.log_message(f"  HASIL ANALISIS REAL: {total_actual_differences} total perbedaan ditemukan")
+                
+                    # Log detail per karyawan untuk transparansi
+                    for emp_id, emp_data in estate_employee_totals.items():
+                        if emp_data['kerani_differences'] > 0:
+                            user_name = emp_data['name']
+                            differences = emp_data['kerani_differences']
+                            verified = emp_data['kerani_verified']
+                            percentage = (differences / verified * 100) if verified > 0 else 0
+                            self.log_message(f"    {user_name}: {differences} perbedaan dari {verified} transaksi terverifikasi ({percentage:.1f}%)")
+            
+                return estate_results
+            
+        except Exception as e:
+            self.log_message(f"  Error analyzing estate {estate_name}: {e}")
+            return None
+    
+    def get_employee_mapping(self, connector):
+        try:
+            return self.reference_cache.get(connector, 'employee')
+        except Exception:
+            return {}
+    
+    # REMOVED: get_employee_key_for_target function no longer needed
+    # Now using pure transaction-by-transaction analysis without static targets
+    
+    def get_estate_data(self, connector, partitions):
+        """Data granular semua divisi estate: satu query per tabel bulan (lihat plan_month_partitions), termasuk DIVID dan DIVNAME."""
+        def fetch(partition):
+            start_str = partition.start.strftime('%Y-%m-%d')
+            end_str = partition.end.strftime('%Y-%m-%d')
+            # Hanya divisi yang terdaftar di CRDIVISION (sama dengan daftar divisi sebelumnya)
+            query = f"""
+            SELECT a.ID, a.SCANUSERID, a.OCID, a.WORKERID, a.CARRIERID, a.FIELDID, a.TASKNO,
+                   a.RIPEBCH, a.UNRIPEBCH, a.BLACKBCH, a.ROTTENBCH, a.LONGSTALKBCH, a.RATDMGBCH,
+                   a.LOOSEFRUIT, a.TRANSNO, a.TRANSDATE, a.TRANSTIME, a.UPLOADDATETIME,
+                   a.RECORDTAG, a.TRANSSTATUS, a.TRANSTYPE, a.LASTUSER, a.LASTUPDATED,
+                   a.OVERRIPEBCH, a.UNDERRIPEBCH, a.ABNORMALBCH, a.LOOSEFRUIT2,
+                   b.DIVID, c.DIVNAME
+            FROM {partition.table} a
+            JOIN OCFIELD b ON a.FIELDID = b.ID
+            LEFT JOIN CRDIVISION c ON b.DIVID = c.ID
+            WHERE b.DIVID IS NOT NULL AND c.DIVNAME IS NOT NULL
+                AND a.TRANSDATE >= '{start_str}' 
+                AND a.TRANSDATE <= '{end_str}'
+            """
+            try:
+                return self.snapshot_cache.sync(connector, partition.table, start_str, end_str, query)
+            except Exception as e:
+                self.log_message(f"  Peringatan saat mengambil data dari {partition.table}: {e}")
+                return pd.DataFrame()  # Tabel lain tetap diambil jika satu gagal
+
+        # Sesi isql hanya bisa menjalankan satu query sekaligus
+        workers = DEFAULT_PARTITION_WORKERS if connector.concurrent_safe else 1
+        df = fetch_partitions(partitions, fetch, max_workers=workers)
+        if df.empty:
+            return df
+
+        df['DIVID'] = df['DIVID'].astype(str).str.strip()
+        df['DIVNAME'] = df['DIVNAME'].astype(str).str.strip()
+        return df
+
+    def split_divisions(self, estate_df):
+        """Pecah data estate per divisi di memori: list (div_id, div_name, DataFrame divisi)."""
+        if estate_df.empty:
+            return []
+        
+        divisions = []
+        for div_id, div_df in estate_df.groupby('DIVID', sort=True):
+            divisions.append((div_id, div_df['DIVNAME'].iloc[0], div_df))
+        return divisions
+
+    def analyze_division(self, estate_name, div_id, div_name, div_df, employee_mapping, use_status_704_filter):
+        if div_df.empty:
+            return None
+        
+        # Hapus duplikat jika ada data yang tumpang tindih
+        df = div_df.drop_duplicates(subset=['ID'])
+        
+        employee_details = {}
+        
+        # Inisialisasi struktur detail karyawan
+        all_user_ids = df['SCANUSERID'].unique()
+        for user_id in all_user_ids:
+            user_id_str = str(user_id).strip()
+            employee_details[user_id_str] = {
+                'name': employee_mapping.get(user_id_str, f"EMP-{user_id_str}"),
+                'kerani': 0,
+                'kerani_verified': 0, # Tambahan untuk verifikasi per kerani
+                'kerani_differences': 0, # Tambahan untuk jumlah perbedaan input
+                'mandor': 0,
+                'asisten': 0
+            }
+
+        # Hitung data Kerani berdasarkan duplikat dan perbedaan input
+        # Verifikator dicari lewat index TRANSNO (P1 diprioritaskan atas P5); dengan filter 704
+        # hanya Mandor/Asisten ber-TRANSSTATUS 704 yang dihitung (Kerani bisa 731/732/704)
+        for user_id_str, kerani_stats in summarize_kerani(df, use_status_704_filter).items():
+            if user_id_str in employee_details:
+                employee_details[user_id_str].update(kerani_stats)
+
+        # Hitung data Mandor
+        mandor_df = df[df['RECORDTAG'] == 'P1']
+        if not mandor_df.empty:
+            mandor_counts = mandor_df.groupby('SCANUSERID').size()
+            for user_id, count in mandor_counts.items():
+                user_id_str = str(user_id).strip()
+                if user_id_str in employee_details:
+                    employee_details[user_id_str]['mandor'] = count
+
+        # Hitung data Asisten
+        asisten_df = df[df['RECORDTAG'] == 'P5']
+        if not asisten_df.empty:
+            asisten_counts = asisten_df.groupby('SCANUSERID').size()
+            for user_id, count in asisten_counts.items():
+                user_id_str = str(user_id).strip()
+                if user_id_str in employee_details:
+                    employee_details[user_id_str]['asisten'] = count
+
+        # Hitung total divisi
+        kerani_total = sum(d['kerani'] for d in employee_details.values())
+        mandor_total = sum(d['mandor'] for d in employee_details.values())
+        asisten_total = sum(d['asisten'] for d in employee_details.values())
+        
+        # Verifikasi keseluruhan berdasarkan logika duplikat
+        div_kerani_verified_total = sum(d['kerani_verified'] for d in employee_details.values())
+        verification_rate = (div_kerani_verified_total / kerani_total * 100) if kerani_total > 0 else 0
+        
+        # Log informasi untuk analisis dengan filter status 704
+        if use_status_704_filter:
+            self.log_message(f"  *** FILTER TRANSSTATUS 704 AKTIF untuk {estate_name} ***")
+            total_differences = sum(d['kerani_differences'] for d in employee_details.values())
+            self.log_message(f"  Total perbedaan transaksi dengan filter 704: {total_differences}")
+            
+            # Log detail per karyawan untuk transparansi
+            for emp_id, emp_data in employee_details.items():
+                if emp_data['kerani_differences'] > 0:
+                    verified = emp_data.get('kerani_verified', 0)
+                    differences = emp_data['kerani_differences']
+                    percentage = (differences / verified * 100) if verified > 0 else 0
+                    self.log_message(f"    👤 {emp_data['name']}: {differences} perbedaan dari {verified} terverifikasi ({percentage:.1f}%)")
+        
+        return {
+            'estate': estate_name,
+            'division': div_name,
+            'kerani_total': kerani_total,
+            'mandor_total': mandor_total,
+            'asisten_total': asisten_total,
+            'verifikasi_total': div_kerani_verified_total, # Total transaksi Kerani yang terverifikasi
+            'verification_rate': verification_rate,
+            'employee_details': employee_details
+        }
+    
+    def create_pdf_report(self, all_results, start_date, end_date):
+        try:
+            output_dir = self.output_dir
+            os.makedirs(output_dir, exist_ok=True)
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            period = f"{start_date.strftime('%B_%Y')}"
+            filename = f"Laporan_Kinerja_Kerani_Mandor_Asisten_{period}_{timestamp}.pdf"
+            filepath = os.path.join(output_dir, filename)
+            
+            # Create PDF document with LANDSCAPE orientation and custom margins
+            doc = SimpleDocTemplate(
+                filepath, 
+                pagesize=landscape(A4),
+                leftMargin=30,
+                rightMargin=30,
+                topMargin=40,
+                bottomMargin=40
+            )
+            styles = getSampleStyleSheet()
+            story = []
+            
+            # Company Header with Logo
+            try:
+                logo_path = r"D:\Gawean Rebinmas\Monitoring Database\Laporan_Ifess_beda_transno\all_transaksi\assets\logo_rebinmas.jpeg"
+                if os.path.exists(logo_path):
+                    # Create logo with proper sizing (200x200 pixels converted to points)
+                    logo = Image(logo_path, width=72, height=72)  # 1 inch = 72 points
+                    logo.hAlign = 'CENTER'
+                    story.append(logo)
+                    story.append(Spacer(1, 10))
+            except Exception as e:
+                print(f"Logo loading error: {e}")
+            
+            header_style = ParagraphStyle(
+                'CompanyHeader',
+                parent=styles['Normal'],
+                fontSize=12,
+                textColor=colors.HexColor('#2E4057'),
+                alignment=1,
+                spaceAfter=5,
+                fontName='Helvetica-Bold'
+            )
+            
+            company_header = Paragraph(
+                "<b>PT. REBINMAS JAYA</b><br/>SISTEM MONITORING TRANSAKSI FFB", 
+                header_style
+            )
+            story.append(company_header)
+            story.append(Spacer(1, 10))
+            
+            # Main Title with Enhanced Styling
+            title_style = ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Heading1'],
+                fontSize=18,
+                textColor=colors.HexColor('#1A365D'),
+                spaceAfter=8,
+                spaceBefore=10,
+                alignment=1,
+                fontName='Helvetica-Bold'
+            )
+            
+            subtitle_style = ParagraphStyle(
+                'Subtitle',
+                parent=styles['Normal'],
+                fontSize=12,
+                textColor=colors.HexColor('#4A5568'),
+                spaceAfter=25,
+                alignment=1,
+                fontName='Helvetica'
+            )
+            
+            title = Paragraph("LAPORAN KINERJA KERANI, MANDOR, DAN ASISTEN", title_style)
+            subtitle = Paragraph(f"Periode: {start_date.strftime('%d %B %Y')} - {end_date.strftime('%d %B %Y')}", subtitle_style)
+            
+            story.append(title)
+            story.append(subtitle)
+            
+            # Add summary statistics box
+            total_estates = len(set(result['estate'] for result in all_results))
+            total_divisions = len(all_results)
+            
+            summary_style = ParagraphStyle(
+                'SummaryBox',
+                parent=styles['Normal'],
+                fontSize=9,
+                textColor=colors.HexColor('#2D3748'),
+                alignment=1,
+                spaceAfter=20,
+                leftIndent=50,
+                rightIndent=50
+            )
+            
+            summary_text = f"""<b>RINGKASAN ANALISIS:</b> {total_estates} Estate • {total_divisions} Divisi • 
+            Analisis Transaksi Real-time • Verifikasi Otomatis"""
+            
+            summary_box = Paragraph(summary_text, summary_style)
+            story.append(summary_box)
+            story.append(Spacer(1, 15))
+            
+            # Create table data with enhanced columns
+            table_data = []
+            
+            # Enhanced Header with White Text (No Boxes)
+            header_style = ParagraphStyle('HeaderStyle', parent=styles['Normal'], fontSize=8, alignment=1, fontName='Helvetica-Bold', textColor=colors.white)
+            header = [
+                Paragraph('ESTATE', header_style),
+                Paragraph('DIVISI', header_style),
+                Paragraph('KARYAWAN', header_style),
+                Paragraph('ROLE', header_style),
+                Paragraph('JUMLAH<br/>TRANSAKSI', header_style),
+                Paragraph('PERSENTASE<br/>TERVERIFIKASI', header_style),
+                Paragraph('KETERANGAN<br/>PERBEDAAN', header_style)
+            ]
+            table_data.append(header)
+            
+            # Grand totals
+            grand_kerani = 0
+            grand_mandor = 0
+            grand_asisten = 0
+            grand_kerani_verified = 0 # FIX: Accumulator for verified kerani transactions
+            
+            # Process each result
+            for result in all_results:
+                estate = result['estate']
+                division = result['division']
+                kerani_total = result['kerani_total']
+                mandor_total = result['mandor_total']
+                asisten_total = result['asisten_total']
+                verifikasi_total = result['verifikasi_total']
+                verification_rate = result['verification_rate']
+                employee_details = result['employee_details']
+                
+                # Add division summary row
+                # Total transaksi = hanya dari Kerani (tanpa Asisten/Mandor)
+                # Persentase terverifikasi = Verified Kerani Transactions / Total Kerani
+                total_kerani_only = kerani_total
+                total_verified_kerani = verifikasi_total  # Use actual verified kerani transactions
+                division_verification_rate = (total_verified_kerani / total_kerani_only * 100) if total_kerani_only > 0 else 0
+                
+                # Create paragraph styles for table cells
+                cell_style = ParagraphStyle('CellStyle', parent=styles['Normal'], fontSize=8, alignment=1)
+                cell_style_left = ParagraphStyle('CellStyleLeft', parent=styles['Normal'], fontSize=8, alignment=0)
+                
+                table_data.append([
+                    Paragraph(estate, cell_style),
+                    Paragraph(division, cell_style),
+                    Paragraph(f"== {division} TOTAL ==", cell_style),
+                    Paragraph('SUMMARY', cell_style),
+                    Paragraph(str(total_kerani_only), cell_style),
+                    Paragraph(f"{division_verification_rate:.2f}% ({total_verified_kerani})", cell_style),
+                    Paragraph("", cell_style)
+                ])
+                
+                # Collect employee rows by role type for proper grouping
+                kerani_rows = []
+                mandor_rows = []
+                asisten_rows = []
+                
+                for emp_id, emp_data in employee_details.items():
+                    # KERANI row - Persentase = % transaksi yang sudah diverifikasi dari total yang ia buat
+                    if emp_data['kerani'] > 0:
+                        # Untuk KERANI: % transaksi yang sudah diverifikasi dari total yang ia buat
+                        kerani_verification_rate = (emp_data.get('kerani_verified', 0) / emp_data['kerani'] * 100) if emp_data['kerani'] > 0 else 0
+                        
+                        # Format dengan jumlah terverifikasi dalam tanda kurung
+                        verified_count = emp_data.get('kerani_verified', 0)
+                        differences_count = emp_data.get('kerani_differences', 0)
+                        percentage_text = f"{kerani_verification_rate:.2f}% ({verified_count})"
+                        
+                        # Hitung persentase perbedaan = Total perbedaan / Total transaksi terverifikasi Kerani
+                        difference_percentage = (differences_count / verified_count * 100) if verified_count > 0 else 0
+                        keterangan_text = f"{differences_count} perbedaan ({difference_percentage:.1f}%)"
+                        
+                        kerani_rows.append([
+                            Paragraph(estate, cell_style),
+                            Paragraph(division, cell_style),
+                            Paragraph(emp_data['name'], cell_style_left),
+                            Paragraph('KERANI', cell_style),
+                            Paragraph(str(emp_data['kerani']), cell_style),
+                            Paragraph(percentage_text, cell_style),
+                            Paragraph(keterangan_text, cell_style)
+                        ])
+                    
+                    # MANDOR row - Persentase = % transaksi yang ia buat per total Kerani di divisi
+                    if emp_data['mandor'] > 0:
+                        # Untuk MANDOR: % transaksi yang ia buat per total Kerani di divisi
+                        mandor_percentage = (emp_data['mandor'] / kerani_total * 100) if kerani_total > 0 else 0
+                        mandor_rows.append([
+                            Paragraph(estate, cell_style),
+                            Paragraph(division, cell_style),
+                            Paragraph(emp_data['name'], cell_style_left),
+                            Paragraph('MANDOR', cell_style),
+                            Paragraph(str(emp_data['mandor']), cell_style),
+                            Paragraph(f"{mandor_percentage:.2f}%", cell_style),
+                            Paragraph("", cell_style)
+                        ])
+                    
+                    # ASISTEN row - Persentase = % transaksi yang ia buat per total Kerani di divisi
+                    if emp_data['asisten'] > 0:
+                        # Untuk ASISTEN: % transaksi yang ia buat per total Kerani di divisi
+                        asisten_percentage = (emp_data['asisten'] / kerani_total * 100) if kerani_total > 0 else 0
+                        asisten_rows.append([
+                            Paragraph(estate, cell_style),
+                            Paragraph(division, cell_style),
+                            Paragraph(emp_data['name'], cell_style_left),
+                            Paragraph('ASISTEN', cell_style),
+                            Paragraph(str(emp_data['asisten']), cell_style),
+                            Paragraph(f"{asisten_percentage:.2f}%", cell_style),
+                            Paragraph("", cell_style)
+                        ])
+                
+                # Add rows in proper order: KERANI first, then MANDOR, then ASISTEN
+                for row in kerani_rows:
+                    table_data.append(row)
+                for row in mandor_rows:
+                    table_data.append(row)
+                for row in asisten_rows:
+                    table_data.append(row)
+                
+                # Add separator
+                table_data.append([
+                    Paragraph('', cell_style), Paragraph('', cell_style), Paragraph('', cell_style),
+                    Paragraph('', cell_style), Paragraph('', cell_style), Paragraph('', cell_style), Paragraph('', cell_style)
+                ])
+                
+                # Add to grand totals
+                grand_kerani += kerani_total
+                grand_mandor += mandor_total
+                grand_asisten += asisten_total
+                grand_kerani_verified += verifikasi_total # FIX: Accumulate verified totals
+            
+            # Add grand total row
+            # Total transaksi = hanya dari Kerani (tanpa Asisten/Mandor)
+            # Persentase terverifikasi = Verified Kerani Transactions / Total Kerani
+            grand_total_kerani_only = grand_kerani
+            grand_total_verified_kerani = grand_kerani_verified  # Use actual verified kerani transactions
+            grand_verification_rate = (grand_total_verified_kerani / grand_total_kerani_only * 100) if grand_total_kerani_only > 0 else 0
+            
+            # Create paragraph styles for grand total (outside the loop)
+            cell_style = ParagraphStyle('CellStyle', parent=styles['Normal'], fontSize=8, alignment=1)
+            
+            table_data.append([
+                Paragraph('=== GRAND TOTAL ===', cell_style),
+                Paragraph('', cell_style),
+                Paragraph('', cell_style),
+                Paragraph('', cell_style),
+                Paragraph(str(grand_total_kerani_only), cell_style),
+                Paragraph(f"{grand_verification_rate:.2f}% ({grand_total_verified_kerani})", cell_style),
+                Paragraph("", cell_style)
+            ])
+            
+            # Create table with custom column widths for better layout and text wrapping
+            col_widths = [90, 90, 140, 70, 80, 110, 120]  # Optimized column widths for better text wrapping
+            table = Table(table_data, repeatRows=1, colWidths=col_widths)
+            
+            # Enhanced Modern Table Styling
+            style = TableStyle([
+                # Header styling - clean header without boxes
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2C5282')),  # Deep blue header
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('TOPPADDING', (0, 0), (-1, 0), 12),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                
+                # Body styling with alternating colors
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -1), 8),
+                ('TOPPADDING', (0, 1), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                
+                # Grid styling - ONLY for body rows (excluding header)
+                ('GRID', (0, 1), (-1, -1), 0.5, colors.HexColor('#E2E8F0')),  # Light gray grid for body only
+                
+                # Alternating row colors for better readability
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#F7FAFC'), colors.white]),
+            ])
+            
+            # Enhanced row highlighting with modern color schemes
+            for i, row in enumerate(table_data):
+                # Skip header row
+                if i == 0:
+                    continue
+                    
+                # Highlight SUMMARY and GRAND TOTAL rows with premium styling
+                if 'TOTAL' in str(row[2]) or 'GRAND TOTAL' in str(row[0]):
+                    style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#4299E1'))  # Professional blue
+                    style.add('TEXTCOLOR', (0, i), (-1, i), colors.white)
+                    style.add('FONTNAME', (0, i), (-1, i), 'Helvetica-Bold')
+                    style.add('FONTSIZE', (0, i), (-1, i), 9)
+                    style.add('TOPPADDING', (0, i), (-1, i), 10)
+                    style.add('BOTTOMPADDING', (0, i), (-1, i), 10)
+                
+                # Enhanced KERANI row styling
+                elif len(row) > 3 and hasattr(row[3], 'text') and 'KERANI' in str(row[3].text):
+                    # Highlight entire KERANI row with subtle background
+                    style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#FFF5F5'))  # Light red background
+                    
+                    # Percentage column with attention-grabbing color
+                    style.add('TEXTCOLOR', (5, i), (5, i), colors.HexColor('#E53E3E'))  # Strong red
+                    style.add('FONTNAME', (5, i), (5, i), 'Helvetica-Bold')
+                    
+                    # Keterangan column with warning styling
+                    if len(row) > 6 and row[6]:
+                        style.add('BACKGROUND', (6, i), (6, i), colors.HexColor('#FED7D7'))  # Light red highlight
+                        style.add('TEXTCOLOR', (6, i), (6, i), colors.HexColor('#C53030'))  # Dark red text
+                        style.add('FONTNAME', (6, i), (6, i), 'Helvetica-Bold')
+                
+                # Enhanced MANDOR row styling
+                elif len(row) > 3 and hasattr(row[3], 'text') and 'MANDOR' in str(row[3].text):
+                    style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#F0FFF4'))  # Light green background
+                    style.add('TEXTCOLOR', (5, i), (5, i), colors.HexColor('#38A169'))  # Professional green
+                    style.add('FONTNAME', (5, i), (5, i), 'Helvetica-Bold')
+                
+                # Enhanced ASISTEN row styling
+                elif len(row) > 3 and hasattr(row[3], 'text') and 'ASISTEN' in str(row[3].text):
+                    style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#F0F9FF'))  # Light blue background
+                    style.add('TEXTCOLOR', (5, i), (5, i), colors.HexColor('#3182CE'))  # Professional blue
+                    style.add('FONTNAME', (5, i), (5, i), 'Helvetica-Bold')
+                
+                # Empty separator rows
+                elif all(not str(cell).strip() for cell in row):
+                    style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#EDF2F7'))  # Light separator
+                    style.add('TOPPADDING', (0, i), (-1, i), 3)
+                    style.add('BOTTOMPADDING', (0, i), (-1, i), 3)
+            
+            table.setStyle(style)
+            story.append(table)
+            
+            story.append(Spacer(1, 20))
+            
+            # Enhanced explanation section with modern styling
+            explanation_title_style = ParagraphStyle(
+                'ExplanationTitle',
+                parent=styles['Heading2'],
+                fontSize=12,
+                textColor=colors.HexColor('#2D3748'),
+                spaceBefore=15,
+                spaceAfter=10,
+                fontName='Helvetica-Bold'
+            )
+            
+            explanation_style = ParagraphStyle(
+                'Explanation',
+                parent=styles['Normal'],
+                fontSize=9,
+                textColor=colors.HexColor('#4A5568'),
+                spaceBefore=5,
+                spaceAfter=5,
+                leftIndent=20,
+                bulletIndent=10,
+                alignment=0
+            )
+            
+            # Main explanation section
+            explanation_title = Paragraph("PENJELASAN LAPORAN KINERJA", explanation_title_style)
+            story.append(explanation_title)
+            
+            explanations = [
+                "<b>KERANI:</b> % transaksi yang sudah diverifikasi (ada duplikat TRANSNO dengan P1/P5) dari total yang ia buat. Angka dalam kurung menunjukkan jumlah transaksi terverifikasi.",
+                "<b>MANDOR/ASISTEN:</b> % transaksi yang ia buat per total Kerani di divisi tersebut (warna hijau).",
+                "<b>SUMMARY:</b> % verifikasi keseluruhan divisi (Total Transaksi Kerani Terverifikasi / Total Transaksi Kerani). Angka dalam kurung menunjukkan jumlah transaksi Kerani yang terverifikasi.",
+                "<b>GRAND TOTAL:</b> % verifikasi keseluruhan untuk semua estate yang dipilih (Total Semua Transaksi Kerani Terverifikasi / Total Semua Transaksi Kerani). Angka dalam kurung menunjukkan jumlah total transaksi Kerani yang terverifikasi.",
+                "<b>Jumlah Transaksi:</b> Untuk SUMMARY dan GRAND TOTAL hanya menghitung transaksi Kerani (tanpa Asisten/Mandor)."
+            ]
+            
+            for explanation_text in explanations:
+                explanation_para = Paragraph(f"• {explanation_text}", explanation_style)
+                story.append(explanation_para)
+            
+            story.append(Spacer(1, 15))
+            
+            # Enhanced differences explanation
+            differences_title = Paragraph("⚠️ KETERANGAN PERBEDAAN INPUT (INDIKATOR KINERJA)", explanation_title_style)
+            story.append(differences_title)
+            
+            differences_explanations = [
+                "<b>Metodologi:</b> Untuk setiap transaksi KERANI yang terverifikasi, sistem menghitung jumlah field yang berbeda antara input KERANI dan input MANDOR/ASISTEN.",
+                "<b>Field yang dibandingkan:</b> RIPEBCH, UNRIPEBCH, BLACKBCH, ROTTENBCH, LONGSTALKBCH, RATDMGBCH, LOOSEFRUIT.",
+                "<b>Format:</b> 'X perbedaan (Y%)' dimana Y% = (X perbedaan / Jumlah transaksi terverifikasi) × 100.",
+                "<b>Interpretasi:</b> Semakin banyak perbedaan, semakin besar kemungkinan ada ketidakakuratan dalam input data."
+            ]
+            
+            for diff_text in differences_explanations:
+                diff_para = Paragraph(f"• {diff_text}", explanation_style)
+                story.append(diff_para)
+            
+            # Add footer with generation info
+            story.append(Spacer(1, 20))
+            
+            footer_style = ParagraphStyle(
+                'Footer',
+                parent=styles['Normal'],
+                fontSize=8,
+                textColor=colors.HexColor('#718096'),
+                alignment=1,
+                spaceBefore=10
+            )
+            
+            footer_text = f"""📅 Laporan dibuat pada: {datetime.now().strftime('%d %B %Y, %H:%M:%S')} | 
+            🔄 Sistem Analisis Real-time | 🏢 PT. Rebinmas Jaya"""
+            
+            footer = Paragraph(footer_text, footer_style)
+            story.append(footer)
+            
+            # Build PDF
+            doc.build(story)
+            
+            return filepath
+            
+        except Exception as e:
+            self.log_message(f"Error creating PDF: {str(e)}")
+            return None
+    
+    def log_message(self, message):
+        """Pesan progress analisis; tanpa GUI diteruskan ke logging"""
+        self.logger.info(message)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Analisis multi-estate tanpa GUI, misalnya untuk dijadwalkan setiap malam di server
+Memakai pipeline yang sama dengan gui_multi_estate_ffb_analysis.py (multi_estate_analysis.py),
+tanpa tkinter/tkcalendar.
+
+Log ditulis ke stderr; stdout berisi JSON Lines yang bisa dibaca mesin: satu baris per estate
+({"event": "estate", ...} dengan waktu analisis) dan satu baris ringkasan ({"event": "run", ...}).
+
+Contoh:
+    python multi_estate_cli.py --start-date 2025-05-01 --end-date 2025-05-31 --workers 4 --format pdf json
+"""
+import time
+
+# Waktu start dicatat sebelum import pandas/reportlab agar biaya startup ikut terukur
+_PROCESS_STARTED = time.perf_counter()
+
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime
+
+import pandas as pd
+from estate_pool import run_estates, DEFAULT_MAX_WORKERS, WORKER_MODES
+from multi_estate_analysis import MultiEstateAnalysis
+
+# Format output yang didukung
+OUTPUT_FORMATS = ('pdf', 'json', 'csv')
+
+# Kolom CSV: satu baris per karyawan per divisi
+CSV_COLUMNS = ['estate', 'division', 'employee_id', 'name', 'kerani', 'kerani_verified',
+               'kerani_differences', 'mandor', 'asisten']
+
+
+class HeadlessAnalysis(MultiEstateAnalysis):
+    """MultiEstateAnalysis yang mengukur waktu analisis per estate di dalam worker"""
+
+    def analyze_estate_timed(self, estate_name, db_path, start_date, end_date):
+        """
+        Returns:
+            tuple: (hasil analyze_estate, detik, {'hits', 'misses'} snapshot cache selama analisis)
+
+        Pada mode process setiap job memakai salinan objek ini, sehingga penghitung snapshot
+        cache di proses induk tetap 0; main() menjumlahkan penghitung dari hasil job.
+        """
+        hits, misses = self.snapshot_cache.hits, self.snapshot_cache.misses
+        started = time.perf_counter()
+        results = self.analyze_estate(estate_name, db_path, start_date, end_date)
+        seconds = time.perf_counter() - started
+        cache_stats = {'hits': self.snapshot_cache.hits - hits,
+                       'misses': self.snapshot_cache.misses - misses}
+        return results, seconds, cache_stats
+
+
+def load_estates(config_path):
+    """Daftar estate {nama: path database} dari config.json (format sama dengan GUI)"""
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def emit(record):
+    """Tulis satu record JSON ke stdout (JSON Lines)"""
+    print(json.dumps(record, default=str), flush=True)
+
+
+def report_basename(start_date):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"Laporan_Kinerja_Kerani_Mandor_Asisten_{start_date.strftime('%B_%Y')}_{timestamp}"
+
+
+def write_json_report(all_results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        # Jumlah dari groupby bertipe numpy: .item() mengubahnya ke int Python
+        json.dump(all_results, f, indent=2, ensure_ascii=False,
+                  default=lambda value: value.item() if hasattr(value, 'item') else str(value))
+    return path
+
+
+def write_csv_report(all_results, path):
+    rows = []
+    for result in all_results:
+        for emp_id, emp_data in result['employee_details'].items():
+            row = {'estate': result['estate'], 'division': result['division'], 'employee_id': emp_id}
+            row.update(emp_data)
+            rows.append(row)
+    pd.DataFrame(rows, columns=CSV_COLUMNS).to_csv(path, index=False)
+    return path
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Format tanggal harus YYYY-MM-DD: {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analisis kinerja Kerani, Mandor, dan Asisten multi-estate tanpa GUI.')
+    parser.add_argument('--config', type=str, default='config.json', help='File daftar estate (default: config.json)')
+    parser.add_argument('--estates', type=str, nargs='+', default=None,
+                        help='Nama estate yang dianalisis (default: semua estate di config)')
+    parser.add_argument('--start-date', type=parse_date, required=True, help='Tanggal mulai (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=parse_date, required=True, help='Tanggal akhir, inklusif (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f'Jumlah estate yang dianalisis bersamaan (default: {DEFAULT_MAX_WORKERS})')
+    parser.add_argument('--worker-mode', type=str, default='thread', choices=WORKER_MODES,
+                        help='Jenis worker: thread (default) atau process')
+    parser.add_argument('--format', dest='formats', type=str, nargs='+', default=['pdf'], choices=OUTPUT_FORMATS,
+                        help='Format output (default: pdf)')
+    parser.add_argument('--output-dir', type=str, default='reports', help='Direktori output (default: reports)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Selalu baca data dari database, tanpa snapshot lokal dan cache data referensi')
+    parser.add_argument('--log-level', type=str, default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Level log di stderr (default: INFO)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level), stream=sys.stderr,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('multi_estate_cli')
+    if args.log_level != 'DEBUG':
+        # Waktu per query dari firebird_connector hanya ditampilkan dengan --log-level DEBUG
+        logging.getLogger('firebird_connector').setLevel(logging.WARNING)
+
+    if args.start_date > args.end_date:
+        parser.error("Tanggal mulai tidak boleh lebih besar dari tanggal akhir")
+    try:
+        estates = load_estates(args.config)
+    except (json.JSONDecodeError, IOError) as e:
+        parser.error(f"Gagal memuat {args.config}: {e}")
+    if args.estates:
+        unknown = [name for name in args.estates if name not in estates]
+        if unknown:
+            parser.error(f"Estate tidak ada di {args.config}: {', '.join(unknown)}")
+        estates = {name: estates[name] for name in args.estates}
+    selected_estates = list(estates.items())
+
+    analysis = HeadlessAnalysis(output_dir=args.output_dir)
+    analysis.snapshot_cache.enabled = not args.no_cache
+    analysis.reference_cache.enabled = not args.no_cache
+
+    run_started = time.perf_counter()
+    startup_seconds = run_started - _PROCESS_STARTED
+    logger.info(f"Periode: {args.start_date} - {args.end_date}, {len(selected_estates)} estate "
+                f"({min(args.workers, len(selected_estates))} paralel, mode {args.worker_mode})")
+
+    failed = []
+    # Penghitung snapshot cache dari worker (mode process)
+    worker_cache_stats = {'hits': 0, 'misses': 0}
+
+    def on_event(event):
+        if event['type'] == 'started':
+            logger.info(f"Menganalisis {event['estate']}")
+            return
+        record = {'event': 'estate', 'estate': event['estate'], 'db_path': estates[event['estate']],
+                  'completed': event['completed'], 'total': event['total']}
+        if event['type'] == 'failed':
+            record.update(status='failed', seconds=None, divisions=0, error=str(event['error']))
+        else:
+            results, seconds, cache_stats = event['result']
+            for key in worker_cache_stats:
+                worker_cache_stats[key] += cache_stats[key]
+            # analyze_estate mengembalikan None jika database tidak ditemukan, koneksi gagal, atau error
+            status = 'failed' if results is None else ('ok' if results else 'no_data')
+            record.update(status=status, seconds=round(seconds, 3), divisions=len(results or []))
+        if record['status'] == 'failed':
+            failed.append(event['estate'])
+        emit(record)
+
+    estate_results_list = run_estates(
+        selected_estates, analysis.analyze_estate_timed, args=(args.start_date, args.end_date),
+        max_workers=args.workers, mode=args.worker_mode, on_event=on_event
+    )
+    analysis_seconds = time.perf_counter() - run_started
+
+    if args.worker_mode == 'process':
+        snapshot_cache_stats = worker_cache_stats
+    else:
+        # Mode thread: semua job memakai snapshot cache yang sama di proses ini
+        snapshot_cache_stats = {'hits': analysis.snapshot_cache.hits, 'misses': analysis.snapshot_cache.misses}
+
+    all_results = []
+    for estate_result in estate_results_list:
+        if estate_result and estate_result[0]:
+            all_results.extend(estate_result[0])
+
+    outputs = {}
+    output_seconds = {}
+    if all_results:
+        os.makedirs(args.output_dir, exist_ok=True)
+        basename = os.path.join(args.output_dir, report_basename(args.start_date))
+        writers = {
+            'pdf': lambda: analysis.create_pdf_report(all_results, args.start_date, args.end_date),
+            'json': lambda: write_json_report(all_results, basename + '.json'),
+            'csv': lambda: write_csv_report(all_results, basename + '.csv'),
+        }
+        for output_format in dict.fromkeys(args.formats):
+            started = time.perf_counter()
+            try:
+                outputs[output_format] = writers[output_format]()
+            except Exception as e:
+                logger.error(f"Gagal membuat output {output_format}: {e}")
+                outputs[output_format] = None
+            output_seconds[output_format] = round(time.perf_counter() - started, 3)
+            logger.info(f"Output {output_format}: {outputs[output_format]}")
+    else:
+        logger.warning("Tidak ada hasil analisis, output tidak dibuat")
+
+    emit({
+        'event': 'run',
+        'start_date': args.start_date.isoformat(),
+        'end_date': args.end_date.isoformat(),
+        'estates': len(selected_estates),
+        'failed': failed,
+        'divisions': len(all_results),
+        'workers': args.workers,
+        'worker_mode': args.worker_mode,
+        'startup_seconds': round(startup_seconds, 3),
+        'analysis_seconds': round(analysis_seconds, 3),
+        'output_seconds': output_seconds,
+        'total_seconds': round(time.perf_counter() - _PROCESS_STARTED, 3),
+        'snapshot_cache': snapshot_cache_stats,
+        'outputs': outputs,
+    })
+
+    output_failed = any(path is None for path in outputs.values())
+    return 1 if failed or output_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,8 @@ Date: 2024
 from .database_connector import (
     DatabaseConnectorInterface,
     FirebirdModularConnector,
+    FirebirdDriverConnector,
+    FirebirdConnectionPool,
     DatabaseConnectorFactory,
     DatabaseConfig
 )
@@ -37,6 +39,8 @@ __all__ = [
     # Database components
     "DatabaseConnectorInterface",
     "FirebirdModularConnector", 
+    "FirebirdDriverConnector",
+    "FirebirdConnectionPool",
     "DatabaseConnectorFactory",
     "DatabaseConfig",
     
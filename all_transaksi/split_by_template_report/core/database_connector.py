@@ -9,9 +9,21 @@ import subprocess
 import json
 import tempfile
 import re
+import shutil
+import threading
 import pandas as pd
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any, Union
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Union, Iterator
+
+# Optional DB-API driver; without it only the isql connector is available
+try:
+    import fdb as firebird_driver
+except ImportError:
+    try:
+        from firebird import driver as firebird_driver
+    except ImportError:
+        firebird_driver = None
 
 
 class DatabaseConnectorInterface(ABC):
@@ -43,6 +55,9 @@ class FirebirdModularConnector(DatabaseConnectorInterface):
     Modular Firebird database connector using isql
     Enhanced version of the original FirebirdConnector with better modularity
     """
+    # isql path found by _detect_isql_path, shared by every connector in the process
+    _detected_isql_path = None
+    _detect_lock = threading.Lock()
     
     def __init__(self, db_path: Optional[str] = None, username: str = 'sysdba', 
                  password: str = 'masterkey', isql_path: Optional[str] = None, 
@@ -73,7 +88,16 @@ class FirebirdModularConnector(DatabaseConnectorInterface):
             raise FileNotFoundError(f"isql.exe not found at: {self.isql_path}")
     
     def _detect_isql_path(self) -> str:
-        """Auto-detect isql.exe location"""
+        """Auto-detect isql.exe location (once per process)"""
+        cls = type(self)
+        with cls._detect_lock:
+            if cls._detected_isql_path is None or not os.path.exists(cls._detected_isql_path):
+                cls._detected_isql_path = self._find_isql_path()
+            return cls._detected_isql_path
+
+    @staticmethod
+    def _find_isql_path() -> str:
+        """Search the default install locations, then PATH"""
         default_paths = [
             r'C:\Program Files (x86)\Firebird\Firebird_1_5\bin\isql.exe',
             r'C:\Program Files (x86)\Firebird-1.5.6.5026-0_win32_Manual\bin\isql.exe',
@@ -87,14 +111,10 @@ class FirebirdModularConnector(DatabaseConnectorInterface):
             if os.path.exists(path):
                 return path
         
-        # If not found in default paths, try to find in PATH
-        try:
-            result = subprocess.run(['where', 'isql.exe'], 
-                                  capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                return result.stdout.strip().split('\n')[0]
-        except:
-            pass
+        # If not found in default paths, try to find in PATH (no 'where' subprocess)
+        on_path = shutil.which('isql.exe')
+        if on_path:
+            return on_path
         
         raise FileNotFoundError("isql.exe not found in default locations or PATH")
     
@@ -287,25 +307,241 @@ class FirebirdModularConnector(DatabaseConnectorInterface):
             return []
 
 
+class FirebirdConnectionPool:
+    """
+    Pool of DB-API connections, one pool per database (dsn + credentials)
+    
+    Returned connections are kept idle for reuse, so the database attach
+    is paid once instead of once per query.
+    """
+    
+    _pools: Dict[tuple, 'FirebirdConnectionPool'] = {}
+    _pools_lock = threading.Lock()
+    
+    def __init__(self, dsn: str, username: str, password: str, 
+                 charset: Optional[str] = None, max_size: int = 4):
+        """
+        Initialize connection pool
+        
+        Args:
+            dsn: Database path or host:path
+            username: Database username
+            password: Database password
+            charset: Connection character set (default: database default)
+            max_size: Maximum number of idle connections kept open
+        """
+        self.dsn = dsn
+        self.username = username
+        self.password = password
+        self.charset = charset
+        self.max_size = max_size
+        self._idle: List[Any] = []
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def get(cls, dsn: str, username: str, password: str, 
+            charset: Optional[str] = None, max_size: int = 4) -> 'FirebirdConnectionPool':
+        """Get the pool for a database, creating it on first use"""
+        key = (dsn, username.upper(), password, charset)
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls(dsn, username, password, charset, max_size)
+                cls._pools[key] = pool
+            return pool
+    
+    def acquire(self) -> Any:
+        """Take an idle connection or open a new one"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        
+        kwargs = {'user': self.username, 'password': self.password}
+        if self.charset:
+            kwargs['charset'] = self.charset
+        return firebird_driver.connect(self.dsn, **kwargs)
+    
+    def release(self, conn: Any, ok: bool = True) -> None:
+        """
+        Return a connection to the pool
+        
+        Args:
+            conn: Connection obtained from acquire()
+            ok: False if the query failed; the transaction is rolled back instead of committed
+        """
+        try:
+            if ok:
+                conn.commit()
+            else:
+                conn.rollback()
+        except Exception:
+            # Broken connection, do not reuse it
+            self._close(conn)
+            return
+        
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+        self._close(conn)
+    
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Context manager around acquire()/release()"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, ok=False)
+            raise
+        self.release(conn)
+    
+    def close(self) -> None:
+        """Close all idle connections of this pool"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+    
+    @classmethod
+    def close_all(cls) -> None:
+        """Close every pool created so far"""
+        with cls._pools_lock:
+            pools, cls._pools = list(cls._pools.values()), {}
+        for pool in pools:
+            pool.close()
+    
+    @staticmethod
+    def _close(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class FirebirdDriverConnector(FirebirdModularConnector):
+    """
+    Firebird connector using a DB-API driver (fdb or firebird-driver)
+    
+    Returns the same list-of-dicts results as FirebirdModularConnector, but with
+    typed values (int, date, Decimal, None for NULL) fetched directly from the
+    driver instead of parsed from isql text output.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, username: str = 'sysdba', 
+                 password: str = 'masterkey', use_localhost: bool = True, 
+                 charset: Optional[str] = None, **kwargs):
+        """
+        Initialize Firebird driver connection
+        
+        Args:
+            db_path: Full path to .fdb file
+            username: Database username (default: sysdba)
+            password: Database password (default: masterkey)
+            use_localhost: If True, use localhost:path format for connection (default: True)
+            charset: Connection character set (default: database default)
+            **kwargs: Ignored isql-only arguments (e.g. isql_path)
+        """
+        if firebird_driver is None:
+            raise ImportError("No Firebird DB-API driver installed (fdb or firebird-driver)")
+        
+        self.db_path = db_path
+        self.username = username
+        self.password = password
+        self.use_localhost = use_localhost
+        self.charset = charset
+        self.isql_path = None
+    
+    def _get_pool(self) -> FirebirdConnectionPool:
+        """Connection pool for this database"""
+        dsn = f"localhost:{self.db_path}" if self.use_localhost else self.db_path
+        return FirebirdConnectionPool.get(dsn, self.username, self.password, self.charset)
+    
+    def execute_query(self, query: str, params: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """
+        Execute SQL query using the DB-API driver
+        
+        Args:
+            query: SQL query string
+            params: Query parameters passed to cursor.execute()
+            
+        Returns:
+            List of dictionaries representing query results
+        """
+        if not self.db_path:
+            raise ValueError("Database path not set")
+        
+        # isql uses ';' as terminator, DSQL does not accept it
+        statement = query.strip().rstrip(';').strip()
+        
+        with self._get_pool().connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if params:
+                    cursor.execute(statement, params)
+                else:
+                    cursor.execute(statement)
+                
+                if cursor.description is None:
+                    return []
+                
+                headers = [desc[0].strip() for desc in cursor.description]
+                return [
+                    {header: value.strip() if isinstance(value, str) else value
+                     for header, value in zip(headers, record)}
+                    for record in cursor.fetchall()
+                ]
+            finally:
+                cursor.close()
+
+
 class DatabaseConnectorFactory:
     """Factory for creating database connectors"""
     
+    BACKENDS = ('auto', 'driver', 'isql')
+    
     @staticmethod
-    def create_connector(connector_type: str = 'firebird', **kwargs) -> DatabaseConnectorInterface:
+    def create_connector(connector_type: str = 'firebird', backend: str = 'isql', 
+                         **kwargs) -> DatabaseConnectorInterface:
         """
         Create database connector instance
         
         Args:
             connector_type: Type of connector ('firebird')
+            backend: 'isql' (default), 'driver' (DB-API), or 'auto' (driver when installed).
+                The driver returns typed values (int, Decimal, date) while isql returns
+                strings, so the driver is only used when asked for.
             **kwargs: Connector-specific arguments
             
         Returns:
             Database connector instance
         """
-        if connector_type.lower() == 'firebird':
-            return FirebirdModularConnector(**kwargs)
-        else:
+        if connector_type.lower() != 'firebird':
             raise ValueError(f"Unsupported connector type: {connector_type}")
+        
+        backend = (backend or 'isql').lower()
+        if backend not in DatabaseConnectorFactory.BACKENDS:
+            raise ValueError(f"Unsupported backend: {backend}")
+        
+        # Fall back to isql when no driver is installed
+        if backend != 'isql' and firebird_driver is not None:
+            return FirebirdDriverConnector(**kwargs)
+        
+        kwargs.pop('charset', None)
+        return FirebirdModularConnector(**kwargs)
+    
+    @staticmethod
+    def create_from_config(db_config: 'DatabaseConfig', 
+                           profile: str = 'default') -> DatabaseConnectorInterface:
+        """
+        Create connector from a DatabaseConfig profile
+        
+        The profile may contain 'backend' plus any connector argument
+        (db_path, username, password, isql_path, use_localhost, charset).
+        """
+        settings = dict(db_config.get_db_config(profile))
+        connector_type = settings.pop('type', 'firebird')
+        return DatabaseConnectorFactory.create_connector(connector_type, **settings)
 
 
 # Configuration class for database settings
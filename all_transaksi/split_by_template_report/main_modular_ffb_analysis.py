@@ -50,6 +50,7 @@ class ModularFFBAnalysisGUI:
         self.db_path_var = tk.StringVar(value=r"D:\Gawean Rebinmas\Monitoring Database\Database Ifess\IFESS_2B_24-10-2025\PTRJ_P2B.FDB")
         self.db_user_var = tk.StringVar(value="SYSDBA")
         self.db_password_var = tk.StringVar(value="masterkey")
+        self.db_backend = 'isql'  # 'isql', 'driver' or 'auto' (see DatabaseConnectorFactory)
         self.selected_template_var = tk.StringVar()
         self.status_var = tk.StringVar(value="Siap")
         self.progress_var = tk.DoubleVar()
@@ -252,7 +253,8 @@ class ModularFFBAnalysisGUI:
                 'firebird',
                 db_path=self.db_path_var.get(),
                 username=self.db_user_var.get(),
-                password=self.db_password_var.get()
+                password=self.db_password_var.get(),
+                backend=self.db_backend
             )
             
             # Test connection
@@ -281,7 +283,8 @@ class ModularFFBAnalysisGUI:
                 'firebird',
                 db_path=self.db_path_var.get(),
                 username=self.db_user_var.get(),
-                password=self.db_password_var.get()
+                password=self.db_password_var.get(),
+                backend=self.db_backend
             )
             
             self.log_message("Database loaded successfully")
@@ -587,6 +590,7 @@ class ModularFFBAnalysisGUI:
                 'database_path': self.db_path_var.get(),
                 'database_user': self.db_user_var.get(),
                 'database_password': self.db_password_var.get(),
+                'database_backend': self.db_backend,
                 'last_template': self.current_template.template_name if self.current_template else None
             }
             
@@ -609,6 +613,7 @@ class ModularFFBAnalysisGUI:
                 self.db_path_var.set(config.get('database_path', ''))
                 self.db_user_var.set(config.get('database_user', 'SYSDBA'))
                 self.db_password_var.set(config.get('database_password', 'masterkey'))
+                self.db_backend = config.get('database_backend', 'isql')
                 
                 self.log_message("Configuration loaded")
         except Exception as e:
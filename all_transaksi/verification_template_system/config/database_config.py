@@ -112,6 +112,16 @@ class DatabaseConfig:
         
         return os.path.exists(self.db_path) and self.db_path.upper().endswith('.FDB')
     
+    def create_connection(self):
+        """
+        Buat koneksi DB-API ke database dengan connection_params.
+        
+        Returns:
+            Koneksi fdb (driver diimport saat dipakai karena bersifat opsional)
+        """
+        import fdb
+        return fdb.connect(**self.connection_params)
+    
     def get_connection_string(self) -> str:
         """
         Generate connection string untuk Firebird.
@@ -32,6 +32,9 @@ class Settings:
     DEFAULT_BATCH_SIZE = 1000
     MAX_RETRY_ATTEMPTS = 3
     
+    # Jumlah job VerificationBatch yang dijalankan bersamaan (satu proses per job)
+    BATCH_MAX_WORKERS = min(8, os.cpu_count() or 1)
+    
     # Filter khusus untuk bulan tertentu (dari logika asli)
     SPECIAL_MONTH_FILTER = {
         "month": 5,  # Mei
@@ -118,6 +121,7 @@ class Settings:
             'db_query_timeout': cls.DB_QUERY_TIMEOUT,
             'default_batch_size': cls.DEFAULT_BATCH_SIZE,
             'max_retry_attempts': cls.MAX_RETRY_ATTEMPTS,
+            'batch_max_workers': cls.BATCH_MAX_WORKERS,
             'special_month_filter': cls.SPECIAL_MONTH_FILTER,
             'comparison_fields': cls.COMPARISON_FIELDS,
             'record_tags': cls.RECORD_TAGS
@@ -3,12 +3,16 @@ Logging Configuration
 Sistem logging komprehensif untuk verification template system.
 """
 
+import atexit
 import logging
 import logging.handlers
+import os
+import queue
 import sys
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, List, Union
 import json
 import traceback
 
@@ -18,13 +22,24 @@ from ..config.settings import Settings
 class VerificationLogger:
     """
     Logger khusus untuk sistem verifikasi dengan fitur advanced.
+    
+    Dengan async_logging=True logger hanya memasang QueueHandler; satu thread
+    QueueListener menulis ke console dan semua file log (termasuk
+    verification_sessions.jsonl), sehingga proses verifikasi tidak menunggu I/O disk.
     """
     
+    # QueueListener aktif per nama logger, dihentikan jika logger dengan nama sama dibuat ulang
+    _listeners = {}
+    _listeners_lock = threading.Lock()
+    
     def __init__(self, 
                  name: str = "verification_system",
                  log_level: Union[str, int] = logging.INFO,
                  enable_file_logging: bool = True,
-                 enable_console_logging: bool = True):
+                 enable_console_logging: bool = True,
+                 async_logging: bool = False,
+                 query_log_max_length: Optional[int] = 200,
+                 query_sample_rate: float = 1.0):
         """
         Initialize verification logger.
         
@@ -33,12 +48,23 @@ class VerificationLogger:
             log_level: Level logging
             enable_file_logging: Enable logging ke file
             enable_console_logging: Enable logging ke console
+            async_logging: Tulis log lewat queue dan satu thread listener
+            query_log_max_length: Panjang maksimum query SQL di log (None: lengkap, 0: tanpa query)
+            query_sample_rate: Fraksi operasi database yang query-nya ikut di-log (0.0 - 1.0)
         """
         self.name = name
         self.logger = logging.getLogger(name)
         self.settings = Settings()
+        self.async_logging = async_logging
+        self.query_log_max_length = query_log_max_length
+        self.query_sample_rate = query_sample_rate
+        self._db_operation_count = 0
+        self._handlers = []
+        self.queue_handler = None
+        self.listener = None
         
         # Prevent duplicate handlers
+        self._stop_listener(name)
         if self.logger.handlers:
             self.logger.handlers.clear()
         
@@ -54,6 +80,13 @@ class VerificationLogger:
         # Setup custom formatters
         self._setup_formatters()
         
+        # Pasang handler langsung, atau di belakang queue
+        if async_logging:
+            self._setup_queue_listener(enable_file_logging)
+        else:
+            for handler in self._handlers:
+                self.logger.addHandler(handler)
+        
         # Verification session tracking
         self.session_id = None
         self.session_start_time = None
@@ -73,7 +106,7 @@ class VerificationLogger:
         )
         console_handler.setFormatter(console_format)
         
-        self.logger.addHandler(console_handler)
+        self._handlers.append(console_handler)
     
     def _setup_file_handlers(self):
         """
@@ -114,9 +147,7 @@ class VerificationLogger:
         verification_handler.setLevel(logging.INFO)
         
         # Add handlers
-        self.logger.addHandler(main_handler)
-        self.logger.addHandler(error_handler)
-        self.logger.addHandler(verification_handler)
+        self._handlers.extend([main_handler, error_handler, verification_handler])
         
         # Store handlers untuk reference
         self.main_handler = main_handler
@@ -146,6 +177,121 @@ class VerificationLogger:
         if hasattr(self, 'verification_handler'):
             self.verification_handler.setFormatter(detailed_format)
     
+    def _setup_queue_listener(self, enable_file_logging: bool):
+        """
+        Pasang QueueHandler di logger dan jalankan satu QueueListener untuk semua handler.
+        """
+        if enable_file_logging:
+            # Data session ditulis listener juga; handler lain tidak menerima record session
+            session_handler = logging.FileHandler(
+                self.settings.LOGS_DIR / "verification_sessions.jsonl",
+                encoding='utf-8'
+            )
+            session_handler.setFormatter(SessionEntryFormatter())
+            session_handler.addFilter(SessionRecordFilter(session_records=True))
+            for handler in self._handlers:
+                handler.addFilter(SessionRecordFilter(session_records=False))
+            self._handlers.append(session_handler)
+            self.session_handler = session_handler
+        
+        log_queue = queue.SimpleQueue()
+        self.queue_handler = logging.handlers.QueueHandler(log_queue)
+        self.listener = logging.handlers.QueueListener(
+            log_queue, *self._handlers, respect_handler_level=True
+        )
+        self.listener.start()
+        self.logger.addHandler(self.queue_handler)
+        
+        with self._listeners_lock:
+            self._listeners[self.name] = self.listener
+    
+    @classmethod
+    def attach_file_listener(cls, logger: logging.Logger, log_file: Union[str, Path],
+                             formatter: logging.Formatter, level: int = logging.INFO):
+        """
+        Tulis logger ke log_file lewat QueueHandler dan satu QueueListener per proses.
+        
+        Pemanggilan berikutnya untuk logger yang sama tidak menambah handler. Listener
+        dihentikan (sisa record di queue ditulis) oleh _stop_all_listeners.
+        
+        Args:
+            logger: Logger yang ditulis ke file
+            log_file: Path file log
+            formatter: Format record di file
+            level: Level minimum record yang ditulis
+        """
+        with cls._listeners_lock:
+            if logger.name in cls._listeners:
+                return
+            # QueueHandler warisan fork tidak punya listener di proses ini
+            for handler in list(logger.handlers):
+                if isinstance(handler, logging.handlers.QueueHandler):
+                    logger.removeHandler(handler)
+            
+            file_handler = logging.FileHandler(log_file, encoding='utf-8')
+            file_handler.setLevel(level)
+            file_handler.setFormatter(formatter)
+            
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(
+                log_queue, file_handler, respect_handler_level=True
+            )
+            listener.start()
+            logger.addHandler(logging.handlers.QueueHandler(log_queue))
+            cls._listeners[logger.name] = listener
+    
+    @classmethod
+    def _reset_after_fork(cls):
+        """
+        Lupakan listener proses induk di proses hasil fork; thread listener tidak ikut di-fork.
+        """
+        cls._listeners = {}
+        cls._listeners_lock = threading.Lock()
+    
+    @classmethod
+    def _stop_all_listeners(cls):
+        """
+        Hentikan semua QueueListener aktif; dipanggil sekali lewat atexit agar sisa
+        record di queue tetap ditulis saat program selesai.
+        """
+        with cls._listeners_lock:
+            names = list(cls._listeners)
+        for name in names:
+            cls._stop_listener(name)
+    
+    @classmethod
+    def _stop_listener(cls, name: str):
+        """
+        Hentikan QueueListener logger lama dengan nama yang sama (jika ada).
+        """
+        with cls._listeners_lock:
+            listener = cls._listeners.pop(name, None)
+        if listener:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+    
+    def close(self):
+        """
+        Tulis semua record yang masih di queue, lalu tutup semua handler.
+        """
+        if self.listener:
+            # Listener yang sudah dihentikan _stop_listener tidak dihentikan lagi
+            with self._listeners_lock:
+                active = self._listeners.get(self.name) is self.listener
+                if active:
+                    del self._listeners[self.name]
+            if active:
+                self.listener.stop()
+            self.listener = None
+        if self.queue_handler:
+            self.logger.removeHandler(self.queue_handler)
+            self.queue_handler = None
+        for handler in self._handlers:
+            self.logger.removeHandler(handler)
+            handler.close()
+        self._handlers = []
+    
     def start_verification_session(self, session_info: Dict[str, Any]):
         """
         Mulai session verifikasi dengan tracking khusus.
@@ -228,6 +374,15 @@ class VerificationLogger:
                 'data': data
             }
             
+            if self.queue_handler and hasattr(self, 'session_handler'):
+                # JSON dibuat dan ditulis oleh thread listener; level logger tidak berlaku
+                record = self.logger.makeRecord(
+                    self.name, logging.INFO, __file__, 0, event_type, (), None,
+                    extra={'session_entry': log_entry}
+                )
+                self.queue_handler.handle(record)
+                return
+            
             with open(session_log_file, 'a', encoding='utf-8') as f:
                 f.write(json.dumps(log_entry, ensure_ascii=False, default=str) + '\n')
                 
@@ -260,7 +415,7 @@ class VerificationLogger:
         self.logger.log(level, message)
         
         # Log detail ke file jika ada
-        if len(step_data) > 1 or 'message' not in step_data:
+        if (len(step_data) > 1 or 'message' not in step_data) and self.logger.isEnabledFor(logging.DEBUG):
             self.logger.debug(f"Step details: {json.dumps(step_data, ensure_ascii=False, default=str)}")
     
     def log_database_operation(self, operation: str, query: str, params: Optional[Dict] = None, 
@@ -275,14 +430,6 @@ class VerificationLogger:
             result_count: Jumlah hasil
             duration: Durasi eksekusi
         """
-        db_info = {
-            'operation': operation,
-            'query': query[:200] + '...' if len(query) > 200 else query,  # Truncate long queries
-            'params': params,
-            'result_count': result_count,
-            'duration_seconds': duration
-        }
-        
         message = f"DB {operation}"
         if result_count is not None:
             message += f" - {result_count} rows"
@@ -290,8 +437,42 @@ class VerificationLogger:
             message += f" - {duration:.3f}s"
         
         self.logger.info(message)
+        
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        
+        db_info = {
+            'operation': operation,
+            'query': self._sample_query(query),
+            'params': params,
+            'result_count': result_count,
+            'duration_seconds': duration
+        }
         self.logger.debug(f"DB operation details: {json.dumps(db_info, ensure_ascii=False, default=str)}")
     
+    def _sample_query(self, query: str) -> Optional[str]:
+        """
+        Teks query untuk log sesuai query_sample_rate dan query_log_max_length.
+        
+        Args:
+            query: Query SQL
+        
+        Returns:
+            str: Query (dipotong jika terlalu panjang), None jika tidak ikut sampel
+        """
+        self._db_operation_count += 1
+        if self.query_sample_rate <= 0 or self.query_log_max_length == 0:
+            return None
+        if self.query_sample_rate < 1:
+            # Sampel deterministik: setiap operasi ke-N, N = 1 / query_sample_rate
+            if self._db_operation_count % max(1, round(1 / self.query_sample_rate)):
+                return None
+        
+        max_length = self.query_log_max_length
+        if max_length is not None and len(query) > max_length:
+            return query[:max_length] + '...'  # Truncate long queries
+        return query
+    
     def log_template_operation(self, template_name: str, operation: str, details: Dict[str, Any]):
         """
         Log operasi template.
@@ -309,7 +490,8 @@ class VerificationLogger:
         
         message = f"TEMPLATE {template_name}: {operation}"
         self.logger.info(message)
-        self.logger.debug(f"Template operation: {json.dumps(template_info, ensure_ascii=False, default=str)}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Template operation: {json.dumps(template_info, ensure_ascii=False, default=str)}")
     
     def log_error_with_context(self, error: Exception, context: Dict[str, Any]):
         """
@@ -380,6 +562,37 @@ class VerificationLogger:
             return None
 
 
+atexit.register(VerificationLogger._stop_all_listeners)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=VerificationLogger._reset_after_fork)
+
+
+class SessionRecordFilter(logging.Filter):
+    """
+    Pisahkan record data session (atribut session_entry) dari log biasa.
+    """
+    
+    def __init__(self, session_records: bool):
+        """
+        Args:
+            session_records: True untuk hanya meneruskan record session, False untuk menolaknya
+        """
+        super().__init__()
+        self.session_records = session_records
+    
+    def filter(self, record):
+        return hasattr(record, 'session_entry') == self.session_records
+
+
+class SessionEntryFormatter(logging.Formatter):
+    """
+    Format record session sebagai satu baris JSON (verification_sessions.jsonl).
+    """
+    
+    def format(self, record):
+        return json.dumps(record.session_entry, ensure_ascii=False, default=str)
+
+
 class JsonFormatter(logging.Formatter):
     """
     Custom formatter untuk output JSON.
@@ -422,7 +635,10 @@ class JsonFormatter(logging.Formatter):
 
 def setup_logging(log_level: Union[str, int] = logging.INFO,
                  enable_file_logging: bool = True,
-                 enable_console_logging: bool = True) -> VerificationLogger:
+                 enable_console_logging: bool = True,
+                 async_logging: bool = False,
+                 query_log_max_length: Optional[int] = 200,
+                 query_sample_rate: float = 1.0) -> VerificationLogger:
     """
     Setup logging untuk aplikasi.
     
@@ -430,6 +646,9 @@ def setup_logging(log_level: Union[str, int] = logging.INFO,
         log_level: Level logging
         enable_file_logging: Enable file logging
         enable_console_logging: Enable console logging
+        async_logging: Tulis log lewat queue dan satu thread listener
+        query_log_max_length: Panjang maksimum query SQL di log (None: lengkap, 0: tanpa query)
+        query_sample_rate: Fraksi operasi database yang query-nya ikut di-log
     
     Returns:
         VerificationLogger: Instance logger
@@ -438,7 +657,10 @@ def setup_logging(log_level: Union[str, int] = logging.INFO,
         name="verification_system",
         log_level=log_level,
         enable_file_logging=enable_file_logging,
-        enable_console_logging=enable_console_logging
+        enable_console_logging=enable_console_logging,
+        async_logging=async_logging,
+        query_log_max_length=query_log_max_length,
+        query_sample_rate=query_sample_rate
     )
 
 
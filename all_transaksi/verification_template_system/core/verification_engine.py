@@ -4,12 +4,16 @@ Engine utama untuk menjalankan proses verifikasi menggunakan template.
 """
 
 import logging
+import multiprocessing.util
+import os
 import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union, Tuple
+from typing import Dict, Any, List, Optional, Union, Tuple, Callable
 import json
 
+from .logging_config import VerificationLogger
 from .template_loader import TemplateLoader
 from ..config.database_config import DatabaseConfig
 from ..config.settings import Settings
@@ -32,6 +36,7 @@ class VerificationEngine:
         self.logger = logging.getLogger(__name__)
         
         # Initialize components
+        self.config_path = config_path
         self.template_loader = TemplateLoader()
         self.db_config = DatabaseConfig(config_path)
         
@@ -54,18 +59,12 @@ class VerificationEngine:
         # Pastikan direktori log ada
         log_file.parent.mkdir(parents=True, exist_ok=True)
         
-        # Setup file handler
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.INFO)
-        
-        # Format log
+        # Logger dipakai bersama oleh semua engine di proses ini (misalnya satu engine per job batch):
+        # satu QueueListener per proses menulis file log, engine hanya menaruh record di queue
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
-        file_handler.setFormatter(formatter)
-        
-        # Tambahkan handler ke logger
-        self.logger.addHandler(file_handler)
+        VerificationLogger.attach_file_listener(self.logger, log_file, formatter)
         
         self.logger.info("Verification engine initialized")
     
@@ -175,21 +174,23 @@ class VerificationEngine:
                 'end_date': end_date.strftime("%Y-%m-%d"),
                 'verification_params': verification_params,
                 'prepared_at': datetime.now().isoformat(),
-                'database_path': self.db_config.get_database_path()
+                'database_path': self.db_config.db_path
             }
             
             # Setup database connection di template
-            db_path = self.db_config.get_database_path()
+            db_path = self.db_config.db_path
             if not db_path:
                 self.logger.error("Database path tidak ditemukan")
                 return False
             
-            # Connect ke database
+            # Config per job: template instance lain untuk file .FDB yang sama memakai
+            # data referensi dari ReferenceDataCache tanpa query ulang
+            if hasattr(self.current_template_instance, 'set_database_config'):
+                self.current_template_instance.set_database_config(DatabaseConfig(db_path, estate_name))
+            
+            # Connect ke database (gagal connect melempar exception)
             if hasattr(self.current_template_instance, 'connect_database'):
-                success = self.current_template_instance.connect_database(db_path)
-                if not success:
-                    self.logger.error("Gagal connect ke database")
-                    return False
+                self.current_template_instance.connect_database()
             
             self.logger.info(f"Verification prepared for estate: {estate_name}")
             return True
@@ -430,6 +431,79 @@ class VerificationEngine:
             return None
 
 
+# Jenis executor yang didukung VerificationBatch.run_batch
+BATCH_WORKER_MODES = ('process', 'thread')
+
+
+def _run_batch_job(config_path: Optional[Union[str, Path]],
+                   template_name: str,
+                   template_kwargs: Dict[str, Any],
+                   job_index: int,
+                   job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Jalankan satu job batch dengan VerificationEngine dan template instance sendiri.
+    Fungsi level modul agar bisa dikirim ke ProcessPoolExecutor.
+    
+    Args:
+        config_path: Path konfigurasi database engine batch
+        template_name: Nama template
+        template_kwargs: Parameter template
+        job_index: Indeks job dalam batch
+        job: Job dari VerificationBatch.add_verification_job
+    
+    Returns:
+        Dict: Hasil verifikasi job (dengan 'job_index')
+    """
+    engine = VerificationEngine(config_path)
+    try:
+        if not engine.load_template(template_name, **template_kwargs):
+            return {
+                'job_index': job_index,
+                'estate_name': job['estate_name'],
+                'success': False,
+                'error': f'Failed to load template: {template_name}'
+            }
+        
+        success = engine.prepare_verification(
+            estate_name=job['estate_name'],
+            start_date=job['start_date'],
+            end_date=job['end_date'],
+            **job['params']
+        )
+        if not success:
+            return {
+                'job_index': job_index,
+                'estate_name': job['estate_name'],
+                'success': False,
+                'error': 'Failed to prepare verification'
+            }
+        
+        result = engine.run_verification()
+        result['job_index'] = job_index
+        
+        # Save individual result; periode ikut di nama file karena job estate yang sama
+        # untuk bulan berbeda bisa selesai pada detik yang sama
+        metadata = engine.verification_metadata
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = (f"verification_{metadata['estate_name']}_{metadata['start_date']}_"
+                    f"{metadata['end_date']}_{timestamp}.json")
+        engine.save_results(engine.settings.get_report_path(filename))
+        
+        return result
+    
+    finally:
+        # Cleanup
+        engine.cleanup()
+
+
+def _init_batch_worker():
+    """
+    Initializer proses worker batch: hentikan listener log saat worker selesai.
+    Proses hasil fork tidak menjalankan atexit, finalizer multiprocessing tetap dijalankan.
+    """
+    multiprocessing.util.Finalize(None, VerificationLogger._stop_all_listeners, exitpriority=0)
+
+
 class VerificationBatch:
     """
     Helper class untuk menjalankan verifikasi batch (multiple estates/periods).
@@ -473,69 +547,115 @@ class VerificationBatch:
         self.jobs.append(job)
         self.logger.info(f"Added verification job: {estate_name}")
     
-    def run_batch(self, template_name: str, **template_kwargs) -> List[Dict[str, Any]]:
+    def run_batch(self,
+                  template_name: str,
+                  max_workers: Optional[int] = None,
+                  mode: str = 'process',
+                  on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  **template_kwargs) -> List[Dict[str, Any]]:
         """
-        Jalankan semua job dalam batch.
+        Jalankan semua job dalam batch secara paralel.
+        
+        Setiap job memakai VerificationEngine dan template instance sendiri (lihat
+        _run_batch_job), sehingga job untuk estate/periode berbeda tidak saling menimpa
+        state engine dan bisa dijalankan bersamaan di process pool.
+        
+        Event dikirim lewat on_event dari thread pemanggil: 'queued' untuk setiap job saat
+        masuk antrian executor (sebelum worker mulai mengerjakannya), lalu 'finished' atau
+        'failed' saat job selesai (urutan selesai, bukan urutan job). Event berupa dict dengan kunci 'type', 'job_index', 'estate_name',
+        'start_date', 'end_date', 'completed', 'total', dan 'result'.
         
         Args:
             template_name: Nama template yang digunakan
-            **template_kwargs: Parameter template
+            max_workers: Jumlah job yang dijalankan bersamaan (default: Settings.BATCH_MAX_WORKERS)
+            mode: 'process' (default) atau 'thread'
+            on_event: Callback event progress per job (opsional)
+            **template_kwargs: Parameter template; pada mode 'process' harus bisa di-pickle
         
         Returns:
-            List: Hasil semua verifikasi
+            List: Hasil semua verifikasi dengan urutan sama seperti job
         """
+        if mode not in BATCH_WORKER_MODES:
+            raise ValueError(f"Mode worker tidak dikenal: {mode} (pilihan: {', '.join(BATCH_WORKER_MODES)})")
+        
         if not hasattr(self, 'jobs') or not self.jobs:
             self.logger.error("Tidak ada job untuk dijalankan")
             return []
         
-        # Load template sekali untuk semua job
-        if not self.engine.load_template(template_name, **template_kwargs):
-            self.logger.error(f"Gagal load template: {template_name}")
+        # Validasi template sekali sebelum worker dijalankan
+        validation = self.engine.validate_template(template_name)
+        if not validation['valid']:
+            self.logger.error(f"Gagal load template: {template_name} ({validation['errors']})")
             return []
         
-        batch_results = []
+        total = len(self.jobs)
+        workers = max(1, min(max_workers or self.engine.settings.BATCH_MAX_WORKERS, total))
+        if mode == 'process':
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+        batch_results = [None] * total
         
-        try:
+        self.logger.info(f"Running {total} jobs ({workers} paralel, mode {mode})")
+        
+        with executor:
+            futures = {}
             for i, job in enumerate(self.jobs):
-                self.logger.info(f"Running job {i+1}/{len(self.jobs)}: {job['estate_name']}")
-                
-                # Prepare verification
-                success = self.engine.prepare_verification(
-                    estate_name=job['estate_name'],
-                    start_date=job['start_date'],
-                    end_date=job['end_date'],
-                    **job['params']
-                )
-                
-                if not success:
+                future = executor.submit(_run_batch_job, self.engine.config_path,
+                                         template_name, template_kwargs, i, job)
+                futures[future] = i
+                self._emit(on_event, 'queued', i, total, None)
+            
+            completed = 0
+            for future in as_completed(futures):
+                i = futures[future]
+                job = self.jobs[i]
+                completed += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Proses worker mati atau hasil tidak bisa di-pickle
                     result = {
                         'job_index': i,
                         'estate_name': job['estate_name'],
                         'success': False,
-                        'error': 'Failed to prepare verification'
+                        'error': str(e)
                     }
-                    batch_results.append(result)
-                    continue
-                
-                # Run verification
-                result = self.engine.run_verification()
-                result['job_index'] = i
-                batch_results.append(result)
-                
-                # Save individual result
-                self.engine.save_results()
+                batch_results[i] = result
                 
-                self.logger.info(f"Job {i+1} completed: {result.get('success', False)}")
-        
-        finally:
-            # Cleanup
-            self.engine.cleanup()
+                self.logger.info(f"Job {i+1}/{total} completed ({job['estate_name']}): {result.get('success', False)}")
+                self._emit(on_event, 'finished' if result.get('success') else 'failed',
+                           i, total, completed, result)
         
         self.batch_results = batch_results
         self.logger.info(f"Batch completed: {len(batch_results)} jobs processed")
         
         return batch_results
     
+    def _emit(self,
+              on_event: Optional[Callable[[Dict[str, Any]], None]],
+              event_type: str,
+              job_index: int,
+              total: int,
+              completed: Optional[int],
+              result: Optional[Dict[str, Any]] = None):
+        """
+        Kirim event progress job ke on_event (jika ada).
+        """
+        if not on_event:
+            return
+        job = self.jobs[job_index]
+        on_event({
+            'type': event_type,
+            'job_index': job_index,
+            'estate_name': job['estate_name'],
+            'start_date': job['start_date'],
+            'end_date': job['end_date'],
+            'completed': completed,
+            'total': total,
+            'result': result
+        })
+    
     def get_batch_summary(self) -> Dict[str, Any]:
         """
         Dapatkan ringkasan hasil batch.
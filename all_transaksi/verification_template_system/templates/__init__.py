@@ -3,6 +3,6 @@ Templates Module
 Modul untuk template verifikasi yang dapat dikonfigurasi.
 """
 
-from .transaction_verification import TransactionVerificationTemplate
+from .transaction_verification import TransactionVerificationTemplate, ReferenceDataCache
 
-__all__ = ['TransactionVerificationTemplate']
\ No newline at end of file
+__all__ = ['TransactionVerificationTemplate', 'ReferenceDataCache']
\ No newline at end of file
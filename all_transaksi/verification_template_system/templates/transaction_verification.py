@@ -3,9 +3,12 @@ Transaction Verification Template
 Template untuk verifikasi transaksi FFB yang diekstrak dari gui_multi_estate_ffb_analysis.py
 """
 
+import copy
 import json
+import os
+import threading
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 import logging
@@ -14,6 +17,107 @@ from ..config.database_config import DatabaseConfig
 from ..config.settings import Settings
 
 
+class ReferenceDataCache:
+    """
+    Cache data referensi per database (employee mapping, daftar tabel, daftar divisi).
+    Dipakai bersama oleh semua instance template di proses ini, sehingga job batch
+    berikutnya untuk file .FDB yang sama tidak menjalankan query referensi lagi.
+    
+    Kunci database adalah (path absolut, mtime, ukuran) file: jika file berubah, data
+    lama tidak dipakai lagi.
+    """
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize cache.
+        
+        Args:
+            enabled: False untuk selalu menjalankan query referensi
+        """
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls) -> 'ReferenceDataCache':
+        """
+        Instance bersama untuk seluruh proses, dibuat saat pertama kali dipakai.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    @staticmethod
+    def database_identity(db_path: Optional[str]) -> Optional[Tuple[str, int, int]]:
+        """
+        Identitas file database.
+        
+        Args:
+            db_path: Path file database
+        
+        Returns:
+            Tuple: (path absolut, mtime, ukuran), None jika bukan file lokal
+        """
+        try:
+            stat = os.stat(db_path)
+        except (OSError, TypeError):
+            return None
+        return os.path.normcase(os.path.abspath(db_path)), stat.st_mtime_ns, stat.st_size
+    
+    def get(self, identity: Optional[Tuple[str, int, int]], key: Tuple) -> Optional[Any]:
+        """
+        Ambil data referensi dari cache.
+        
+        Args:
+            identity: Identitas database dari database_identity()
+            key: Kunci data, misalnya ('employee_mapping',)
+        
+        Returns:
+            Salinan data, None jika tidak ada di cache
+        """
+        if not self.enabled or identity is None:
+            return None
+        with self._lock:
+            cached_identity, values = self._entries.get(identity[0], (None, {}))
+            if cached_identity != identity or key not in values:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.copy(values[key])
+    
+    def put(self, identity: Optional[Tuple[str, int, int]], key: Tuple, value: Any):
+        """
+        Simpan data referensi ke cache.
+        
+        Args:
+            identity: Identitas database dari database_identity()
+            key: Kunci data
+            value: Data referensi
+        """
+        if not self.enabled or identity is None:
+            return
+        with self._lock:
+            cached_identity, values = self._entries.get(identity[0], (None, {}))
+            if cached_identity != identity:
+                # File database berubah: buang semua data lama untuk path ini
+                values = {}
+                self._entries[identity[0]] = (identity, values)
+            values[key] = copy.copy(value)
+    
+    def clear(self):
+        """
+        Hapus semua data cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
 class TransactionVerificationTemplate:
     """
     Template untuk verifikasi transaksi FFB.
@@ -44,6 +148,9 @@ class TransactionVerificationTemplate:
         
         # Cache untuk employee mapping
         self._employee_mapping = None
+        
+        # Cache data referensi bersama antar job untuk database yang sama
+        self.reference_cache = ReferenceDataCache.shared()
     
     def _load_template(self) -> Dict[str, Any]:
         """
@@ -71,6 +178,7 @@ class TransactionVerificationTemplate:
         """
         self.db_config = db_config
         self.connection = None  # Reset connection
+        self._employee_mapping = None  # Database lain; data bersama ada di reference_cache
     
     def connect_database(self):
         """
@@ -98,6 +206,17 @@ class TransactionVerificationTemplate:
             except Exception as e:
                 self.logger.error(f"Error menutup koneksi database: {e}")
     
+    def _database_identity(self) -> Optional[Tuple[str, int, int]]:
+        """
+        Identitas database aktif untuk reference_cache.
+        
+        Returns:
+            Tuple: (path absolut, mtime, ukuran), None jika database config belum di-set
+        """
+        if not self.db_config:
+            return None
+        return ReferenceDataCache.database_identity(self.db_config.db_path)
+    
     def get_employee_mapping(self) -> Dict[str, str]:
         """
         Dapatkan mapping employee ID ke nama.
@@ -109,6 +228,12 @@ class TransactionVerificationTemplate:
         if self._employee_mapping is not None:
             return self._employee_mapping
         
+        identity = self._database_identity()
+        mapping = self.reference_cache.get(identity, ('employee_mapping',))
+        if mapping is not None:
+            self._employee_mapping = mapping
+            return mapping
+        
         if not self.connection:
             raise ValueError("Koneksi database belum dibuat. Gunakan connect_database() terlebih dahulu.")
         
@@ -130,6 +255,7 @@ class TransactionVerificationTemplate:
             cursor.close()
             
             self._employee_mapping = mapping
+            self.reference_cache.put(identity, ('employee_mapping',), mapping)
             self.logger.info(f"Employee mapping berhasil dimuat: {len(mapping)} employees")
             
             return mapping
@@ -149,6 +275,11 @@ class TransactionVerificationTemplate:
         Returns:
             List: Daftar nama tabel
         """
+        identity = self._database_identity()
+        tables = self.reference_cache.get(identity, ('division_tables', start_date, end_date))
+        if tables is not None:
+            return tables
+        
         if not self.connection:
             raise ValueError("Koneksi database belum dibuat.")
         
@@ -169,6 +300,7 @@ class TransactionVerificationTemplate:
             
             cursor.close()
             
+            self.reference_cache.put(identity, ('division_tables', start_date, end_date), tables)
             self.logger.info(f"Ditemukan {len(tables)} tabel FFBSCANNERDATA")
             return tables
             
@@ -186,12 +318,17 @@ class TransactionVerificationTemplate:
         Returns:
             List: Daftar divisi
         """
-        if not self.connection:
-            raise ValueError("Koneksi database belum dibuat.")
-        
         if not tables:
             return []
         
+        identity = self._database_identity()
+        divisions = self.reference_cache.get(identity, ('divisions', tuple(tables)))
+        if divisions is not None:
+            return divisions
+        
+        if not self.connection:
+            raise ValueError("Koneksi database belum dibuat.")
+        
         query_config = self.template_config['queries']['divisions_from_tables']
         union_template = query_config['union_template']
         
@@ -215,6 +352,7 @@ class TransactionVerificationTemplate:
             
             cursor.close()
             
+            self.reference_cache.put(identity, ('divisions', tuple(tables)), divisions)
             self.logger.info(f"Ditemukan {len(divisions)} divisi")
             return divisions
             
@@ -254,6 +392,22 @@ class TransactionVerificationTemplate:
             self.logger.warning(f"Tidak ada data untuk divisi {division}")
             return self._create_empty_result(division, table_name)
         
+        return self._analyze_division_data(division, table_name, df, use_special_filter)
+    
+    def _analyze_division_data(self, division: str, table_name: str, df: pd.DataFrame,
+                               use_special_filter: bool) -> Dict[str, Any]:
+        """
+        Analisis data FFB satu divisi yang sudah diambil dari database.
+        
+        Args:
+            division: Nama divisi
+            table_name: Nama tabel FFBSCANNERDATA
+            df: DataFrame data FFB divisi (tidak kosong)
+            use_special_filter: True jika data diambil dengan filter TRANSSTATUS 704
+        
+        Returns:
+            Dict: Hasil analisis divisi
+        """
         # Dapatkan employee mapping
         employee_mapping = self.get_employee_mapping()
         
@@ -362,72 +516,130 @@ class TransactionVerificationTemplate:
             self.logger.error(f"Error mengambil data FFB dengan filter: {e}")
             raise
     
-    def _calculate_kerani_data(self, df: pd.DataFrame, employee_mapping: Dict[str, str]) -> Dict[str, Any]:
+    def _get_table_date_range(self, table_name: str) -> Tuple[Optional[date], Optional[date]]:
         """
-        Hitung data kerani berdasarkan duplikasi TRANSNO.
-        Implementasi logika kerani dari GUI original.
+        Dapatkan rentang TRANSDATE tabel (MIN/MAX) tanpa mengambil datanya.
         
         Args:
-            df: DataFrame data FFB
-            employee_mapping: Mapping employee ID ke nama
+            table_name: Nama tabel
         
         Returns:
-            Dict: Data kerani
+            Tuple: (tanggal minimum, tanggal maksimum), (None, None) jika tabel kosong
         """
-        comparison_fields = self.template_config['calculation_logic']['duplicate_handling']['comparison_fields']
+        query_config = self.template_config['queries']['table_date_range']
+        sql = query_config['sql_template'].format(table_name=table_name)
         
-        # Filter data PM (kerani)
-        kerani_df = df[df['RECORDTAG'] == 'PM'].copy()
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(sql)
+            row = cursor.fetchone()
+            cursor.close()
+        except Exception as e:
+            self.logger.error(f"Error mengambil rentang tanggal tabel {table_name}: {e}")
+            raise
         
-        if kerani_df.empty:
-            return {'employees': {}, 'totals': {field: 0 for field in comparison_fields}}
+        if not row or row[0] is None or row[1] is None:
+            return None, None
+        
+        return pd.Timestamp(row[0]).date(), pd.Timestamp(row[1]).date()
+    
+    def _get_ffb_data_divisions(self, table_name: str, divisions: List[str],
+                                transstatus: Optional[str] = None) -> pd.DataFrame:
+        """
+        Ambil data FFB granular semua divisi dari satu tabel dengan satu query.
+        
+        Args:
+            table_name: Nama tabel
+            divisions: Daftar divisi
+            transstatus: Status transaksi untuk filter (opsional)
+        
+        Returns:
+            DataFrame: Data FFB dengan kolom DIVISION (tanpa spasi padding CHAR)
+        """
+        query_name = 'ffb_granular_data_divisions_with_filter' if transstatus else 'ffb_granular_data_divisions'
+        query_config = self.template_config['queries'][query_name]
+        sql = query_config['sql_template'].format(
+            table_name=table_name,
+            division_placeholders=', '.join('?' for _ in divisions)
+        )
+        params = tuple(divisions) + ((transstatus,) if transstatus else ())
+        
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(sql, params)
+            
+            columns = [desc[0] for desc in cursor.description]
+            data = cursor.fetchall()
+            
+            cursor.close()
+            
+            df = pd.DataFrame(data, columns=columns)
+            df['DIVISION'] = df['DIVISION'].astype(str).str.strip()
+            
+            # Convert numeric columns
+            numeric_fields = self.template_config['validation_rules']['numeric_fields']
+            for field in numeric_fields:
+                if field in df.columns:
+                    df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
+            
+            return df
+            
+        except Exception as e:
+            self.logger.error(f"Error mengambil data FFB tabel {table_name}: {e}")
+            raise
+    
+    def _build_employees_data(self,
+                              role_df: pd.DataFrame,
+                              comparison_fields: List[str],
+                              employee_mapping: Dict[str, str],
+                              differences_df: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """
+        Bangun data per employee dari total hasil satu groupby('EMPID').
+        
+        Args:
+            role_df: DataFrame data FFB satu RECORDTAG
+            comparison_fields: Field yang dijumlahkan
+            employee_mapping: Mapping employee ID ke nama
+            differences_df: Perbedaan per EMPID (kerani saja, opsional)
+        
+        Returns:
+            Dict: Data employees dan total keseluruhan
+        """
+        fields = [field for field in comparison_fields if field in role_df.columns]
         
-        # Identifikasi duplikasi TRANSNO
-        duplicate_transno = kerani_df.groupby('TRANSNO').size()
-        duplicate_transno = duplicate_transno[duplicate_transno > 1].index.tolist()
+        # Satu groupby untuk semua employee; EMPID kosong (NaN) otomatis dilewati
+        totals_df = role_df.groupby('EMPID', sort=False)[fields].sum()
+        
+        # Kolom numpy agar nilai tetap bertipe numpy seperti Series.sum()
+        field_totals = {field: totals_df[field].to_numpy() for field in fields}
+        field_differences = {}
+        if differences_df is not None:
+            field_differences = {field: differences_df[field] for field in fields}
         
         employees_data = {}
         
-        for emp_id in kerani_df['EMPID'].unique():
-            if pd.isna(emp_id):
-                continue
-                
+        for position, emp_id in enumerate(totals_df.index):
             emp_id_str = str(emp_id).strip()
             emp_name = employee_mapping.get(emp_id_str, f"Unknown ({emp_id_str})")
             
-            emp_data = kerani_df[kerani_df['EMPID'] == emp_id]
-            
-            # Hitung total dan perbedaan untuk employee ini
             totals = {}
-            differences = {}
-            
             for field in comparison_fields:
-                if field in emp_data.columns:
-                    totals[field] = emp_data[field].sum()
-                    
-                    # Hitung perbedaan dari duplikasi
-                    emp_duplicates = emp_data[emp_data['TRANSNO'].isin(duplicate_transno)]
-                    if not emp_duplicates.empty:
-                        # Group by TRANSNO dan hitung perbedaan
-                        diff_sum = 0
-                        for transno in emp_duplicates['TRANSNO'].unique():
-                            transno_data = emp_duplicates[emp_duplicates['TRANSNO'] == transno]
-                            if len(transno_data) > 1:
-                                values = transno_data[field].values
-                                diff_sum += abs(max(values) - min(values))
-                        differences[field] = diff_sum
-                    else:
-                        differences[field] = 0
-                else:
-                    totals[field] = 0
-                    differences[field] = 0
+                totals[field] = field_totals[field][position] if field in field_totals else 0
             
             employees_data[emp_id_str] = {
                 'employee_id': emp_id_str,
                 'employee_name': emp_name,
-                'totals': totals,
-                'differences': differences
+                'totals': totals
             }
+            
+            if differences_df is not None:
+                differences = {}
+                for field in comparison_fields:
+                    if field in field_differences and emp_id in field_differences[field].index:
+                        differences[field] = field_differences[field][emp_id]
+                    else:
+                        differences[field] = 0
+                employees_data[emp_id_str]['differences'] = differences
         
         # Hitung total keseluruhan
         overall_totals = {}
@@ -439,6 +651,40 @@ class TransactionVerificationTemplate:
             'totals': overall_totals
         }
     
+    def _calculate_kerani_data(self, df: pd.DataFrame, employee_mapping: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Hitung data kerani berdasarkan duplikasi TRANSNO.
+        Implementasi logika kerani dari GUI original.
+        
+        Args:
+            df: DataFrame data FFB
+            employee_mapping: Mapping employee ID ke nama
+        
+        Returns:
+            Dict: Data kerani
+        """
+        comparison_fields = self.template_config['calculation_logic']['duplicate_handling']['comparison_fields']
+        
+        # Filter data PM (kerani)
+        kerani_df = df[df['RECORDTAG'] == 'PM']
+        
+        if kerani_df.empty:
+            return {'employees': {}, 'totals': {field: 0 for field in comparison_fields}}
+        
+        fields = [field for field in comparison_fields if field in kerani_df.columns]
+        
+        # Perbedaan dari duplikasi: TRANSNO dengan lebih dari satu record untuk employee yang sama,
+        # selisih max - min per field, dijumlahkan per employee
+        grouped = kerani_df.groupby(['EMPID', 'TRANSNO'], sort=False)
+        transno_stats = grouped[fields].agg(['max', 'min'])
+        duplicates = transno_stats[grouped.size() > 1]
+        spread = pd.DataFrame({
+            field: (duplicates[(field, 'max')] - duplicates[(field, 'min')]).abs() for field in fields
+        }, index=duplicates.index)
+        differences_df = spread.groupby(level='EMPID', sort=False).sum()
+        
+        return self._build_employees_data(kerani_df, comparison_fields, employee_mapping, differences_df)
+    
     def _calculate_mandor_data(self, df: pd.DataFrame, employee_mapping: Dict[str, str]) -> Dict[str, Any]:
         """
         Hitung data mandor berdasarkan RECORDTAG P1.
@@ -453,46 +699,12 @@ class TransactionVerificationTemplate:
         comparison_fields = self.template_config['calculation_logic']['duplicate_handling']['comparison_fields']
         
         # Filter data P1 (mandor)
-        mandor_df = df[df['RECORDTAG'] == 'P1'].copy()
+        mandor_df = df[df['RECORDTAG'] == 'P1']
         
         if mandor_df.empty:
             return {'employees': {}, 'totals': {field: 0 for field in comparison_fields}}
         
-        employees_data = {}
-        
-        # Group by EMPID
-        for emp_id in mandor_df['EMPID'].unique():
-            if pd.isna(emp_id):
-                continue
-                
-            emp_id_str = str(emp_id).strip()
-            emp_name = employee_mapping.get(emp_id_str, f"Unknown ({emp_id_str})")
-            
-            emp_data = mandor_df[mandor_df['EMPID'] == emp_id]
-            
-            # Hitung total untuk employee ini
-            totals = {}
-            for field in comparison_fields:
-                if field in emp_data.columns:
-                    totals[field] = emp_data[field].sum()
-                else:
-                    totals[field] = 0
-            
-            employees_data[emp_id_str] = {
-                'employee_id': emp_id_str,
-                'employee_name': emp_name,
-                'totals': totals
-            }
-        
-        # Hitung total keseluruhan
-        overall_totals = {}
-        for field in comparison_fields:
-            overall_totals[field] = sum(emp['totals'][field] for emp in employees_data.values())
-        
-        return {
-            'employees': employees_data,
-            'totals': overall_totals
-        }
+        return self._build_employees_data(mandor_df, comparison_fields, employee_mapping)
     
     def _calculate_asisten_data(self, df: pd.DataFrame, employee_mapping: Dict[str, str]) -> Dict[str, Any]:
         """
@@ -508,46 +720,12 @@ class TransactionVerificationTemplate:
         comparison_fields = self.template_config['calculation_logic']['duplicate_handling']['comparison_fields']
         
         # Filter data P5 (asisten)
-        asisten_df = df[df['RECORDTAG'] == 'P5'].copy()
+        asisten_df = df[df['RECORDTAG'] == 'P5']
         
         if asisten_df.empty:
             return {'employees': {}, 'totals': {field: 0 for field in comparison_fields}}
         
-        employees_data = {}
-        
-        # Group by EMPID
-        for emp_id in asisten_df['EMPID'].unique():
-            if pd.isna(emp_id):
-                continue
-                
-            emp_id_str = str(emp_id).strip()
-            emp_name = employee_mapping.get(emp_id_str, f"Unknown ({emp_id_str})")
-            
-            emp_data = asisten_df[asisten_df['EMPID'] == emp_id]
-            
-            # Hitung total untuk employee ini
-            totals = {}
-            for field in comparison_fields:
-                if field in emp_data.columns:
-                    totals[field] = emp_data[field].sum()
-                else:
-                    totals[field] = 0
-            
-            employees_data[emp_id_str] = {
-                'employee_id': emp_id_str,
-                'employee_name': emp_name,
-                'totals': totals
-            }
-        
-        # Hitung total keseluruhan
-        overall_totals = {}
-        for field in comparison_fields:
-            overall_totals[field] = sum(emp['totals'][field] for emp in employees_data.values())
-        
-        return {
-            'employees': employees_data,
-            'totals': overall_totals
-        }
+        return self._build_employees_data(asisten_df, comparison_fields, employee_mapping)
     
     def _calculate_verification_rates(self, kerani_data: Dict, mandor_data: Dict, asisten_data: Dict) -> Dict[str, Any]:
         """
@@ -711,28 +889,47 @@ class TransactionVerificationTemplate:
         
         # Tentukan bulan untuk filter khusus
         start_dt = datetime.strptime(start_date, '%Y%m%d')
+        end_dt = datetime.strptime(end_date, '%Y%m%d')
         month = start_dt.month
+        use_special_filter = (month == 5)
         
-        # Proses setiap divisi
-        results = {}
+        # Satu query per tabel untuk semua divisi, dipecah per divisi di memory
+        # (sebelumnya satu query per divisi x tabel, sebagian besar tanpa hasil).
+        # Rentang tanggal hanya dipakai untuk melewati tabel lewat probe MIN/MAX TRANSDATE;
+        # tabel yang dipakai dianalisis seluruhnya, sama seperti analyze_division().
+        division_results = {division: [] for division in divisions}
         
-        for division in divisions:
-            self.logger.info(f"Memproses divisi: {division}")
+        for table in tables:
+            try:
+                min_date, max_date = self._get_table_date_range(table)
+                if min_date is None or max_date < start_dt.date() or min_date > end_dt.date():
+                    self.logger.info(f"Tabel {table} tidak memiliki data di rentang tanggal, dilewati")
+                    continue
+                
+                df = self._get_ffb_data_divisions(table, divisions, "704" if use_special_filter else None)
+            except Exception as e:
+                self.logger.error(f"Error mengambil data tabel {table}: {e}")
+                continue
             
-            # Cari tabel yang sesuai untuk divisi ini
-            division_results = []
+            if use_special_filter:
+                self.logger.info(f"Menggunakan filter TRANSSTATUS 704 untuk bulan {month}")
             
-            for table in tables:
+            for division, division_df in df.groupby('DIVISION', sort=False):
+                if division not in division_results:
+                    continue
                 try:
-                    result = self.analyze_division(division, table, month)
-                    if result['summary']['total_records'] > 0:
-                        division_results.append(result)
+                    result = self._analyze_division_data(
+                        division, table, division_df.drop(columns='DIVISION').reset_index(drop=True),
+                        use_special_filter
+                    )
+                    division_results[division].append(result)
                 except Exception as e:
                     self.logger.error(f"Error menganalisis divisi {division} di tabel {table}: {e}")
                     continue
-            
-            if division_results:
-                results[division] = division_results
+        
+        # Urutan divisi sama seperti daftar divisi
+        results = {division: division_result for division, division_result in division_results.items()
+                   if division_result}
         
         # Buat summary
         summary = {
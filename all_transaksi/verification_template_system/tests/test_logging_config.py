@@ -334,6 +334,45 @@ class TestVerificationLogger(unittest.TestCase):
         self.assertEqual(len(self.logger.active_sessions), 0)
 
 
+class TestAsyncLogging(unittest.TestCase):
+    """Test cases for the QueueListener lifecycle of async VerificationLogger."""
+    
+    def tearDown(self):
+        """Stop listeners left by a failed test."""
+        VerificationLogger._stop_all_listeners()
+    
+    def _logger(self, name):
+        return VerificationLogger(name=name, enable_file_logging=False,
+                                  enable_console_logging=False, async_logging=True)
+    
+    def test_no_atexit_hook_per_instance(self):
+        """Creating loggers does not register atexit hooks that keep them alive."""
+        with patch('verification_template_system.core.logging_config.atexit.register') as register:
+            first = self._logger('async_test_a')
+            second = self._logger('async_test_a')
+        
+        register.assert_not_called()
+        # Logger baru dengan nama sama menggantikan listener lama
+        self.assertIs(VerificationLogger._listeners['async_test_a'], second.listener)
+        self.assertIsNot(first.listener, second.listener)
+        second.close()
+        self.assertNotIn('async_test_a', VerificationLogger._listeners)
+    
+    def test_stop_all_listeners(self):
+        """The module-level exit hook stops every active listener."""
+        loggers = [self._logger(name) for name in ('async_test_b', 'async_test_c')]
+        self.assertTrue(all(logger.listener._thread is not None for logger in loggers))
+        
+        VerificationLogger._stop_all_listeners()
+        
+        self.assertNotIn('async_test_b', VerificationLogger._listeners)
+        self.assertNotIn('async_test_c', VerificationLogger._listeners)
+        self.assertTrue(all(logger.listener._thread is None for logger in loggers))
+        # close() setelah hook atexit tidak menghentikan listener dua kali
+        for logger in loggers:
+            logger.close()
+
+
 class TestLoggingUtilities(unittest.TestCase):
     """Test cases for logging utility functions."""
     
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Unit tests for transaction verification template module.
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from verification_template_system.core.verification_engine import VerificationEngine
+from verification_template_system.config.database_config import DatabaseConfig
+from verification_template_system.templates.transaction_verification import (
+    ReferenceDataCache, TransactionVerificationTemplate
+)
+
+
+class CountingCursor:
+    """Cursor that answers reference queries and records executed SQL."""
+
+    def __init__(self, executed):
+        self.executed = executed
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        if 'RDB$RELATIONS' in sql:
+            self.rows = [('FFBSCANNERDATA05',)]
+        elif 'EMP' in sql and 'FFBSCANNERDATA' not in sql:
+            self.rows = [('E001', 'Kerani A'), ('E002', 'Mandor B')]
+        else:
+            self.rows = [('Air Kundo',), ('Air Batu',)]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class CountingConnection:
+    """Connection whose cursors share one list of executed SQL."""
+
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return CountingCursor(self.executed)
+
+    def close(self):
+        pass
+
+
+class TestReferenceDataCache(unittest.TestCase):
+    """Test cases for reference data shared between template instances."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "PTRJ_TEST.FDB")
+        with open(self.db_path, 'wb') as f:
+            f.write(b'fdb')
+        ReferenceDataCache.shared().clear()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        ReferenceDataCache.shared().clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run_reference_queries(self, estate_name):
+        """Prepare a new engine/template for the database and load all reference data."""
+        connection = CountingConnection()
+        with patch.object(DatabaseConfig, 'create_connection', return_value=connection):
+            engine = VerificationEngine(self.db_path)
+            self.assertTrue(engine.load_template('transaction_verification'))
+            self.assertTrue(engine.prepare_verification(estate_name, '2025-05-01', '2025-05-31'))
+
+        template = engine.current_template_instance
+        self.assertEqual(template.db_config.db_path, self.db_path)
+        self.assertEqual(template.db_config.estate_name, estate_name)
+
+        tables = template.get_division_tables('202505', '202505')
+        divisions = template.get_divisions(tables)
+        mapping = template.get_employee_mapping()
+        return template, connection.executed, (tables, divisions, mapping)
+
+    def test_second_instance_skips_reference_queries(self):
+        """A second template instance on the same .FDB reuses the reference data."""
+        first, first_queries, first_data = self._run_reference_queries('PGE 2B')
+        second, second_queries, second_data = self._run_reference_queries('PGE 2B')
+
+        self.assertIsNot(first, second)
+        self.assertEqual(len(first_queries), 3)
+        self.assertEqual(second_queries, [])
+        self.assertEqual(first_data, second_data)
+        self.assertEqual(first_data[2], {'E001': 'Kerani A', 'E002': 'Mandor B'})
+
+    def test_changed_database_runs_reference_queries_again(self):
+        """Reference data is reloaded when the database file changes."""
+        self._run_reference_queries('PGE 2B')
+
+        with open(self.db_path, 'ab') as f:
+            f.write(b'changed')
+
+        _, queries, _ = self._run_reference_queries('PGE 2B')
+        self.assertEqual(len(queries), 3)
+
+
+FFB_COLUMNS = ['DIVISION', 'TRANSNO', 'EMPID', 'RECORDTAG', 'RIPEBCH', 'UNRIPEBCH', 'BLACKBCH',
+               'ROTTENBCH', 'LONGSTALKBCH', 'RATDMGBCH', 'LOOSEFRUIT', 'TRANSSTATUS']
+
+
+class FirebirdLikeCursor:
+    """Cursor returning CHAR-padded values like Firebird, recording (sql, params)."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+        self.description = None
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append((sql, params))
+        self.description = None
+        if 'RDB$RELATIONS' in sql:
+            self.rows = [(table.ljust(31),) for table in self.connection.table_rows]
+        elif 'SELECT DISTINCT DIVISION' in sql:
+            self.rows = [('Air Kundo'.ljust(20),), ('Air Batu'.ljust(20),)]
+        elif 'FROM EMP' in sql:
+            self.rows = [('E001', 'Kerani A'), ('E002', 'Mandor B'), ('E003', 'Asisten C')]
+        elif 'MIN(TRANSDATE)' in sql:
+            table = sql.split(' FROM ')[1].split()[0]
+            dates = [transdate for transdate, _ in self.connection.table_rows[table]]
+            self.rows = [(min(dates), max(dates))] if dates else [(None, None)]
+        else:
+            table = sql.split(' FROM ')[1].split()[0]
+            rows = [row for _, row in self.connection.table_rows[table]]
+            if 'DIVISION = ?' in sql:
+                # Query per divisi (analyze_division): tanpa kolom DIVISION
+                rows = [row[1:] for row in rows if row[0].rstrip() == params[0]]
+                self.description = [(column, None) for column in FFB_COLUMNS[1:]]
+            else:
+                self.description = [(column, None) for column in FFB_COLUMNS]
+            self.rows = rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FirebirdLikeConnection:
+    """Connection with per-table FFB rows as (TRANSDATE, row) pairs."""
+
+    def __init__(self, table_rows):
+        self.table_rows = table_rows
+        self.executed = []
+
+    def cursor(self):
+        return FirebirdLikeCursor(self)
+
+    def close(self):
+        pass
+
+
+class TestRunVerificationPartitioning(unittest.TestCase):
+    """Test cases for the one-query-per-table plan of run_verification."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "PTRJ_TEST.FDB")
+        with open(self.db_path, 'wb') as f:
+            f.write(b'fdb')
+        ReferenceDataCache.shared().clear()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        ReferenceDataCache.shared().clear()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _row(self, transdate, division, transno, empid, recordtag, ripe):
+        return transdate, (division.ljust(20), transno, empid, recordtag, ripe, 0, 0, 0, 0, 0, 1, 731)
+
+    def _template(self, connection):
+        template = TransactionVerificationTemplate()
+        template.set_database_config(DatabaseConfig(self.db_path))
+        template.connection = connection
+        return template
+
+    def _data_queries(self, connection):
+        return [(sql, params) for sql, params in connection.executed if 'DIVISION IN' in sql]
+
+    def test_one_query_per_table_with_padded_divisions(self):
+        """Each table is queried once for all divisions; padded DIVISION values are partitioned."""
+        table_rows = {
+            'FFBSCANNERDATA04': [
+                self._row(date(2025, 4, 2), 'Air Kundo', 'T1', 'E001', 'PM', 10),
+                self._row(date(2025, 4, 2), 'Air Kundo', 'T1', 'E002', 'P1', 10),
+                self._row(date(2025, 4, 3), 'Air Batu', 'T2', 'E001', 'PM', 7),
+            ],
+            # Tabel kosong: dilewati tanpa query data
+            'FFBSCANNERDATA05': [],
+        }
+        connection = FirebirdLikeConnection(table_rows)
+
+        result = self._template(connection).run_verification('20250401', '20250531')
+
+        data_queries = self._data_queries(connection)
+        self.assertEqual(len(data_queries), 1)
+        sql, params = data_queries[0]
+        self.assertIn("FROM FFBSCANNERDATA04 ", sql)
+        self.assertIn("DIVISION IN (?, ?)", sql)
+        self.assertEqual(params, ('Air Kundo', 'Air Batu'))
+
+        divisions = result['divisions']
+        self.assertEqual(list(divisions), ['Air Kundo', 'Air Batu'])
+        self.assertEqual([r['table_name'] for r in divisions['Air Kundo']], ['FFBSCANNERDATA04'])
+        self.assertEqual(divisions['Air Kundo'][0]['summary']['total_records'], 2)
+        self.assertEqual(divisions['Air Batu'][0]['summary']['total_records'], 1)
+        self.assertEqual(result['summary']['total_tables'], 2)
+
+    def test_partial_month_range(self):
+        """A partial-month range skips tables outside it and keeps whole-table rows, like analyze_division."""
+        table_rows = {
+            'FFBSCANNERDATA04': [
+                self._row(date(2025, 4, 2), 'Air Kundo', 'T1', 'E001', 'PM', 10),
+                self._row(date(2025, 4, 12), 'Air Kundo', 'T2', 'E001', 'PM', 8),
+                self._row(date(2025, 4, 12), 'Air Kundo', 'T2', 'E002', 'P1', 8),
+                self._row(date(2025, 4, 28), 'Air Kundo', 'T3', 'E001', 'PM', 5),
+            ],
+            'FFBSCANNERDATA05': [
+                self._row(date(2025, 5, 20), 'Air Kundo', 'T4', 'E001', 'PM', 9),
+            ],
+        }
+        connection = FirebirdLikeConnection(table_rows)
+        template = self._template(connection)
+
+        result = template.run_verification('20250410', '20250415')
+
+        # FFBSCANNERDATA05 tidak beririsan dengan rentang: hanya probe MIN/MAX, tanpa query data
+        data_queries = self._data_queries(connection)
+        self.assertEqual(len(data_queries), 1)
+        self.assertIn("FROM FFBSCANNERDATA04 ", data_queries[0][0])
+        self.assertNotIn("TRANSDATE BETWEEN", data_queries[0][0])
+
+        # Baris di luar 10-15 April ikut dihitung, sama seperti analyze_division untuk tabel yang sama
+        division_results = result['divisions']['Air Kundo']
+        self.assertEqual([r['table_name'] for r in division_results], ['FFBSCANNERDATA04'])
+        self.assertEqual(division_results[0]['summary']['total_records'], 4)
+        expected = template.analyze_division('Air Kundo', 'FFBSCANNERDATA04', month=4)
+        self.assertEqual(division_results[0]['summary'], expected['summary'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,9 +6,16 @@ Unit tests for verification engine module.
 import unittest
 import tempfile
 import json
+import logging
+import logging.handlers
+import multiprocessing
 import os
 import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
 from unittest.mock import patch, MagicMock, Mock
 
@@ -17,7 +24,66 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from verification_template_system.core.verification_engine import VerificationEngine, VerificationBatch
+from verification_template_system.core.logging_config import VerificationLogger
 from verification_template_system.config.database_config import DatabaseConfig
+from verification_template_system.config.settings import Settings
+
+ENGINE_LOGGER = 'verification_template_system.core.verification_engine'
+
+
+# Waktu kerja per estate untuk StubEngine: job pertama selesai paling akhir
+STUB_DELAYS = {'Estate1': 0.4, 'Estate2': 0.0, 'Estate3': 0.2}
+
+
+class StubEngine:
+    """Per-job engine for process-mode batches; module-level so results pickle back from workers."""
+    
+    def __init__(self, config_path=None):
+        self.config_path = config_path
+        self.settings = MagicMock()
+        self.verification_metadata = {}
+    
+    def load_template(self, template_name, **template_kwargs):
+        self.template_kwargs = template_kwargs
+        return True
+    
+    def prepare_verification(self, estate_name, start_date, end_date, **params):
+        self.verification_metadata = {'estate_name': estate_name, 'start_date': start_date,
+                                      'end_date': end_date, 'params': params}
+        return True
+    
+    def run_verification(self):
+        estate = self.verification_metadata['estate_name']
+        time.sleep(STUB_DELAYS[estate])
+        return {'success': estate != 'Estate3',
+                'data': {'estate': estate, 'pid': os.getpid(),
+                         'template_kwargs': self.template_kwargs,
+                         'params': self.verification_metadata['params']}}
+    
+    def save_results(self, path):
+        pass
+    
+    def cleanup(self):
+        pass
+
+
+class LoggingStubEngine(StubEngine):
+    """StubEngine that logs through the real engine log setup from inside a batch worker."""
+    
+    LOG_LINES = 100
+    
+    def __init__(self, config_path=None):
+        super().__init__(config_path)
+        self.settings = Settings()
+        self.logger = logging.getLogger(ENGINE_LOGGER)
+        VerificationEngine._setup_verification_logging(self)
+    
+    def run_verification(self):
+        estate = self.verification_metadata['estate_name']
+        for i in range(self.LOG_LINES):
+            self.logger.info(f"{estate} line {i}")
+        self.logger.info(f"{estate} done")
+        return {'success': True, 'data': {'estate': estate}}
 
 
 class TestVerificationEngine(unittest.TestCase):
@@ -284,7 +350,7 @@ class TestVerificationBatch(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures."""
         self.temp_dir = tempfile.mkdtemp()
-        self.batch = VerificationBatch()
+        self.batch = VerificationBatch(self._batch_engine())
     
     def tearDown(self):
         """Clean up test fixtures."""
@@ -355,69 +421,201 @@ class TestVerificationBatch(unittest.TestCase):
         
         self.assertEqual(len(self.batch.jobs), 0)
     
+    def _batch_engine(self):
+        """Batch engine: run_batch only uses validate_template, settings and config_path."""
+        engine = MagicMock()
+        engine.validate_template.return_value = {'valid': True, 'errors': []}
+        engine.settings.BATCH_MAX_WORKERS = 4
+        engine.config_path = None
+        return engine
+    
+    def _job_engine(self, run_verification):
+        """Per-job engine (created by _run_batch_job) calling run_verification(estate_name)."""
+        engine = MagicMock()
+        engine.load_template.return_value = True
+        engine.prepare_verification.side_effect = lambda estate_name, **kwargs: (
+            setattr(engine, 'verification_metadata', {
+                'estate_name': estate_name,
+                'start_date': kwargs['start_date'],
+                'end_date': kwargs['end_date']
+            }) or True
+        )
+        engine.run_verification.side_effect = lambda: run_verification(
+            engine.verification_metadata['estate_name']
+        )
+        return engine
+    
+    def _patched_engine_class(self, mock_engine_class, run_verification):
+        mock_engine_class.side_effect = lambda config_path=None: self._job_engine(run_verification)
+    
     @patch('verification_template_system.core.verification_engine.VerificationEngine')
     def test_run_all_success(self, mock_engine_class):
         """Test successful batch execution."""
-        # Setup mock engine
-        mock_engine = MagicMock()
-        mock_engine.run_verification.return_value = {
+        self._patched_engine_class(mock_engine_class, lambda estate: {
             'success': True,
-            'job_id': 'test_job_1',
-            'data': {'test': 'result'}
-        }
-        mock_engine_class.return_value = mock_engine
+            'data': {'estate': estate}
+        })
         
-        # Add jobs
-        job_id1 = self.batch.add_job('template1', 'Estate1', '2024-01-01', '2024-01-31')
-        job_id2 = self.batch.add_job('template2', 'Estate2', '2024-02-01', '2024-02-28')
+        batch = VerificationBatch(self._batch_engine())
+        batch.add_verification_job('Estate1', '2024-01-01', '2024-01-31')
+        batch.add_verification_job('Estate2', '2024-02-01', '2024-02-28')
         
-        # Run batch
-        results = self.batch.run_all()
+        results = batch.run_batch('transaction_verification', mode='thread')
         
         self.assertEqual(len(results), 2)
         self.assertTrue(all(r['success'] for r in results))
+        self.assertEqual([r['data']['estate'] for r in results], ['Estate1', 'Estate2'])
         
-        # Verify engine was called correctly
-        self.assertEqual(mock_engine.run_verification.call_count, 2)
+        # One engine per job
+        self.assertEqual(mock_engine_class.call_count, 2)
+        self.assertEqual(batch.get_batch_summary()['successful_jobs'], 2)
     
     @patch('verification_template_system.core.verification_engine.VerificationEngine')
     def test_run_all_with_failures(self, mock_engine_class):
         """Test batch execution with some failures."""
-        # Setup mock engine with mixed results
-        mock_engine = MagicMock()
-        mock_engine.run_verification.side_effect = [
-            {'success': True, 'data': {'test': 'result1'}},
-            {'success': False, 'error': 'Test error'},
-            {'success': True, 'data': {'test': 'result3'}}
-        ]
-        mock_engine_class.return_value = mock_engine
-        
-        # Add jobs
-        self.batch.add_job('template1', 'Estate1', '2024-01-01', '2024-01-31')
-        self.batch.add_job('template2', 'Estate2', '2024-02-01', '2024-02-28')
-        self.batch.add_job('template3', 'Estate3', '2024-03-01', '2024-03-31')
+        def run_verification(estate):
+            if estate == 'Estate2':
+                return {'success': False, 'error': 'Test error'}
+            if estate == 'Estate3':
+                raise RuntimeError('Worker error')
+            return {'success': True, 'data': {'estate': estate}}
         
-        # Run batch
-        results = self.batch.run_all()
+        self._patched_engine_class(mock_engine_class, run_verification)
         
-        self.assertEqual(len(results), 3)
+        batch = VerificationBatch(self._batch_engine())
+        batch.add_verification_job('Estate1', '2024-01-01', '2024-01-31')
+        batch.add_verification_job('Estate2', '2024-02-01', '2024-02-28')
+        batch.add_verification_job('Estate3', '2024-03-01', '2024-03-31')
         
-        # Check results
-        successful_results = [r for r in results if r['success']]
-        failed_results = [r for r in results if not r['success']]
+        results = batch.run_batch('transaction_verification', mode='thread')
         
-        self.assertEqual(len(successful_results), 2)
-        self.assertEqual(len(failed_results), 1)
-        self.assertEqual(failed_results[0]['error'], 'Test error')
+        self.assertEqual(len(results), 3)
+        self.assertEqual([r['success'] for r in results], [True, False, False])
+        self.assertEqual(results[1]['error'], 'Test error')
+        self.assertEqual(results[2]['error'], 'Worker error')
+        self.assertEqual(results[2]['job_index'], 2)
+        self.assertEqual(batch.get_batch_summary()['failed_jobs'], 2)
     
     @patch('verification_template_system.core.verification_engine.VerificationEngine')
     def test_run_all_empty_batch(self, mock_engine_class):
         """Test running empty batch."""
-        results = self.batch.run_all()
+        batch = VerificationBatch(self._batch_engine())
+        results = batch.run_batch('transaction_verification', mode='thread')
         
         self.assertEqual(len(results), 0)
         mock_engine_class.assert_not_called()
     
+    @patch('verification_template_system.core.verification_engine.VerificationEngine')
+    def test_run_batch_result_order(self, mock_engine_class):
+        """Results follow job order even when jobs finish in a different order."""
+        delays = {'Estate1': 0.3, 'Estate2': 0.0, 'Estate3': 0.15}
+        
+        def run_verification(estate):
+            time.sleep(delays[estate])
+            return {'success': True, 'data': {'estate': estate}}
+        
+        self._patched_engine_class(mock_engine_class, run_verification)
+        
+        batch = VerificationBatch(self._batch_engine())
+        for estate in delays:
+            batch.add_verification_job(estate, '2024-01-01', '2024-01-31')
+        
+        events = []
+        results = batch.run_batch('transaction_verification', max_workers=3, mode='thread',
+                                  on_event=events.append)
+        
+        self.assertEqual([r['data']['estate'] for r in results], ['Estate1', 'Estate2', 'Estate3'])
+        self.assertEqual([r['job_index'] for r in results], [0, 1, 2])
+        finished = [event['estate_name'] for event in events if event['type'] == 'finished']
+        self.assertEqual(finished, ['Estate2', 'Estate3', 'Estate1'])
+    
+    @patch('verification_template_system.core.verification_engine.VerificationEngine')
+    def test_run_batch_event_sequence(self, mock_engine_class):
+        """All jobs are queued first, then each job finishes or fails exactly once."""
+        self._patched_engine_class(mock_engine_class, lambda estate: {
+            'success': estate != 'Estate2',
+            'data': {'estate': estate}
+        })
+        
+        batch = VerificationBatch(self._batch_engine())
+        for estate in ('Estate1', 'Estate2', 'Estate3'):
+            batch.add_verification_job(estate, '2024-01-01', '2024-01-31')
+        
+        events = []
+        batch.run_batch('transaction_verification', max_workers=2, mode='thread', on_event=events.append)
+        
+        self.assertEqual(len(events), 6)
+        self.assertEqual([(e['type'], e['job_index']) for e in events[:3]],
+                         [('queued', 0), ('queued', 1), ('queued', 2)])
+        self.assertTrue(all(e['completed'] is None and e['result'] is None for e in events[:3]))
+        
+        done = events[3:]
+        self.assertEqual([e['completed'] for e in done], [1, 2, 3])
+        self.assertTrue(all(e['total'] == 3 for e in events))
+        self.assertEqual(sorted(e['job_index'] for e in done), [0, 1, 2])
+        types = {e['estate_name']: e['type'] for e in done}
+        self.assertEqual(types, {'Estate1': 'finished', 'Estate2': 'failed', 'Estate3': 'finished'})
+    
+    @patch('verification_template_system.core.verification_engine.VerificationEngine')
+    def test_run_batch_thread_mode(self, mock_engine_class):
+        """mode='thread' runs jobs concurrently in worker threads of this process."""
+        barrier = threading.Barrier(2, timeout=5)
+        
+        def run_verification(estate):
+            # Both jobs must run at the same time to pass the barrier
+            barrier.wait()
+            return {'success': True, 'data': {'thread': threading.get_ident(), 'pid': os.getpid()}}
+        
+        self._patched_engine_class(mock_engine_class, run_verification)
+        
+        batch = VerificationBatch(self._batch_engine())
+        batch.add_verification_job('Estate1', '2024-01-01', '2024-01-31')
+        batch.add_verification_job('Estate2', '2024-01-01', '2024-01-31')
+        
+        results = batch.run_batch('transaction_verification', max_workers=2, mode='thread')
+        
+        self.assertTrue(all(r['success'] for r in results))
+        threads = {r['data']['thread'] for r in results}
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual({r['data']['pid'] for r in results}, {os.getpid()})
+    
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), "requires fork start method")
+    def test_run_batch_process_mode(self):
+        """mode='process' pickles jobs and results across worker processes and keeps job order."""
+        # fork: worker processes inherit the patched VerificationEngine
+        fork_executor = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('fork'))
+        with patch('verification_template_system.core.verification_engine.VerificationEngine', StubEngine), \
+                patch('verification_template_system.core.verification_engine.ProcessPoolExecutor', fork_executor):
+            batch = VerificationBatch(self._batch_engine())
+            for estate in STUB_DELAYS:
+                batch.add_verification_job(estate, '2024-01-01', '2024-01-31', division='Air Kundo')
+            
+            events = []
+            results = batch.run_batch('transaction_verification', max_workers=3,
+                                      on_event=events.append, template_path='stub.json')
+        
+        self.assertEqual([r['job_index'] for r in results], [0, 1, 2])
+        self.assertEqual([r['data']['estate'] for r in results], ['Estate1', 'Estate2', 'Estate3'])
+        self.assertEqual([r['success'] for r in results], [True, True, False])
+        self.assertNotIn(os.getpid(), {r['data']['pid'] for r in results})
+        self.assertTrue(all(r['data']['template_kwargs'] == {'template_path': 'stub.json'} for r in results))
+        self.assertTrue(all(r['data']['params'] == {'division': 'Air Kundo'} for r in results))
+        
+        self.assertEqual([(e['type'], e['job_index']) for e in events[:3]],
+                         [('queued', 0), ('queued', 1), ('queued', 2)])
+        done = [(e['type'], e['estate_name']) for e in events[3:]]
+        self.assertEqual(done, [('finished', 'Estate2'), ('failed', 'Estate3'), ('finished', 'Estate1')])
+        self.assertEqual([e['completed'] for e in events[3:]], [1, 2, 3])
+    
+    def test_run_batch_invalid_mode(self):
+        """Unknown worker mode raises ValueError."""
+        batch = VerificationBatch(self._batch_engine())
+        batch.add_verification_job('Estate1', '2024-01-01', '2024-01-31')
+        
+        with self.assertRaises(ValueError):
+            batch.run_batch('transaction_verification', mode='fiber')
+    
     def test_get_batch_summary(self):
         """Test getting batch summary."""
         # Add jobs
@@ -431,6 +629,69 @@ class TestVerificationBatch(unittest.TestCase):
         self.assertEqual(len(summary['jobs']), 2)
 
 
+class TestEngineLogging(unittest.TestCase):
+    """Engine log records go through a QueueListener, also inside batch workers."""
+    
+    def setUp(self):
+        """Point the engine log at a temp dir with no listener running yet."""
+        self.temp_dir = tempfile.mkdtemp()
+        patcher = patch.object(Settings, 'LOGS_DIR', Path(self.temp_dir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.log_file = Settings.get_log_path("verification_engine.log")
+        logger = logging.getLogger(ENGINE_LOGGER)
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.INFO)
+        VerificationLogger._stop_listener(ENGINE_LOGGER)
+    
+    def tearDown(self):
+        """Stop the temp-dir listener and clean up."""
+        VerificationLogger._stop_listener(ENGINE_LOGGER)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_engine_logger_is_queued(self):
+        """Engines share one QueueHandler; no handler on the logger writes the file directly."""
+        VerificationEngine()
+        VerificationEngine()
+        
+        handlers = logging.getLogger(ENGINE_LOGGER).handlers
+        self.assertEqual(sum(isinstance(h, logging.handlers.QueueHandler) for h in handlers), 1)
+        self.assertFalse(any(isinstance(h, logging.FileHandler) for h in handlers))
+        
+        VerificationLogger._stop_listener(ENGINE_LOGGER)
+        text = self.log_file.read_text(encoding='utf-8')
+        self.assertEqual(text.count("Verification engine initialized"), 2)
+    
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), "requires fork start method")
+    def test_process_workers_flush_log_on_exit(self):
+        """Records still queued when a forked batch worker exits are written to the log."""
+        fork_executor = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('fork'))
+        engine = MagicMock()
+        engine.validate_template.return_value = {'valid': True, 'errors': []}
+        engine.config_path = None
+        file_emit = logging.FileHandler.emit
+        
+        def slow_emit(handler, record):
+            # The listener is still writing when the worker has returned and the pool shuts down
+            if handler.baseFilename == str(self.log_file):
+                time.sleep(0.005)
+            file_emit(handler, record)
+        
+        with patch('verification_template_system.core.verification_engine.VerificationEngine', LoggingStubEngine), \
+                patch('verification_template_system.core.verification_engine.ProcessPoolExecutor', fork_executor), \
+                patch.object(logging.FileHandler, 'emit', slow_emit):
+            batch = VerificationBatch(engine)
+            for estate in ('Estate1', 'Estate2'):
+                batch.add_verification_job(estate, '2024-01-01', '2024-01-31')
+            results = batch.run_batch('transaction_verification', max_workers=2)
+        
+        self.assertTrue(all(r['success'] for r in results))
+        text = self.log_file.read_text(encoding='utf-8')
+        for estate in ('Estate1', 'Estate2'):
+            self.assertEqual(text.count(f"{estate} line "), LoggingStubEngine.LOG_LINES)
+            self.assertIn(f"{estate} done", text)
+
+
 class TestVerificationEngineIntegration(unittest.TestCase):
     """Integration tests for VerificationEngine."""
     
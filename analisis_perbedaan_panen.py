@@ -2,12 +2,15 @@
 Program untuk menganalisis perbedaan data panen antara Kerani dan Asisten.
 """
 import os
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta, date
 import calendar
 import argparse
-from firebird_connector import FirebirdConnector
+from firebird_connector import (FirebirdConnector, SnapshotCache, ReferenceCache, set_log_level,
+                                plan_month_partitions, fetch_partitions, normalize_key_columns,
+                                DEFAULT_PARTITION_WORKERS)
 from pdf_report_advanced import generate_advanced_pdf_report
 
 def get_employee_mapping(connector):
@@ -21,46 +24,10 @@ def get_employee_mapping(connector):
         dict: Mapping dari ID ke NAME
     """
     print("Mendapatkan data mapping ID ke NAME dari tabel EMP...")
-    query = """
-    SELECT ID, NAME
-    FROM EMP
-    """
-
-    result = connector.execute_query(query)
-    df = connector.to_pandas(result)
-
-    # Buat mapping dari ID ke NAME
-    employee_mapping = {}
-
-    # Jika berhasil mendapatkan data dari database
-    if not df.empty:
-        print(f"Berhasil mendapatkan {len(df)} data karyawan dari database.")
-
-        # Cari kolom yang berisi ID dan NAME
-        id_col = None
-        name_col = None
+    employee_mapping = ReferenceCache.shared().get(connector, 'employee')
 
-        # Cari kolom ID
-        for col in df.columns:
-            if 'ID' in col.upper() and id_col is None:
-                id_col = col
-                print(f"Menggunakan kolom {col} sebagai ID")
-
-        # Cari kolom NAME
-        for col in df.columns:
-            if 'NAME' in col.upper() and name_col is None:
-                name_col = col
-                print(f"Menggunakan kolom {col} sebagai NAME")
-
-        # Jika kedua kolom ditemukan, buat mapping
-        if id_col is not None and name_col is not None:
-            for _, row in df.iterrows():
-                emp_id = str(row[id_col]).strip()
-                emp_name = str(row[name_col]).strip()
-                if emp_id and emp_name:
-                    employee_mapping[emp_id] = emp_name
-
-            print(f"Berhasil membuat mapping untuk {len(employee_mapping)} karyawan dari database.")
+    if employee_mapping:
+        print(f"Berhasil membuat mapping untuk {len(employee_mapping)} karyawan dari database.")
     else:
         print("Tidak dapat mendapatkan data EMP dari database.")
 
@@ -110,67 +77,13 @@ def get_transstatus_mapping(connector):
         dict: Mapping kode TRANSSTATUS ke deskripsi
     """
     print("Mendapatkan data mapping TRANSSTATUS dari tabel LOOKUP...")
-    query = """
-    SELECT a.ID, a.SHORTCODE, a.NAME
-    FROM LOOKUP a
-    """
-    result = connector.execute_query(query)
-    df = connector.to_pandas(result)
+    transstatus_mapping = ReferenceCache.shared().get(connector, 'transstatus')
 
-    if df.empty:
+    if not transstatus_mapping:
         print("Tidak dapat mendapatkan data LOOKUP.")
         return {}
 
-    # Buat mapping dari ID ke NAME
-    transstatus_mapping = {}
-
-    # Cari kolom ID dan NAME
-    id_col = None
-    name_col = None
-
-    # Cari kolom ID
-    for col in df.columns:
-        if 'ID' == col.upper() or col.upper() == 'ID':
-            id_col = col
-            print(f"Menggunakan kolom {col} sebagai ID")
-            break
-
-    # Jika tidak ditemukan, coba cari dengan cara lain
-    if id_col is None:
-        for col in df.columns:
-            if 'ID' in col.upper() and id_col is None:
-                id_col = col
-                print(f"Menggunakan kolom {col} sebagai ID")
-                break
-
-    # Cari kolom NAME
-    for col in df.columns:
-        if 'NAME' == col.upper() or col.upper() == 'NAME':
-            name_col = col
-            print(f"Menggunakan kolom {col} sebagai NAME")
-            break
-
-    # Jika tidak ditemukan, coba cari dengan cara lain
-    if name_col is None:
-        for col in df.columns:
-            if 'NAME' in col.upper() and name_col is None:
-                name_col = col
-                print(f"Menggunakan kolom {col} sebagai NAME")
-                break
-
-    # Jika kedua kolom ditemukan, buat mapping
-    if id_col is not None and name_col is not None:
-        for _, row in df.iterrows():
-            status_id = str(row[id_col]).strip() if row[id_col] else ''
-            status_name = str(row[name_col]).strip() if row[name_col] else ''
-
-            # Hanya tambahkan jika kedua nilai tidak kosong
-            if status_id and status_name:
-                transstatus_mapping[status_id] = status_name
-
-        print(f"Berhasil membuat mapping untuk {len(transstatus_mapping)} status dari database.")
-    else:
-        print("Tidak dapat menemukan kolom ID atau NAME dalam hasil query.")
+    print(f"Berhasil membuat mapping untuk {len(transstatus_mapping)} status dari database.")
 
     # Tambahkan beberapa mapping default untuk status yang sering digunakan (sebagai fallback)
     default_mapping = {
@@ -210,80 +123,13 @@ def get_field_mapping(connector):
         dict: Mapping dari FieldID ke FieldNo
     """
     print("Mendapatkan data mapping FieldID ke FieldNo...")
-    query = """
-    SELECT ID, FIELDNO
-    FROM OCFIELD
-    """
+    field_mapping = ReferenceCache.shared().get(connector, 'field')
 
-    result = connector.execute_query(query)
-    df = connector.to_pandas(result)
-
-    if df.empty:
+    if not field_mapping:
         print("Tidak dapat mendapatkan data OCFIELD.")
         return {}
 
-    # Buat mapping dari FieldID ke FieldNo
-    field_mapping = {}
-
-    # Cari kolom ID dan FIELDNO
-    id_col = None
-    fieldno_col = None
-
-    # Cari kolom ID
-    for col in df.columns:
-        if 'ID' == col.upper() or col.upper() == 'ID':
-            id_col = col
-            print(f"Menggunakan kolom {col} sebagai ID")
-            break
-
-    # Jika tidak ditemukan, coba cari dengan cara lain
-    if id_col is None:
-        for col in df.columns:
-            if 'ID' in col.upper() and id_col is None:
-                id_col = col
-                print(f"Menggunakan kolom {col} sebagai ID")
-                break
-
-    # Cari kolom FIELDNO
-    for col in df.columns:
-        if 'FIELDNO' == col.upper() or col.upper() == 'FIELDNO':
-            fieldno_col = col
-            print(f"Menggunakan kolom {col} sebagai FIELDNO")
-            break
-
-    # Jika tidak ditemukan, coba cari dengan cara lain
-    if fieldno_col is None:
-        for col in df.columns:
-            if 'FIELDNO' in col.upper() and fieldno_col is None:
-                fieldno_col = col
-                print(f"Menggunakan kolom {col} sebagai FIELDNO")
-                break
-
-    # Jika kedua kolom ditemukan, buat mapping
-    if id_col is not None and fieldno_col is not None:
-        for _, row in df.iterrows():
-            field_id = str(row[id_col]).strip() if row[id_col] else ''
-            field_no = str(row[fieldno_col]).strip() if row[fieldno_col] else ''
-
-            # Hanya tambahkan jika kedua nilai tidak kosong
-            if field_id and field_no:
-                field_mapping[field_id] = field_no
-
-        print(f"Berhasil membuat mapping untuk {len(field_mapping)} field dari database.")
-    else:
-        print("Tidak dapat menemukan kolom ID atau FIELDNO dalam hasil query.")
-
-        # Jika ada kolom 'ID FIELDNO' yang berisi data dalam format "ID FIELDNO"
-        if 'ID FIELDNO' in df.columns:
-            for _, row in df.iterrows():
-                value = row['ID FIELDNO']
-                if value and isinstance(value, str):
-                    parts = value.strip().split()
-                    if len(parts) >= 2:
-                        field_id = parts[0].strip()
-                        field_no = ' '.join(parts[1:]).strip()
-                        if field_id.isdigit() and field_no:
-                            field_mapping[field_id] = field_no
+    print(f"Berhasil membuat mapping untuk {len(field_mapping)} field dari database.")
 
     # Tambahkan beberapa mapping default untuk field yang sering digunakan (sebagai fallback)
     default_mapping = {
@@ -302,27 +148,171 @@ def get_field_mapping(connector):
     print(f"Berhasil mendapatkan mapping total untuk {len(field_mapping)} field.")
     return field_mapping
 
-def get_duplicate_transno_data(connector, start_date, end_date, limit=None):
+# Kolom FFBSCANNERDATA yang diambil untuk analisis perbedaan
+FFB_COLUMNS = """a.ID, a.SCANUSERID, a.OCID, a.WORKERID, a.CARRIERID, a.FIELDID, a.TASKNO,
+               a.RIPEBCH, a.UNRIPEBCH, a.BLACKBCH, a.ROTTENBCH, a.LONGSTALKBCH, a.RATDMGBCH,
+               a.LOOSEFRUIT, a.TRANSNO, a.TRANSDATE, a.TRANSTIME, a.UPLOADDATETIME,
+               a.RECORDTAG, a.TRANSSTATUS, a.TRANSTYPE, a.LASTUSER, a.LASTUPDATED,
+               a.OVERRIPEBCH, a.UNDERRIPEBCH, a.ABNORMALBCH, a.LOOSEFRUIT2"""
+
+# Mode pengambilan data TRANSNO duplikat
+DUPLICATE_MODES = ('scan', 'join', 'batch')
+
+
+def get_duplicate_transno_data(connector, start_date, end_date, limit=None, mode='scan', cache=None):
     """
     Mendapatkan data dengan TRANSNO yang sama.
 
+    Rentang yang melewati beberapa bulan dibagi per tabel bulan (plan_month_partitions) dan
+    hasilnya digabung urut tanggal; TRANSNO duplikat dicari di dalam masing-masing tabel bulan.
+
     Args:
         connector: FirebirdConnector instance
         start_date: Tanggal awal (format: YYYY-MM-DD)
         end_date: Tanggal akhir (format: YYYY-MM-DD)
         limit: Batasan jumlah data yang diambil (opsional)
+        mode: Cara pengambilan data:
+            'scan'  - satu kali scan tabel bulan, duplikat disaring di sisi klien (default, Firebird 1.5)
+            'join'  - satu query dengan join ke derived table GROUP BY/HAVING (Firebird 2.0+)
+            'batch' - cara lama: daftar TRANSNO lalu query IN (...) per 1000 TRANSNO
+        cache: SnapshotCache (opsional); jika snapshot untuk database, tabel dan rentang
+            tanggal yang sama ada, database tidak dibaca
 
     Returns:
         pandas.DataFrame: Data dengan TRANSNO yang sama
     """
+    if mode not in DUPLICATE_MODES:
+        raise ValueError(f"Mode tidak dikenal: {mode} (pilihan: {', '.join(DUPLICATE_MODES)})")
+
+    # Rentang bisa melewati beberapa tabel bulan (end_date eksklusif)
+    partitions = plan_month_partitions(start_date, end_date, end_inclusive=False)
+    print(f"Using tables {', '.join(p.table for p in partitions)}")
+
+    fetchers = {
+        'scan': _get_duplicates_by_scan,
+        'join': _get_duplicates_by_join,
+        'batch': _get_duplicates_by_batches,
+    }
+
+    def fetch(partition):
+        part_start = partition.start.isoformat()
+        part_stop = partition.stop.isoformat()
+
+        def load():
+            return fetchers[mode](connector, partition.table, part_start, part_stop, limit)
+
+        if cache is None:
+            return load()
+        # Kunci snapshot: kolom yang diambil, mode dan limit (hasil ketiga mode identik, tapi limit tidak)
+        cache_query = f"TRANSNO duplikat mode={mode} limit={limit}: SELECT {FFB_COLUMNS} FROM {partition.table}"
+        return cache.fetch(connector, partition.table, part_start, part_stop, cache_query, load)
+
+    # Sesi isql hanya bisa menjalankan satu query sekaligus
+    workers = DEFAULT_PARTITION_WORKERS if connector.concurrent_safe else 1
+    df = fetch_partitions(partitions, fetch, max_workers=workers)
+
+    if limit and len(partitions) > 1 and not df.empty:
+        first_transnos = df['TRANSNO'].drop_duplicates().iloc[:limit]
+        df = df[df['TRANSNO'].isin(first_transnos)].reset_index(drop=True)
+    return df
+
+
+def _get_duplicates_by_scan(connector, ffb_table, start_date, end_date, limit=None):
+    """
+    Satu query untuk seluruh rentang tanggal, diurutkan per TRANSNO.
+
+    Karena hasil terurut, record dengan TRANSNO yang sama selalu berdampingan: setiap
+    chunk disaring dengan duplicated(), dan hanya grup TRANSNO terakhir (yang mungkin
+    berlanjut di chunk berikutnya) yang dibawa ke chunk berikutnya.
+    """
+    print("Mengambil data bulan dalam satu kali scan, duplikat disaring di sisi klien...")
+
+    query = f"""
+    SELECT {FFB_COLUMNS}
+    FROM {ffb_table} a
+    WHERE a.TRANSDATE >= '{start_date}' AND a.TRANSDATE < '{end_date}'
+    ORDER BY a.TRANSNO, a.TRANSDATE
+    """
+
+    kept = []
+    found = 0
+    carry = None
+    chunks = connector.iter_query(query)
+    try:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            # TRANSNO dibandingkan sebagai str agar grup yang terpotong di batas chunk tetap utuh
+            chunk = normalize_key_columns(chunk)
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+
+            last_transno = chunk['TRANSNO'].iloc[-1]
+            is_last = chunk['TRANSNO'] == last_transno
+            carry = chunk[is_last]
+            body = chunk[~is_last]
+
+            duplicates = body[body.duplicated('TRANSNO', keep=False)]
+            if not duplicates.empty:
+                kept.append(duplicates)
+                found += duplicates['TRANSNO'].nunique()
+            if limit and found >= limit:
+                carry = None
+                break
+    finally:
+        chunks.close()
+
+    if carry is not None and len(carry) > 1:
+        kept.append(carry)
+
+    if not kept:
+        print("Tidak ditemukan TRANSNO duplikat.")
+        return pd.DataFrame()
+
+    df = pd.concat(kept, ignore_index=True)
+    if limit:
+        first_transnos = df['TRANSNO'].drop_duplicates().iloc[:limit]
+        df = df[df['TRANSNO'].isin(first_transnos)].reset_index(drop=True)
+
+    print(f"Ditemukan {df['TRANSNO'].nunique()} TRANSNO duplikat, total records: {len(df)}")
+    return df
+
+
+def _get_duplicates_by_join(connector, ffb_table, start_date, end_date, limit=None):
+    """Satu query: join ke derived table berisi TRANSNO dengan lebih dari satu record"""
+    print("Mengambil data TRANSNO duplikat dengan satu query join...")
+
+    first_clause = f"FIRST {int(limit)} " if limit else ""
+    query = f"""
+    SELECT {FFB_COLUMNS}
+    FROM {ffb_table} a
+    JOIN (
+        SELECT {first_clause}TRANSNO
+        FROM {ffb_table}
+        WHERE TRANSDATE >= '{start_date}' AND TRANSDATE < '{end_date}'
+        GROUP BY TRANSNO
+        HAVING COUNT(*) > 1
+        ORDER BY TRANSNO
+    ) d ON d.TRANSNO = a.TRANSNO
+    WHERE a.TRANSDATE >= '{start_date}' AND a.TRANSDATE < '{end_date}'
+    ORDER BY a.TRANSNO, a.TRANSDATE
+    """
+
+    chunks = [chunk for chunk in connector.iter_query(query) if not chunk.empty]
+    if not chunks:
+        print("Tidak ditemukan TRANSNO duplikat.")
+        return pd.DataFrame()
+
+    df = pd.concat(chunks, ignore_index=True)
+    print(f"Ditemukan {df['TRANSNO'].nunique()} TRANSNO duplikat, total records: {len(df)}")
+    return df
+
+
+def _get_duplicates_by_batches(connector, ffb_table, start_date, end_date, limit=None):
+    """Cara lama: daftar TRANSNO duplikat, lalu data lengkap per batch IN (...)"""
     # Langkah 1: Dapatkan daftar TRANSNO yang memiliki lebih dari satu record dengan pendekatan yang lebih efisien
     print("Langkah 1: Mencari TRANSNO yang duplikat...")
 
-    # Determine the correct table name based on the month
-    month_num = int(start_date.split('-')[1])
-    ffb_table = f"FFBSCANNERDATA{month_num:02d}"
-    print(f"Using table {ffb_table} for month {month_num}")
-
     # Simplified query that finds TRANSNOs with multiple records on the same date
     transno_query = f"""
     SELECT a.TRANSNO, COUNT(*) AS JUMLAH
@@ -356,7 +346,7 @@ def get_duplicate_transno_data(connector, start_date, end_date, limit=None):
     # Firebird 1.5 has a limit of 1500 values in an IN clause
     # Split the query into smaller batches
     BATCH_SIZE = 1000  # Safely under the 1500 limit
-    all_results = []
+    chunks = []
 
     # Process in batches
     for i in range(0, len(duplicate_transnos), BATCH_SIZE):
@@ -364,11 +354,7 @@ def get_duplicate_transno_data(connector, start_date, end_date, limit=None):
         transno_list = ", ".join([f"'{tn}'" for tn in batch])
 
         query = f"""
-        SELECT a.ID, a.SCANUSERID, a.OCID, a.WORKERID, a.CARRIERID, a.FIELDID, a.TASKNO,
-               a.RIPEBCH, a.UNRIPEBCH, a.BLACKBCH, a.ROTTENBCH, a.LONGSTALKBCH, a.RATDMGBCH,
-               a.LOOSEFRUIT, a.TRANSNO, a.TRANSDATE, a.TRANSTIME, a.UPLOADDATETIME,
-               a.RECORDTAG, a.TRANSSTATUS, a.TRANSTYPE, a.LASTUSER, a.LASTUPDATED,
-               a.OVERRIPEBCH, a.UNDERRIPEBCH, a.ABNORMALBCH, a.LOOSEFRUIT2
+        SELECT {FFB_COLUMNS}
         FROM {ffb_table} a
         WHERE a.TRANSNO IN ({transno_list})
         AND a.TRANSDATE >= '{start_date}' AND a.TRANSDATE < '{end_date}'
@@ -376,16 +362,104 @@ def get_duplicate_transno_data(connector, start_date, end_date, limit=None):
         """
 
         print(f"Executing query batch {i//BATCH_SIZE + 1} with {len(batch)} TRANSNO values...")
-        batch_result = connector.execute_query(query)
-        all_results.extend(batch_result)
-
-    print(f"Total records retrieved: {len(all_results)}")
+        # Ambil hasil per chunk DataFrame, tanpa menyimpan seluruh output isql sebagai row dict
+        chunks.extend(chunk for chunk in connector.iter_query(query) if not chunk.empty)
 
-    # Convert to pandas DataFrame
-    df = connector.to_pandas(all_results)
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    print(f"Total records retrieved: {len(df)}")
 
     return df
 
+def _text_values(series):
+    """Nilai kolom sebagai teks ter-strip; nilai kosong (None/0/'') menjadi ''"""
+    return [str(value).strip() if value else '' for value in series.tolist()]
+
+
+def _comparison_values(values):
+    """
+    Nilai perbandingan dengan aturan `float(v) if v else 0`: nol (termasuk -0.0) menjadi 0,
+    dan kolom yang seluruhnya nol tetap bertipe integer.
+    """
+    values = np.where(values == 0, 0.0, values)
+    return values if values.any() else values.astype(np.int64)
+
+
+def _select_record_pairs(df, group_cols, recordtag_col=None, sort_cols=None):
+    """
+    Memilih pasangan record yang dibandingkan untuk setiap grup TRANSNO (dan TRANSDATE).
+
+    Record 1 adalah record PM (Kerani) pertama dalam grup, record 2 adalah record P1 (Asisten)
+    pertama, atau P5 (Mandor) jika tidak ada P1. Grup tanpa PM atau tanpa P1/P5 memakai dua
+    record pertama grup. Tanpa kolom RECORDTAG, grup diurutkan berdasarkan sort_cols dan dua
+    record pertamanya dipakai. Grup dengan satu record dilewati.
+
+    Args:
+        df: pandas.DataFrame dengan data TRANSNO duplikat
+        group_cols: Kolom pengelompokan (TRANSNO, dan TRANSDATE jika ada)
+        recordtag_col: Nama kolom RECORDTAG (opsional)
+        sort_cols: Kolom pengurutan jika RECORDTAG tidak tersedia (opsional)
+
+    Returns:
+        tuple: (posisi record 1, posisi record 2) sebagai array posisi baris df, satu elemen
+        per grup, dalam urutan kunci grup
+    """
+    group_ids = df.groupby(group_cols, sort=True).ngroup()
+    # Baris dengan kunci kosong (NaN) tidak masuk grup mana pun
+    group_ids = group_ids.fillna(-1).to_numpy(dtype=np.int64)
+
+    # Urutkan baris per grup; di dalam grup urutan asli dipertahankan (atau sort_cols)
+    if not recordtag_col and sort_cols:
+        keys = df[sort_cols].reset_index(drop=True)
+        keys.columns = range(len(sort_cols))
+        keys.insert(0, 'group', group_ids)
+        order = keys.sort_values(list(keys.columns), kind='stable').index.to_numpy()
+    else:
+        order = np.argsort(group_ids, kind='stable')
+    order = order[group_ids[order] >= 0]
+
+    ordered_groups = group_ids[order]
+    is_start = np.empty(len(order), dtype=bool)
+    is_start[:1] = True
+    is_start[1:] = ordered_groups[1:] != ordered_groups[:-1]
+    starts = np.flatnonzero(is_start)
+    sizes = np.diff(np.append(starts, len(order)))
+
+    first = starts
+    second = starts + 1
+    if recordtag_col:
+        tags = df[recordtag_col].to_numpy(dtype=object)[order]
+        run = np.cumsum(is_start) - 1
+
+        def first_with_tag(tag):
+            hits = np.flatnonzero(tags == tag)
+            runs, first_hit = np.unique(run[hits], return_index=True)
+            found = np.full(len(starts), -1)
+            found[runs] = hits[first_hit]
+            return found
+
+        pm = first_with_tag('PM')
+        p1 = first_with_tag('P1')
+        p5 = first_with_tag('P5')
+        verifier = np.where(p1 >= 0, p1, p5)
+
+        # Jika tidak ada record PM atau tidak ada record P1/P5, gunakan dua record pertama
+        paired = (pm >= 0) & (verifier >= 0)
+        first = np.where(paired, pm, starts)
+        second = np.where(paired, verifier, second)
+
+        multiple = sizes > 1
+        missing_pm = int(np.count_nonzero(multiple & (pm < 0)))
+        missing_verifier = int(np.count_nonzero(multiple & (pm >= 0) & (verifier < 0)))
+        if missing_pm:
+            print(f"Tidak ditemukan record PM untuk {missing_pm} TRANSNO, menggunakan dua record pertama")
+        if missing_verifier:
+            print(f"Tidak ditemukan record P1 atau P5 untuk {missing_verifier} TRANSNO, menggunakan dua record pertama")
+
+    # Skip grup yang hanya memiliki satu record
+    multiple = sizes > 1
+    return order[first[multiple]], order[second[multiple]]
+
+
 def analyze_differences(df, field_mapping=None, employee_mapping=None, transstatus_mapping=None):
     """
     Menganalisis perbedaan antara data dengan TRANSNO yang sama.
@@ -549,178 +623,104 @@ def analyze_differences(df, field_mapping=None, employee_mapping=None, transstat
                 print(f"Menggunakan kolom {col} sebagai TRANSSTATUS")
                 break
 
+    # Cari kolom RECORDTAG (sekali untuk seluruh data, bukan per grup)
+    recordtag_col = None
+    if 'RECORDTAG' in df.columns:
+        recordtag_col = 'RECORDTAG'
+        print(f"Menggunakan kolom RECORDTAG sebagai RECORDTAG")
+    else:
+        for col in df.columns:
+            if 'RECORDTAG' in col.upper() or 'TAG' in col.upper():
+                recordtag_col = col
+                print(f"Menggunakan kolom {col} sebagai RECORDTAG")
+                break
+
     # Group by TRANSNO and TRANSDATE to ensure we only compare records from the same date
     if transdate_col:
         print(f"Grouping by both {transno_col} and {transdate_col} to ensure proper matching")
-        grouped = df.groupby([transno_col, transdate_col])
+        group_cols = [transno_col, transdate_col]
     else:
         print(f"Warning: No TRANSDATE column found, grouping only by {transno_col}")
-        grouped = df.groupby(transno_col)
+        group_cols = [transno_col]
 
-    # Initialize list untuk menyimpan hasil
-    results = []
+    # Pilih pasangan record (record1 = Kerani, record2 = Asisten/Mandor) untuk semua grup sekaligus
+    sort_cols = [col for col in (transdate_col, transtime_col) if col]
+    pos1, pos2 = _select_record_pairs(df, group_cols, recordtag_col, sort_cols)
 
-    # Proses setiap grup
-    for group_key, group in grouped:
-        # Extract transno (and transdate if available)
-        if isinstance(group_key, tuple):
-            transno = group_key[0]
-            transdate = group_key[1] if len(group_key) > 1 else None
-        else:
-            transno = group_key
-            transdate = None
-        # Skip jika hanya ada satu record
-        if len(group) <= 1:
-            continue
-
-        # Cari kolom RECORDTAG
-        recordtag_col = None
-        if 'RECORDTAG' in group.columns:
-            recordtag_col = 'RECORDTAG'
-            print(f"Menggunakan kolom RECORDTAG sebagai RECORDTAG")
-        else:
-            for col in group.columns:
-                if 'RECORDTAG' in col.upper() or 'TAG' in col.upper():
-                    recordtag_col = col
-                    print(f"Menggunakan kolom {col} sebagai RECORDTAG")
-                    break
+    if len(pos1) == 0:
+        return pd.DataFrame(), {}
 
-        # Jika tidak ada kolom RECORDTAG, gunakan sort by date/time
-        if not recordtag_col:
-            # Sort by TRANSDATE and TRANSTIME untuk memastikan urutan konsisten
-            sort_cols = []
-            if transdate_col:
-                sort_cols.append(transdate_col)
-            if transtime_col:
-                sort_cols.append(transtime_col)
-
-            # Jika tidak ada kolom untuk sort, gunakan indeks
-            if sort_cols:
-                group = group.sort_values(sort_cols)
-            else:
-                # Jika tidak ada kolom untuk sort, gunakan indeks saja
-                group = group.copy()
+    record1 = df.iloc[pos1]
+    record2 = df.iloc[pos2]
 
-            # Ambil dua record pertama (diasumsikan Kerani dan Asisten)
-            record1 = group.iloc[0]
-            record2 = group.iloc[1]
-        else:
-            # Pisahkan berdasarkan RECORDTAG
-            pm_records = group[group[recordtag_col] == 'PM']
-            p1_records = group[group[recordtag_col] == 'P1']
-            p5_records = group[group[recordtag_col] == 'P5']
-
-            # Jika tidak ada record PM, gunakan cara default
-            if pm_records.empty:
-                print(f"Tidak ditemukan record PM untuk TRANSNO {group[transno_col].iloc[0]}")
-                # Ambil dua record pertama saja
-                record1 = group.iloc[0]
-                record2 = group.iloc[1]
-            # Jika tidak ada record P1 atau P5, gunakan cara default
-            elif p1_records.empty and p5_records.empty:
-                print(f"Tidak ditemukan record P1 atau P5 untuk TRANSNO {group[transno_col].iloc[0]}")
-                # Ambil dua record pertama saja
-                record1 = group.iloc[0]
-                record2 = group.iloc[1]
-            else:
-                # Ambil record PM sebagai record1 (Kerani)
-                record1 = pm_records.iloc[0]
-
-                # Prioritaskan P1 (Asisten) jika ada, jika tidak gunakan P5 (Mandor)
-                if not p1_records.empty:
-                    record2 = p1_records.iloc[0]
-                else:
-                    record2 = p5_records.iloc[0]
-
-        # Buat dictionary hasil dasar
-        result = {
-            'TRANSNO': transno
-        }
-
-        # Tambahkan kolom tanggal jika tersedia dari grouping
-        if transdate:
-            result['TRANSDATE'] = transdate
-        # Atau dari record jika tidak tersedia dari grouping
-        elif transdate_col:
-            result['TRANSDATE'] = record1[transdate_col]
-
-        # Tambahkan kolom field jika tersedia
-        if fieldid_col:
-            field_id = str(record1[fieldid_col]).strip() if record1[fieldid_col] else ''
-
-            # Tambahkan FieldNo jika mapping tersedia
-            if field_mapping and field_id in field_mapping:
-                result['FIELDNO'] = field_mapping[field_id]
+    # Susun kolom hasil per kolom (bukan per transaksi), urutan kolom sama seperti sebelumnya
+    results = {'TRANSNO': record1[transno_col].tolist()}
+
+    if transdate_col:
+        results['TRANSDATE'] = record1[transdate_col].tolist()
+
+    # Tambahkan kolom field jika tersedia
+    if fieldid_col:
+        field_ids = _text_values(record1[fieldid_col])
+        # Jika tidak ada mapping, gunakan field_id sebagai fallback
+        results['FIELDNO'] = [field_mapping[field_id] if field_mapping and field_id in field_mapping
+                              else f"FIELD-{field_id}" for field_id in field_ids]
+
+    # Tambahkan kolom RECORDTAG jika tersedia
+    if recordtag_col:
+        results['RECORDTAG_1'] = _text_values(record1[recordtag_col])
+        results['RECORDTAG_2'] = _text_values(record2[recordtag_col])
+
+    # Tambahkan kolom TRANSSTATUS jika tersedia
+    if transstatus_col:
+        status_ids_1 = _text_values(record1[transstatus_col])
+        status_ids_2 = _text_values(record2[transstatus_col])
+        results['TRANSSTATUS_1'] = status_ids_1
+        results['TRANSSTATUS_2'] = status_ids_2
+
+        # Tambahkan status name jika mapping tersedia
+        if transstatus_mapping:
+            if 'get_status_name' in transstatus_mapping:
+                get_status_name = transstatus_mapping['get_status_name']
             else:
-                # Jika tidak ada mapping, gunakan field_id sebagai fallback
-                result['FIELDNO'] = f"FIELD-{field_id}"
-
-        # Tambahkan kolom RECORDTAG jika tersedia
-        if recordtag_col:
-            recordtag_1 = str(record1[recordtag_col]).strip() if record1[recordtag_col] else ''
-            recordtag_2 = str(record2[recordtag_col]).strip() if record2[recordtag_col] else ''
-            result['RECORDTAG_1'] = recordtag_1
-            result['RECORDTAG_2'] = recordtag_2
-
-        # Tambahkan kolom TRANSSTATUS jika tersedia
-        if transstatus_col:
-            status_id_1 = str(record1[transstatus_col]).strip() if record1[transstatus_col] else ''
-            status_id_2 = str(record2[transstatus_col]).strip() if record2[transstatus_col] else ''
-
-            # Tambahkan status ID
-            result['TRANSSTATUS_1'] = status_id_1
-            result['TRANSSTATUS_2'] = status_id_2
-
-            # Tambahkan status name jika mapping tersedia
-            if transstatus_mapping:
-                if 'get_status_name' in transstatus_mapping:
-                    result['TRANSSTATUS_NAME_1'] = transstatus_mapping['get_status_name'](status_id_1)
-                    result['TRANSSTATUS_NAME_2'] = transstatus_mapping['get_status_name'](status_id_2)
-                else:
-                    result['TRANSSTATUS_NAME_1'] = transstatus_mapping.get(status_id_1, f"STATUS-{status_id_1}")
-                    result['TRANSSTATUS_NAME_2'] = transstatus_mapping.get(status_id_2, f"STATUS-{status_id_2}")
-
-        # Tambahkan kolom user jika tersedia
-        if scanuserid_col:
-            user_id_1 = str(record1[scanuserid_col]).strip() if record1[scanuserid_col] else ''
-            user_id_2 = str(record2[scanuserid_col]).strip() if record2[scanuserid_col] else ''
-
-            # Tambahkan nama karyawan langsung (tidak perlu menampilkan ID)
-            if employee_mapping:
-                # Gunakan fungsi get_name jika tersedia, atau fallback ke dictionary lookup
-                if 'get_name' in employee_mapping:
-                    result['NAME_1'] = employee_mapping['get_name'](user_id_1)
-                    result['NAME_2'] = employee_mapping['get_name'](user_id_2)
-                else:
-                    result['NAME_1'] = employee_mapping.get(user_id_1, f"KARYAWAN-{user_id_1}")
-                    result['NAME_2'] = employee_mapping.get(user_id_2, f"KARYAWAN-{user_id_2}")
-
-        # Hitung perbedaan untuk setiap kolom perbandingan
-        for col in comparison_columns:
-            mapped_col = comparison_mapping[col]
-            if mapped_col in record1 and mapped_col in record2:
-                value1 = float(record1[mapped_col]) if record1[mapped_col] else 0
-                value2 = float(record2[mapped_col]) if record2[mapped_col] else 0
-
-                result[f'{col}_1'] = value1
-                result[f'{col}_2'] = value2
-                result[f'{col}_DIFF'] = value2 - value1
-
-        # Tambahkan total perbedaan
-        total1 = sum(float(record1[comparison_mapping[col]]) if record1[comparison_mapping[col]] else 0
-                    for col in comparison_columns if comparison_mapping[col] in record1)
-        total2 = sum(float(record2[comparison_mapping[col]]) if record2[comparison_mapping[col]] else 0
-                    for col in comparison_columns if comparison_mapping[col] in record2)
-
-        result['TOTAL_1'] = total1
-        result['TOTAL_2'] = total2
-        result['TOTAL_DIFF'] = total2 - total1
-
-        results.append(result)
-
-    # Convert results to DataFrame
-    if not results:
-        return pd.DataFrame(), {}
+                get_status_name = lambda status_id: transstatus_mapping.get(status_id, f"STATUS-{status_id}")
+            status_names = {status_id: get_status_name(status_id) for status_id in set(status_ids_1 + status_ids_2)}
+            results['TRANSSTATUS_NAME_1'] = [status_names[status_id] for status_id in status_ids_1]
+            results['TRANSSTATUS_NAME_2'] = [status_names[status_id] for status_id in status_ids_2]
+
+    # Tambahkan nama karyawan langsung (tidak perlu menampilkan ID)
+    if scanuserid_col and employee_mapping:
+        user_ids_1 = _text_values(record1[scanuserid_col])
+        user_ids_2 = _text_values(record2[scanuserid_col])
+
+        # Gunakan fungsi get_name jika tersedia, atau fallback ke dictionary lookup
+        if 'get_name' in employee_mapping:
+            get_name = employee_mapping['get_name']
+        else:
+            get_name = lambda user_id: employee_mapping.get(user_id, f"KARYAWAN-{user_id}")
+        names = {user_id: get_name(user_id) for user_id in set(user_ids_1 + user_ids_2)}
+        results['NAME_1'] = [names[user_id] for user_id in user_ids_1]
+        results['NAME_2'] = [names[user_id] for user_id in user_ids_2]
+
+    # Hitung perbedaan untuk setiap kolom perbandingan, satu operasi NumPy per kolom
+    total1 = np.zeros(len(pos1), dtype=np.int64)
+    total2 = np.zeros(len(pos2), dtype=np.int64)
+    for col in comparison_columns:
+        values = df[comparison_mapping[col]].to_numpy(dtype=float)
+        value1 = _comparison_values(values[pos1])
+        value2 = _comparison_values(values[pos2])
+
+        results[f'{col}_1'] = value1
+        results[f'{col}_2'] = value2
+        results[f'{col}_DIFF'] = value2 - value1
+
+        total1 = total1 + value1
+        total2 = total2 + value2
+
+    # Tambahkan total perbedaan
+    results['TOTAL_1'] = total1
+    results['TOTAL_2'] = total2
+    results['TOTAL_DIFF'] = total2 - total1
 
     df_results = pd.DataFrame(results)
 
@@ -1009,8 +1009,21 @@ def main():
                         help='Generate laporan Excel')
     parser.add_argument('--pdf', action='store_true',
                         help='Generate laporan PDF')
+    parser.add_argument('--dup-mode', type=str, default='scan', choices=list(DUPLICATE_MODES),
+                        help="Cara mengambil TRANSNO duplikat: 'scan' (satu scan, default), "
+                             "'join' (derived table, Firebird 2.0+), 'batch' (IN per 1000 TRANSNO)")
+    parser.add_argument('--log-level', type=str, default='WARNING',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Level log koneksi database (default: WARNING; INFO menampilkan waktu per query)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Selalu baca data dari database, tanpa snapshot dan cache data referensi')
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help='Baca ulang data dari database dan timpa snapshot serta cache data referensi')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help='Direktori snapshot lokal (default: ~/.ffb_cache/snapshots)')
 
     args = parser.parse_args()
+    set_log_level(args.log_level)
 
     # Buat direktori output jika belum ada
     if not os.path.exists(args.output_dir):
@@ -1057,26 +1070,37 @@ def main():
         use_localhost=args.use_localhost
     )
 
-    # Tes koneksi
-    print("Menguji koneksi database...")
-    if not connector.test_connection():
-        print("Gagal terhubung ke database. Silakan periksa parameter koneksi Anda.")
-        return
+    # Satu sesi isql untuk semua query: biaya attach database dibayar sekali
+    with connector.session():
+        # Tes koneksi
+        print("Menguji koneksi database...")
+        if not connector.test_connection():
+            print("Gagal terhubung ke database. Silakan periksa parameter koneksi Anda.")
+            return
+
+        print("Koneksi berhasil!")
 
-    print("Koneksi berhasil!")
+        # Data referensi (OCFIELD, EMP, LOOKUP) diambil dari cache bersama jika belum kedaluwarsa
+        reference_cache = ReferenceCache.shared()
+        reference_cache.enabled = not args.no_cache
+        reference_cache.refresh = args.refresh_cache
 
-    # Dapatkan mapping FieldID ke FieldNo
-    field_mapping = get_field_mapping(connector)
+        # Dapatkan mapping FieldID ke FieldNo
+        field_mapping = get_field_mapping(connector)
 
-    # Dapatkan mapping ID ke NAME dari tabel EMP
-    employee_mapping = get_employee_mapping(connector)
+        # Dapatkan mapping ID ke NAME dari tabel EMP
+        employee_mapping = get_employee_mapping(connector)
 
-    # Dapatkan mapping TRANSSTATUS ke deskripsi dari tabel LOOKUP
-    transstatus_mapping = get_transstatus_mapping(connector)
+        # Dapatkan mapping TRANSSTATUS ke deskripsi dari tabel LOOKUP
+        transstatus_mapping = get_transstatus_mapping(connector)
 
-    # Dapatkan data dengan TRANSNO duplikat
-    print(f"Mengambil data dengan TRANSNO duplikat antara {start_date_str} dan {end_date_str}...")
-    data = get_duplicate_transno_data(connector, start_date_str, end_date_str, args.limit)
+        # Dapatkan data dengan TRANSNO duplikat
+        print(f"Mengambil data dengan TRANSNO duplikat antara {start_date_str} dan {end_date_str}...")
+        snapshot_cache = SnapshotCache(args.cache_dir, enabled=not args.no_cache, refresh=args.refresh_cache)
+        data = get_duplicate_transno_data(connector, start_date_str, end_date_str, args.limit, args.dup_mode,
+                                          cache=snapshot_cache)
+        if snapshot_cache.hits:
+            print("Data diambil dari snapshot lokal (gunakan --refresh-cache untuk membaca ulang database).")
 
     if data.empty:
         print("Tidak ditemukan TRANSNO duplikat dalam rentang tanggal yang ditentukan.")
@@ -0,0 +1,109 @@
+"""
+Benchmark mode pengambilan TRANSNO duplikat pada analisis_perbedaan_panen.py.
+
+Menjalankan get_duplicate_transno_data() untuk setiap mode ('batch', 'scan', 'join')
+pada satu bulan penuh tanpa --limit, mencatat waktu dan memastikan hasil setiap mode
+sama dengan mode referensi ('batch', cara lama; atau mode pertama yang berhasil jika
+'batch' tidak diuji atau gagal).
+
+Contoh:
+    python benchmark_duplicate_transno.py --db-path D:\\path\\PTRJ_P1A.FDB --month 5 --year 2025
+"""
+import argparse
+import contextlib
+import io
+import time
+from datetime import date
+
+from firebird_connector import FirebirdConnector
+from analisis_perbedaan_panen import get_duplicate_transno_data, DUPLICATE_MODES
+
+
+def month_range(year, month):
+    """Tanggal awal dan akhir (eksklusif) untuk satu bulan, format YYYY-MM-DD"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+def run_mode(connector, mode, start_date, end_date, use_session):
+    """Menjalankan satu mode dan mengembalikan (detik, DataFrame, jumlah query)"""
+    connector.query_stats.clear()
+    session = connector.session() if use_session else contextlib.nullcontext()
+
+    started = time.perf_counter()
+    with session, contextlib.redirect_stdout(io.StringIO()):
+        df = get_duplicate_transno_data(connector, start_date, end_date, None, mode)
+    elapsed = time.perf_counter() - started
+
+    return elapsed, df, len(connector.query_stats)
+
+
+def same_rows(left, right):
+    """True jika dua hasil berisi record (ID) yang sama"""
+    if left.empty or right.empty:
+        return left.empty and right.empty
+    return sorted(left['ID'].tolist()) == sorted(right['ID'].tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pengambilan TRANSNO duplikat per mode.')
+    parser.add_argument('--db-path', type=str, required=True, help='Path ke file database Firebird')
+    parser.add_argument('--isql-path', type=str, default=None, help='Path ke executable isql (default: auto-detect)')
+    parser.add_argument('--username', type=str, default='sysdba', help='Username database')
+    parser.add_argument('--password', type=str, default='masterkey', help='Password database')
+    parser.add_argument('--use-localhost', action='store_true', help='Gunakan format localhost:path untuk koneksi')
+    parser.add_argument('--month', type=int, required=True, help='Bulan yang diuji (1-12)')
+    parser.add_argument('--year', type=int, required=True, help='Tahun yang diuji')
+    parser.add_argument('--modes', type=str, nargs='+', default=list(DUPLICATE_MODES), choices=list(DUPLICATE_MODES),
+                        help='Mode yang diuji (default: semua)')
+    parser.add_argument('--repeat', type=int, default=1, help='Jumlah pengulangan per mode (waktu terbaik dipakai)')
+    parser.add_argument('--session', action='store_true',
+                        help='Jalankan setiap mode di dalam satu sesi isql (default: satu proses isql per query)')
+    args = parser.parse_args()
+
+    connector = FirebirdConnector(
+        db_path=args.db_path,
+        username=args.username,
+        password=args.password,
+        isql_path=args.isql_path,
+        use_localhost=args.use_localhost
+    )
+    start_date, end_date = month_range(args.year, args.month)
+
+    print(f"Benchmark TRANSNO duplikat {start_date} s/d {end_date} (backend: {connector.backend}, "
+          f"sesi: {'ya' if args.session else 'tidak'})")
+
+    # Semua mode dijalankan dulu, baru dibandingkan dengan satu mode referensi
+    results = {}
+    for mode in args.modes:
+        best = None
+        for _ in range(max(1, args.repeat)):
+            try:
+                elapsed, df, queries = run_mode(connector, mode, start_date, end_date, args.session)
+            except Exception as e:
+                print(f"{mode:<8} gagal: {e}")
+                break
+            if best is None or elapsed < best[0]:
+                best = (elapsed, df, queries)
+        if best is not None:
+            results[mode] = best
+
+    if not results:
+        return
+    reference = 'batch' if 'batch' in results else next(iter(results))
+    reference_elapsed, reference_df, _ = results[reference]
+
+    print(f"{'Mode':<8} {'Waktu (s)':>10} {'Query':>6} {'Records':>9} {'TRANSNO':>8}  Sama dengan {reference}")
+    for mode, (elapsed, df, queries) in results.items():
+        transnos = df['TRANSNO'].nunique() if not df.empty else 0
+        match_text = '-' if mode == reference else ('ya' if same_rows(df, reference_df) else 'TIDAK')
+        print(f"{mode:<8} {elapsed:>10.2f} {queries:>6} {len(df):>9} {transnos:>8}  {match_text}")
+
+    for mode, (elapsed, _, _) in results.items():
+        if mode != reference and elapsed > 0:
+            print(f"Speedup {mode} vs {reference}: {reference_elapsed / elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Pengganti isql Firebird 1.5 untuk benchmark dan pengujian offline di Linux.
+
+Membaca database sintetis dari synthetic_ffb_data.py (file SQLite) dan mencetak hasil
+query dalam format tabel isql Firebird 1.5: header, baris separator (====) dengan lebar
+kolom sesuai tipe Firebird, angka rata kanan, teks rata kiri, NULL sebagai <null>,
+prompt SQL>/CON> saat SQL dibaca dari stdin, dan pesan error "Statement failed, SQLCODE"
+di stderr. SQL dijalankan oleh SQLite; SELECT FIRST n [SKIP m] diterjemahkan ke LIMIT/OFFSET.
+
+Argumen yang didukung (seperti isql): [localhost:]path, -d path, -u user, -p password,
+-i file_sql, -o file_output, -m (error ke output), -q, -z (versi).
+
+Environment FAKE_ISQL_ATTACH_MS: jeda (milidetik) saat attach database, untuk meniru
+biaya koneksi isql asli.
+
+Contoh:
+    python synthetic_ffb_data.py --output /tmp/PTRJ_SYN.FDB --start-date 2025-05-01 --end-date 2025-05-31
+    echo "SELECT FIRST 5 ID, TRANSNO FROM FFBSCANNERDATA05;" | ./fake_isql.py -u sysdba -p masterkey -d /tmp/PTRJ_SYN.FDB
+"""
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from synthetic_ffb_data import COLUMN_TYPES
+
+VERSION = "LI-V1.5.6.5026 Firebird 1.5"
+
+# Lebar tampilan isql per tipe Firebird (CHAR/VARCHAR memakai panjang yang dideklarasikan)
+TYPE_WIDTHS = {'SMALLINT': 6, 'INTEGER': 11, 'BIGINT': 18, 'DOUBLE PRECISION': 23,
+               'DATE': 11, 'TIME': 13, 'TIMESTAMP': 24}
+NUMERIC_TYPES = ('SMALLINT', 'INTEGER', 'BIGINT', 'DOUBLE PRECISION')
+CHAR_PATTERN = re.compile(r'^(?:VAR)?CHAR\((\d+)\)$')
+
+FIRST_PATTERN = re.compile(r'\bSELECT\s+FIRST\s+(\d+)(?:\s+SKIP\s+(\d+))?\s+', re.IGNORECASE)
+AGGREGATE_PATTERN = re.compile(r'^(COUNT|SUM|MIN|MAX|AVG)\s*\(', re.IGNORECASE)
+LITERAL_PATTERN = re.compile(r"^(?:'.*'|-?\d+(?:\.\d+)?)$")
+
+FETCH_SIZE = 1000
+
+
+class IsqlError(Exception):
+    """Error yang dicetak isql sebagai 'Statement failed, SQLCODE = ...'"""
+
+    def __init__(self, sqlcode, *details):
+        super().__init__(sqlcode, *details)
+        self.sqlcode = sqlcode
+        self.details = details
+
+    def text(self):
+        lines = [f"Statement failed, SQLCODE = {self.sqlcode}", "Dynamic SQL Error",
+                 f"-SQL error code = {self.sqlcode}"]
+        lines.extend(f"-{detail}" for detail in self.details)
+        return '\n'.join(lines) + '\n'
+
+
+def _scope_end(text, position):
+    """Posisi akhir SELECT yang dimulai sebelum position: kurung tutup pasangannya atau akhir teks"""
+    depth = 0
+    quoted = False
+    for index in range(position, len(text)):
+        char = text[index]
+        if char == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            if depth == 0:
+                return index
+            depth -= 1
+    return len(text)
+
+
+def translate(statement):
+    """Sintaks Firebird yang tidak dikenal SQLite: SELECT FIRST n [SKIP m] -> LIMIT n OFFSET m"""
+    for match in reversed(list(FIRST_PATTERN.finditer(statement))):
+        end = _scope_end(statement, match.end())
+        limit = f" LIMIT {match.group(1)}" + (f" OFFSET {match.group(2)}" if match.group(2) else "")
+        statement = (statement[:match.start()] + "SELECT " + statement[match.end():end].rstrip()
+                     + limit + statement[end:])
+    return statement
+
+
+def translate_error(error):
+    """sqlite3.Error -> IsqlError dengan SQLCODE Firebird yang sesuai"""
+    message = str(error)
+    if message.startswith('no such table: '):
+        return IsqlError(-204, 'Table unknown', message.split(': ', 1)[1].upper())
+    if message.startswith('no such column: '):
+        return IsqlError(-206, 'Column unknown', message.split(': ', 1)[1].upper())
+    if 'syntax error' in message:
+        return IsqlError(-104, 'Token unknown - line 1, char 1', message)
+    return IsqlError(-901, message)
+
+
+def header_name(name):
+    """Nama kolom seperti isql: fungsi agregat -> nama fungsi, konstanta -> CONSTANT"""
+    match = AGGREGATE_PATTERN.match(name)
+    if match:
+        return match.group(1).upper()
+    if LITERAL_PATTERN.match(name):
+        return 'CONSTANT'
+    return name.upper()
+
+
+def column_type(name, values):
+    """Tipe Firebird kolom: dari skema database sintetis, atau ditebak dari nilai (ekspresi)"""
+    if name in COLUMN_TYPES:
+        return COLUMN_TYPES[name]
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, int) for value in present):
+        return 'INTEGER'
+    if present and all(isinstance(value, (int, float)) for value in present):
+        return 'DOUBLE PRECISION'
+    return f"VARCHAR({max([len(str(value)) for value in present] + [1])})"
+
+
+def format_value(value, fb_type):
+    if value is None:
+        return '<null>'
+    if fb_type == 'DOUBLE PRECISION':
+        return f"{value:.15g}" if isinstance(value, float) else str(value)
+    return str(value)
+
+
+class FakeIsql:
+    def __init__(self, db_path, output, errors, prompts):
+        self.db_path = db_path
+        self.output = output
+        self.errors = errors
+        self.prompts = prompts
+        self.conn = None
+        self.failed = False
+
+    def attach(self):
+        if not os.path.isfile(self.db_path):
+            raise IsqlError(-902, f'I/O error for file "{self.db_path}"', 'Error while trying to open file',
+                            'No such file or directory')
+        delay = float(os.environ.get('FAKE_ISQL_ATTACH_MS', 0) or 0)
+        if delay:
+            time.sleep(delay / 1000.0)
+        self.conn = sqlite3.connect(self.db_path)
+
+    def run(self, lines):
+        """Membaca SQL baris per baris dan menjalankan setiap statement yang diakhiri ';'"""
+        buffer = ''
+        self.prompt('SQL> ')
+        for line in lines:
+            buffer += line
+            statements = buffer.split(';')
+            # Bagian terakhir belum diakhiri ';' (titik koma di dalam string tidak didukung)
+            buffer = statements.pop()
+            for statement in statements:
+                if not self.execute(statement.strip()):
+                    return
+            self.prompt('SQL> ' if not buffer.strip() else 'CON> ')
+        if buffer.strip():
+            self.execute(buffer.strip())
+
+    def prompt(self, text):
+        if self.prompts:
+            self.output.write(text)
+            self.output.flush()
+
+    def execute(self, statement):
+        """Menjalankan satu statement; False jika statement adalah EXIT/QUIT"""
+        keyword = statement.split(None, 1)[0].upper() if statement else ''
+        if keyword in ('EXIT', 'QUIT'):
+            self.conn.commit()
+            return False
+        if keyword in ('', 'SET', 'SHOW'):
+            return True
+        if keyword in ('COMMIT', 'ROLLBACK'):
+            getattr(self.conn, keyword.lower())()
+            return True
+
+        try:
+            try:
+                cursor = self.conn.execute(translate(statement))
+            except sqlite3.Error as e:
+                raise translate_error(e)
+            if cursor.description is not None:
+                self.write_result(cursor)
+        except IsqlError as e:
+            self.failed = True
+            self.output.flush()
+            self.errors.write(e.text())
+            self.errors.flush()
+        return True
+
+    def write_result(self, cursor):
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            # isql tidak mencetak header untuk hasil kosong
+            self.output.write('\n')
+            self.output.flush()
+            return
+
+        headers = [header_name(column[0]) for column in cursor.description]
+        types = [column_type(header, [row[i] for row in rows]) for i, header in enumerate(headers)]
+        widths = []
+        for header, fb_type in zip(headers, types):
+            match = CHAR_PATTERN.match(fb_type)
+            widths.append(max(int(match.group(1)) if match else TYPE_WIDTHS.get(fb_type, 11), len(header)))
+        numeric = [fb_type in NUMERIC_TYPES for fb_type in types]
+
+        def format_row(values):
+            return ' '.join(value.rjust(width) if right else value.ljust(width)
+                            for value, width, right in zip(values, widths, numeric))
+
+        write = self.output.write
+        write('\n' + format_row(headers) + '\n')
+        write(' '.join('=' * width for width in widths) + '\n')
+        while rows:
+            write(''.join(format_row([format_value(value, fb_type) for value, fb_type in zip(row, types)]) + '\n'
+                          for row in rows))
+            rows = cursor.fetchmany(FETCH_SIZE)
+        write('\n')
+        self.output.flush()
+
+
+def parse_args(argv):
+    options = {'db_path': None, 'input': None, 'output': None, 'merge': False, 'version': False}
+    with_value = {'-u': None, '-user': None, '-p': None, '-password': None, '-d': 'db_path',
+                  '-database': 'db_path', '-i': 'input', '-input': 'input', '-o': 'output', '-output': 'output',
+                  '-page': None, '-pag': None, '-c': None, '-ch': None, '-charset': None}
+    index = 0
+    while index < len(argv):
+        arg = argv[index]
+        lower = arg.lower()
+        if lower in with_value:
+            if index + 1 >= len(argv):
+                raise SystemExit(f"isql: nilai untuk {arg} tidak ada")
+            if with_value[lower]:
+                options[with_value[lower]] = argv[index + 1]
+            index += 2
+            continue
+        if lower in ('-z',):
+            options['version'] = True
+        elif lower in ('-m', '-merge'):
+            options['merge'] = True
+        elif lower in ('-q', '-quiet', '-e', '-echo', '-n', '-noautocommit'):
+            pass
+        elif arg.startswith('-'):
+            raise SystemExit(f"isql: unknown switch {arg}")
+        else:
+            options['db_path'] = arg
+        index += 1
+    if options['db_path'] and options['db_path'].lower().startswith('localhost:'):
+        options['db_path'] = options['db_path'][len('localhost:'):]
+    return options
+
+
+def main(argv=None):
+    try:
+        options = parse_args(sys.argv[1:] if argv is None else argv)
+    except SystemExit as e:
+        sys.stderr.write(f"{e}\n")
+        return 1
+
+    if options['version']:
+        print(f"ISQL Version: {VERSION}")
+        if not options['db_path']:
+            return 0
+    if not options['db_path']:
+        sys.stderr.write("Use CONNECT or CREATE DATABASE to specify a database\n")
+        return 1
+
+    output = open(options['output'], 'w') if options['output'] else sys.stdout
+    try:
+        isql = FakeIsql(options['db_path'], output, output if options['merge'] else sys.stderr,
+                        prompts=options['input'] is None)
+        try:
+            isql.attach()
+        except IsqlError as e:
+            sys.stderr.write(e.text())
+            return 1
+        if options['input']:
+            with open(options['input'], 'r') as lines:
+                isql.run(lines)
+        else:
+            isql.run(sys.stdin)
+        isql.conn.close()
+        return 1 if isql.failed else 0
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
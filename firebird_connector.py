@@ -1,18 +1,1539 @@
 """
-Modul koneksi ke database Firebird menggunakan isql.
+Modul koneksi ke database Firebird menggunakan isql atau driver DB-API (fdb / firebird-driver).
 """
 import os
 import subprocess
 import json
 import tempfile
 import re
+import io
+import logging
+import queue
+import threading
+import time
+import hashlib
+import glob
+import shutil
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from operator import itemgetter
+from contextlib import contextmanager, nullcontext
 import pandas as pd
 
+# Driver DB-API bersifat opsional; tanpa driver, connector memakai isql
+try:
+    import fdb as firebird_driver
+except ImportError:
+    try:
+        from firebird import driver as firebird_driver
+    except ImportError:
+        firebird_driver = None
+
+# Parquet (pyarrow / fastparquet) bersifat opsional; tanpa keduanya snapshot disimpan sebagai pickle pandas
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_ENGINE = 'pyarrow'
+except ImportError:
+    try:
+        import fastparquet  # noqa: F401
+        PARQUET_ENGINE = 'fastparquet'
+    except ImportError:
+        PARQUET_ENGINE = None
+
+# Direktori cache lokal (snapshot tabel bulanan, dll.); dapat diganti lewat environment FFB_CACHE_DIR
+DEFAULT_CACHE_DIR = os.environ.get('FFB_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.ffb_cache')
+
+# Umur maksimum data referensi (EMP, OCFIELD, LOOKUP) yang disimpan di disk, dalam detik
+DEFAULT_REFERENCE_TTL = 12 * 60 * 60
+
+# Data referensi: nama -> (query, kolom kunci, kolom nilai)
+REFERENCE_QUERIES = {
+    'employee': ("SELECT ID, NAME FROM EMP", 'ID', 'NAME'),
+    'field': ("SELECT ID, FIELDNO FROM OCFIELD", 'ID', 'FIELDNO'),
+    'transstatus': ("SELECT a.ID, a.SHORTCODE, a.NAME FROM LOOKUP a", 'ID', 'NAME'),
+}
+
+# Tabel data scanner per bulan: FFBSCANNERDATA01 .. FFBSCANNERDATA12 (nama tabel tanpa tahun)
+FFB_TABLE_PREFIX = 'FFBSCANNERDATA'
+
+# Jumlah tabel bulan yang diambil bersamaan oleh fetch_partitions()
+DEFAULT_PARTITION_WORKERS = 4
+
+# Satu tabel bulan dengan rentang tanggal yang sudah dipotong ke bulan tersebut:
+# start/end inklusif (TRANSDATE <= end), stop = end + 1 hari (TRANSDATE < stop)
+MonthPartition = namedtuple('MonthPartition', ['table', 'start', 'end', 'stop'])
+
+# Kolom kode teks yang dipakai sebagai kunci pembanding/penggabungan antar chunk dan partition
+KEY_COLUMNS = ('TRANSNO',)
+
+# Senyap secara default: pesan debug/info hanya muncul jika aplikasi mengatur logging
+# atau memanggil set_log_level()
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+def set_log_level(level, stream=None):
+    """
+    Mengatur tingkat log connector (mis. 'DEBUG', 'INFO', 'WARNING').
+
+    Menambahkan satu StreamHandler (default: stderr) jika belum ada, sehingga
+    log terlihat tanpa konfigurasi logging di aplikasi.
+
+    :param level: Nama level atau konstanta logging
+    :param stream: Stream tujuan log (default: sys.stderr)
+    """
+    logger = logging.getLogger(__name__)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    logger.setLevel(level)
+
+    if not any(isinstance(h, logging.StreamHandler) for h in logger.handlers):
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def plan_month_partitions(start_date, end_date, end_inclusive=True, table_prefix=FFB_TABLE_PREFIX):
+    """
+    Memetakan rentang tanggal ke tabel bulanan, urut tanggal.
+
+    Setiap bulan dalam rentang, termasuk yang melewati pergantian tahun, menjadi satu
+    MonthPartition dengan rentang yang dipotong ke bulan tersebut. Nama tabel hanya memuat
+    nomor bulan, sehingga rentang lebih dari 12 bulan menggabungkan bulan yang sama dari
+    tahun berbeda ke satu partition (awal kemunculan pertama s/d akhir kemunculan terakhir).
+
+    :param start_date: date/datetime atau string YYYY-MM-DD
+    :param end_date: date/datetime atau string YYYY-MM-DD
+    :param end_inclusive: False jika end_date eksklusif (TRANSDATE < end_date)
+    :param table_prefix: Awalan nama tabel (default: FFBSCANNERDATA)
+    :return: List MonthPartition; kosong jika rentang kosong
+    """
+    start = _as_date(start_date)
+    end = _as_date(end_date)
+    if not end_inclusive:
+        end -= timedelta(days=1)
+
+    partitions = {}
+    current = start
+    while current <= end:
+        next_month = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        month_end = min(end, next_month - timedelta(days=1))
+        table = f"{table_prefix}{current.month:02d}"
+        first = partitions[table].start if table in partitions else current
+        partitions[table] = MonthPartition(table, first, month_end, month_end + timedelta(days=1))
+        current = next_month
+    return list(partitions.values())
+
+
+def normalize_key_columns(df, columns=KEY_COLUMNS):
+    """
+    Menyamakan tipe kolom kunci menjadi str (NULL tetap NULL).
+
+    Frame dari sumber berbeda (chunk, partition, snapshot lama) bisa menyimpan kode yang
+    sama sebagai int dan str; tanpa normalisasi, perbandingan dan concat memperlakukan
+    1234 dan '1234' sebagai TRANSNO berbeda.
+
+    :param df: pandas.DataFrame (boleh None/kosong)
+    :param columns: Nama kolom kunci; kolom yang tidak ada dilewati
+    :return: DataFrame baru dengan kolom kunci bertipe str, atau df jika tidak ada yang diubah
+    """
+    if df is None or df.empty:
+        return df
+    converted = {}
+    for column in columns:
+        if column in df.columns:
+            values = df[column]
+            converted[column] = values.where(values.isna(), values.astype(str))
+    return df.assign(**converted) if converted else df
+
+
+def fetch_partitions(partitions, fetch, max_workers=DEFAULT_PARTITION_WORKERS):
+    """
+    Menjalankan fetch(partition) untuk setiap partition lalu menggabungkan hasilnya urut tanggal.
+
+    :param partitions: List MonthPartition dari plan_month_partitions()
+    :param fetch: Fungsi MonthPartition -> DataFrame (None/kosong dilewati)
+    :param max_workers: Jumlah partition yang diambil bersamaan; 1 untuk berurutan
+                        (mis. di dalam connector.session(), lihat FirebirdConnector.concurrent_safe)
+    :return: pandas.DataFrame gabungan (kosong jika tidak ada data), kolom KEY_COLUMNS bertipe str
+    """
+    workers = max(1, min(max_workers or 1, len(partitions)))
+    if workers == 1:
+        frames = [fetch(partition) for partition in partitions]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map mempertahankan urutan partition walaupun selesai tidak berurutan
+            frames = list(executor.map(fetch, partitions))
+
+    frames = [normalize_key_columns(frame) for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+class _CountingLines:
+    """Iterator baris yang menghitung jumlah byte (karakter) yang dibaca"""
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self.bytes = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self._lines)
+        self.bytes += len(line)
+        return line
+
+
+class IsqlSessionError(Exception):
+    """Sesi isql mati, timeout, atau tidak dapat dijalankan"""
+    pass
+
+
+class IsqlTimeoutError(IsqlSessionError):
+    """isql tidak selesai dalam batas waktu; prosesnya sudah dihentikan"""
+    pass
+
+
+class IsqlQueryError(Exception):
+    """Query ditolak oleh Firebird di dalam sesi isql"""
+    pass
+
+
+class IsqlSession:
+    """
+    Sesi isql jangka panjang: satu proses isql per database.
+
+    Query dikirim lewat stdin dan setiap hasil dibatasi oleh sebuah sentinel
+    (SELECT konstanta unik dari RDB$DATABASE), sehingga biaya start proses dan
+    attach database hanya dibayar sekali. Gunakan sebagai context manager:
+
+        with connector.session():
+            connector.execute_query(...)
+
+    Selama sesi aktif, semua execute_query() pada connector memakai proses yang sama.
+    Jika proses isql mati, sesi dijalankan ulang secara otomatis.
+    """
+    SENTINEL_PREFIX = "IFESS_EOQ_"
+    PROMPT_PATTERN = re.compile(r'^(?:(?:SQL|CON)>\s*)+')
+    ERROR_MARKERS = ("Statement failed", "Dynamic SQL Error")
+
+    def __init__(self, connector, timeout=300, max_restarts=1):
+        """
+        :param connector: Instance FirebirdConnector
+        :param timeout: Batas waktu (detik) untuk satu query
+        :param max_restarts: Jumlah percobaan menjalankan ulang isql jika proses mati
+        """
+        self.connector = connector
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self.process = None
+        self.restarts = 0
+        self._lines = None
+        self._reader = None
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._owns_connector = False
+        self.spawn_time = 0.0
+
+    def _build_command(self):
+        return self.connector._isql_command()
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Menjalankan proses isql dan thread pembaca stdout"""
+        if self.is_alive():
+            return
+        if self.process is not None:
+            # Proses lama mati: bersihkan lalu hubungkan ulang
+            self.close()
+            self.restarts += 1
+        if not os.path.exists(self.connector.db_path):
+            raise FileNotFoundError(f"File database tidak ditemukan: {self.connector.db_path}")
+
+        cmd = self._build_command()
+        self.connector.logger.info("Membuka sesi isql: %s", self.connector.db_path)
+        started = time.perf_counter()
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,  # gabungkan agar pesan error berada sebelum sentinel
+                text=True,
+                errors='replace',
+                bufsize=1
+            )
+        except OSError as e:
+            raise IsqlSessionError(f"Gagal menjalankan isql: {e}")
+        self.spawn_time += time.perf_counter() - started
+
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read_stdout,
+                                        args=(self.process.stdout, self._lines),
+                                        daemon=True)
+        self._reader.start()
+
+    @staticmethod
+    def _read_stdout(stream, lines):
+        for line in iter(stream.readline, ''):
+            lines.put(line)
+        lines.put(None)  # EOF: proses selesai atau mati
+
+    def close(self):
+        """Menutup sesi isql"""
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            if process.poll() is None:
+                process.stdin.write("EXIT;\n")
+                process.stdin.flush()
+                process.wait(timeout=5)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+        finally:
+            for stream in (process.stdin, process.stdout):
+                try:
+                    stream.close()
+                except (OSError, ValueError):
+                    pass
+
+    def execute(self, query):
+        """
+        Menjalankan satu query di dalam sesi.
+
+        :param query: Query SQL
+        :return: Teks output isql untuk query tersebut (tanpa sentinel)
+        """
+        return '\n'.join(self.iter_lines(query))
+
+    def iter_lines(self, query):
+        """
+        Menjalankan satu query dan menghasilkan baris output isql satu per satu,
+        selagi isql masih menulis hasilnya.
+
+        Proses yang mati hanya dijalankan ulang jika belum ada baris yang dihasilkan.
+
+        :param query: Query SQL
+        :return: Generator baris output (tanpa sentinel dan prompt)
+        """
+        with self._lock:
+            attempts = 0
+            while True:
+                self.start()
+                produced = False
+                try:
+                    for line in self._iter_output(query):
+                        produced = True
+                        yield line
+                    return
+                except (BrokenPipeError, IsqlSessionError) as e:
+                    if isinstance(e, IsqlSessionError) and self.process is None:
+                        raise  # timeout: jangan ulangi query yang lama
+                    attempts += 1
+                    if produced or attempts > self.max_restarts:
+                        raise IsqlSessionError(f"Proses isql mati dan tidak dapat dipulihkan: {e}")
+                    self.connector.logger.warning("Proses isql mati (%s), menghubungkan ulang", e)
+
+    def _iter_output(self, query):
+        self._counter += 1
+        marker = f"{self.SENTINEL_PREFIX}{os.getpid()}_{self._counter}"
+        statement = query.strip().rstrip(';')
+
+        self.process.stdin.write(f"{statement};\n")
+        self.process.stdin.write("COMMIT;\n")
+        self.process.stdin.write(f"SELECT '{marker}' FROM RDB$DATABASE;\n")
+        self.process.stdin.flush()
+
+        deadline = time.monotonic() + self.timeout
+        # Dua baris non-kosong terakhir ditahan: bisa jadi header dan separator milik sentinel
+        held = []
+        error_lines = []
+        finished = False
+        try:
+            while True:
+                line = self._next_line(deadline)
+                if line.strip() == marker:
+                    finished = True
+                    break
+                if error_lines or line.strip().startswith(self.ERROR_MARKERS):
+                    error_lines.append(line.strip())
+                    continue
+                held.append(line)
+                while sum(1 for h in held if h.strip()) > 2:
+                    yield held.pop(0)
+        finally:
+            if not finished and self.is_alive():
+                # Konsumen berhenti lebih awal: buang sisa output agar query berikutnya bersih
+                self._drain(marker, deadline)
+
+        if error_lines:
+            self._strip_sentinel(error_lines)
+            raise IsqlQueryError(f"Error executing query: {' '.join(l for l in error_lines if l)}")
+
+        self._strip_sentinel(held)
+        yield from held
+
+    @staticmethod
+    def _strip_sentinel(lines):
+        """Membuang header dan separator milik query sentinel dari akhir list"""
+        while lines and not lines[-1].strip():
+            lines.pop()
+        if lines and set(lines[-1].strip()) <= set('= '):
+            lines.pop()
+        if lines:
+            lines.pop()
+
+    def _next_line(self, deadline):
+        """Mengambil satu baris stdout (tanpa prompt) sebelum deadline"""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.close()
+                raise IsqlSessionError(f"Timeout {self.timeout} detik menunggu hasil query")
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if line is None:
+                # stdout tertutup: pastikan proses benar-benar selesai agar is_alive() akurat
+                try:
+                    self.process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+                raise IsqlSessionError("isql berhenti sebelum sentinel diterima")
+            return self.PROMPT_PATTERN.sub('', line.rstrip('\r\n'))
+
+    def _drain(self, marker, deadline):
+        try:
+            while self._next_line(deadline).strip() != marker:
+                pass
+        except IsqlSessionError:
+            pass
+
+    def __enter__(self):
+        self.start()
+        if self.connector._session is None:
+            self.connector._session = self
+            self._owns_connector = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._owns_connector:
+            self.connector._session = None
+            self._owns_connector = False
+        self.close()
+        return False
+
+
+class IsqlOutputParser:
+    """
+    Parser streaming untuk output tabel isql.
+
+    Baris dimasukkan satu per satu lewat feed(); posisi kolom dihitung sekali
+    dari baris separator (====) dan setiap baris data dipotong sekaligus untuk
+    semua kolom. Nilai disimpan per kolom lalu dikonversi ke tipe yang sesuai
+    (int, float, date, datetime, None untuk <null>) saat result set selesai,
+    atau per chunk lewat iter_chunks().
+    """
+    NULL = '<null>'
+    SEPARATOR_PATTERN = re.compile(r'^[= ]*={3,}[= ]*$')
+    COLUMN_PATTERN = re.compile(r'=+')
+    PROMPT_PATTERN = re.compile(r'^(?:(?:SQL|CON)>\s*)+')
+    INT_PATTERN = re.compile(r'^-?(?:0|[1-9]\d*)$')
+    DECIMAL_PATTERN = re.compile(r'^-?\d+\.(\d+)$')
+    DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+    TIMESTAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)?$')
+    DIALECT1_DATE_PATTERN = re.compile(r'^\d{1,2}-[A-Z]{3}-\d{4}$')
+
+    def __init__(self):
+        self.result_sets = []
+        self._pending = None
+        self._headers = None
+        self._getter = None
+        self._widths = None
+        self._raw_rows = None
+        self._converters = None
+        self._chunks_taken = 0
+
+    @classmethod
+    def column_positions(cls, separator_line):
+        """
+        Mendapatkan posisi kolom dari baris separator
+
+        :param separator_line: Baris dengan karakter separator (===)
+        :return: List dari tuple (start, end) untuk setiap kolom
+        """
+        return [match.span() for match in cls.COLUMN_PATTERN.finditer(separator_line)]
+
+    def feed(self, line):
+        """Memproses satu baris output isql"""
+        line = line.rstrip('\r\n')
+        if line[:4] in ('SQL>', 'CON>'):
+            line = self.PROMPT_PATTERN.sub('', line)
+
+        if '===' in line and self.SEPARATOR_PATTERN.match(line):
+            # Baris sebelum separator adalah header dari result set baru
+            header_line, self._pending = self._pending, None
+            self._finish_result_set()
+            self._start_result_set(header_line or '', line)
+            return
+
+        # Tunda satu baris: baris ini bisa jadi header dari result set berikutnya
+        pending, self._pending = self._pending, line
+        if pending is not None:
+            self._add_row(pending)
+
+    def close(self):
+        """Menyelesaikan parsing dan mengembalikan semua result set"""
+        if self._pending is not None:
+            self._add_row(self._pending)
+            self._pending = None
+        self._finish_result_set()
+        return self.result_sets
+
+    def parse(self, lines):
+        """Memproses semua baris dari iterable (file, pipe, atau list)"""
+        for line in lines:
+            self.feed(line)
+        return self.close()
+
+    def iter_chunks(self, lines, chunksize):
+        """
+        Memproses baris dari iterable dan menghasilkan potongan result set
+        berisi paling banyak chunksize baris, selagi baris berikutnya masih dibaca.
+
+        Tipe kolom dipilih pada chunk pertama dan dipakai untuk chunk berikutnya.
+        """
+        for line in lines:
+            self.feed(line)
+            if self.result_sets:
+                finished, self.result_sets = self.result_sets, []
+                yield from finished
+            if self._raw_rows is not None and len(self._raw_rows) >= chunksize:
+                yield self._take_chunk()
+        finished, self.result_sets = self.close(), []
+        yield from finished
+
+    def _start_result_set(self, header_line, separator_line):
+        positions = self.column_positions(separator_line)
+        # Kolom terakhir dipotong sampai akhir baris karena trailing space sudah dibuang
+        slices = [slice(start, end) for start, end in positions[:-1]]
+        slices.append(slice(positions[-1][0], None))
+
+        if len(slices) == 1:
+            only = slices[0]
+            self._getter = lambda text: (text[only],)
+        else:
+            self._getter = itemgetter(*slices)
+
+        self._headers = [header.strip() for header in self._getter(header_line)]
+        self._widths = [end - start for start, end in positions]
+        self._raw_rows = []
+        self._converters = [None] * len(self._headers)
+        self._chunks_taken = 0
+
+    def _add_row(self, line):
+        if self._headers is None or not line or line.isspace() or line.startswith('Records affected'):
+            return
+        self._raw_rows.append(self._getter(line))
+
+    def _take_chunk(self):
+        columns = list(zip(*self._raw_rows)) if self._raw_rows else [()] * len(self._headers)
+        typed_columns = []
+        for i, column in enumerate(columns):
+            converter = self._converters[i]
+            text = converter is None and self._is_left_aligned(column, self._widths[i])
+            typed, self._converters[i] = self.convert_column(list(map(str.strip, column)), converter, text)
+            typed_columns.append(typed)
+
+        chunk = {
+            "headers": self._headers,
+            "columns": typed_columns,
+            "row_count": len(self._raw_rows)
+        }
+        self._raw_rows = []
+        self._chunks_taken += 1
+        return chunk
+
+    def _finish_result_set(self):
+        if self._headers is None:
+            return
+        if self._raw_rows or not self._chunks_taken:
+            self.result_sets.append(self._take_chunk())
+        self._headers = None
+        self._getter = None
+        self._widths = None
+        self._raw_rows = None
+        self._converters = None
+
+    @staticmethod
+    def _is_left_aligned(raw_values, width):
+        """
+        True jika kolom dicetak rata kiri seperti CHAR/VARCHAR; isql mencetak angka rata kanan.
+
+        Cukup satu nilai yang lebih pendek dari lebar kolom: nilai teks tidak diawali spasi,
+        angka selalu diawali spasi. Nilai kosong dan nilai selebar kolom dilewati.
+        """
+        for value in raw_values:
+            length = len(value.strip())
+            if 0 < length < width:
+                return value[0] != ' '
+        return False
+
+    @classmethod
+    def convert_column(cls, values, converter=None, text=False):
+        """
+        Mengonversi satu kolom teks ke tipe yang sesuai.
+
+        Kolom hanya dikonversi jika semua nilai non-null cocok dengan pola yang sama;
+        kode dengan nol di depan (mis. '007') tetap string. Kolom teks (CHAR/VARCHAR) tidak
+        pernah dikonversi ke angka, sehingga kode seperti TRANSNO bertipe sama di semua chunk.
+
+        :param values: Nilai kolom (sudah di-strip)
+        :param converter: Konverter yang dipilih pada chunk sebelumnya (None jika belum ada)
+        :param text: True jika kolom dicetak isql sebagai teks (rata kiri)
+        :return: Tuple (nilai terkonversi, konverter untuk chunk berikutnya; str berarti tetap string)
+        """
+        # Pola dan konversi dicek per nilai unik, bukan per sel
+        present = set(values)
+        present.discard(cls.NULL)
+        present.discard('')
+        if not present:
+            return [None if value == cls.NULL else value for value in values], converter
+
+        detected = cls._detect_converter(present)
+        if text and detected in (int, float):
+            detected = str
+        if converter is None:
+            converter = detected
+
+        if detected is str or detected != converter:
+            return [None if value == cls.NULL else value for value in values], converter
+
+        mapping = {value: converter(value) for value in present}
+        return [mapping.get(value) for value in values], converter
+
+    @classmethod
+    def _detect_converter(cls, present):
+        if all(cls.INT_PATTERN.match(value) for value in present):
+            return int
+        if all(cls.DECIMAL_PATTERN.match(value) for value in present):
+            # Kolom NUMERIC/DOUBLE dicetak isql dengan jumlah desimal tetap
+            if len({len(value.partition('.')[2]) for value in present}) == 1:
+                return float
+            return str
+        if all(cls.DATE_PATTERN.match(value) for value in present):
+            return date.fromisoformat
+        if all(cls.TIMESTAMP_PATTERN.match(value) for value in present):
+            return cls._parse_timestamp
+        if all(cls.DIALECT1_DATE_PATTERN.match(value) for value in present):
+            return cls._parse_dialect1_date
+        return str
+
+    @staticmethod
+    def _parse_timestamp(value):
+        # isql mencetak 4 digit pecahan detik (1/10000), fromisoformat butuh 3 atau 6
+        date_part, _, fraction = value.partition('.')
+        result = datetime.strptime(date_part, '%Y-%m-%d %H:%M:%S')
+        if fraction:
+            result = result.replace(microsecond=int(fraction.ljust(6, '0')[:6]))
+        return result
+
+    @staticmethod
+    def _parse_dialect1_date(value):
+        return datetime.strptime(value.title(), '%d-%b-%Y')
+
+    @staticmethod
+    def to_rows(result_set):
+        """Mengubah result set berbasis kolom menjadi list of dict"""
+        headers = result_set["headers"]
+        return [dict(zip(headers, values)) for values in zip(*result_set["columns"])]
+
+    @staticmethod
+    def to_frame(result_set):
+        """Mengubah result set berbasis kolom menjadi DataFrame tanpa membuat dict per baris"""
+        data = {}
+        for i, column in enumerate(result_set["columns"]):
+            # Kolom integer berisi NULL tetap int/None (object), bukan float/NaN
+            dtype = object if None in column and any(type(value) is int for value in column) else None
+            data[i] = pd.Series(column, dtype=dtype)
+        df = pd.DataFrame(data)
+        df.columns = result_set["headers"]
+        return df
+
+
+class FirebirdConnectionPool:
+    """
+    Pool koneksi driver DB-API, satu pool per database (dsn + user).
+
+    Koneksi yang selesai dipakai dikembalikan ke pool sehingga attach database
+    hanya dibayar sekali, bukan sekali per query seperti pada isql.
+    """
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, dsn, username, password, charset=None, max_size=4):
+        """
+        :param dsn: Path database atau format host:path
+        :param username: Username untuk koneksi
+        :param password: Password untuk koneksi
+        :param charset: Character set koneksi (default: bawaan database)
+        :param max_size: Jumlah maksimum koneksi idle yang disimpan
+        """
+        self.dsn = dsn
+        self.username = username
+        self.password = password
+        self.charset = charset
+        self.max_size = max_size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, dsn, username, password, charset=None, max_size=4):
+        """Mengambil pool untuk database ini, membuatnya jika belum ada"""
+        key = (dsn, username.upper(), password, charset)
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls(dsn, username, password, charset, max_size)
+                cls._pools[key] = pool
+            return pool
+
+    def acquire(self):
+        """Mengambil koneksi idle dari pool atau membuka koneksi baru"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+        kwargs = {'user': self.username, 'password': self.password}
+        if self.charset:
+            kwargs['charset'] = self.charset
+        return firebird_driver.connect(self.dsn, **kwargs)
+
+    def release(self, conn, ok=True):
+        """
+        Mengembalikan koneksi ke pool.
+
+        :param conn: Koneksi dari acquire()
+        :param ok: False jika query gagal; transaksi di-rollback, bukan di-commit
+        """
+        try:
+            if ok:
+                conn.commit()
+            else:
+                conn.rollback()
+        except Exception:
+            # Koneksi rusak, jangan dipakai ulang
+            self._close(conn)
+            return
+
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+        self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager: acquire() lalu release() secara otomatis"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, ok=False)
+            raise
+        self.release(conn)
+
+    def close(self):
+        """Menutup semua koneksi idle di pool ini"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+    @classmethod
+    def close_all(cls):
+        """Menutup semua pool yang pernah dibuat"""
+        with cls._pools_lock:
+            pools, cls._pools = list(cls._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class SnapshotCache:
+    """
+    Cache snapshot hasil query tabel bulanan (FFBSCANNERDATA{MM}) di disk.
+
+    Satu file Parquet (atau pickle jika Parquet tidak tersedia) per (database, tabel,
+    rentang tanggal). Nama file memuat hash dari path .FDB, mtime dan ukurannya, serta
+    teks query: database yang berubah atau query yang berbeda tidak memakai snapshot
+    lama. Snapshot hanya dihapus secara eksplisit lewat invalidate(), atau ditimpa jika
+    refresh=True.
+
+    Untuk bulan yang masih berjalan, sync() menyimpan salinan lokal per (database, tabel,
+    rentang) di subdirektori 'sync' dan hanya mengambil baris baru/berubah (delta) setiap
+    kali database berubah.
+    """
+
+    def __init__(self, cache_dir=None, enabled=True, refresh=False):
+        """
+        :param cache_dir: Direktori snapshot (default: DEFAULT_CACHE_DIR/snapshots)
+        :param enabled: False untuk selalu membaca dari database (--no-cache)
+        :param refresh: True untuk membaca ulang dari database dan menimpa snapshot
+        """
+        self.cache_dir = cache_dir or os.path.join(DEFAULT_CACHE_DIR, 'snapshots')
+        self.sync_dir = os.path.join(self.cache_dir, 'sync')
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.delta_rows = 0
+        self.logger = logging.getLogger(__name__)
+
+    def reset_stats(self):
+        """Nol-kan penghitung hits, misses dan delta_rows (mis. di awal setiap analisis)"""
+        self.hits = self.misses = self.delta_rows = 0
+
+    @staticmethod
+    def _db_signature(db_path):
+        """(path absolut, mtime, ukuran) file database, atau None jika bukan file lokal"""
+        try:
+            stat = os.stat(db_path)
+        except (OSError, TypeError):
+            return None
+        return os.path.normcase(os.path.abspath(db_path)), stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _prefix(db_file, table=None, start_date=None, end_date=None):
+        """Awalan nama file: database, lalu (opsional) tabel dan rentang tanggal"""
+        db_name = re.sub(r'[^A-Za-z0-9]+', '_', os.path.splitext(os.path.basename(db_file))[0])
+        db_hash = hashlib.sha1(db_file.encode('utf-8')).hexdigest()[:8]
+        prefix = f"{db_name}_{db_hash}__"
+        if table is not None:
+            prefix += f"{table}__{start_date}__{end_date}__"
+        return prefix
+
+    def _snapshot_base(self, db_path, table, start_date, end_date, query):
+        """(awalan, path tanpa ekstensi) snapshot, atau (None, None) jika database tidak bisa diidentifikasi"""
+        signature = self._db_signature(db_path)
+        if signature is None:
+            return None, None
+        normalized_query = ' '.join(query.split())
+        key = hashlib.sha256(json.dumps([*signature, normalized_query]).encode('utf-8')).hexdigest()[:16]
+        prefix = self._prefix(signature[0], table, start_date, end_date)
+        return prefix, os.path.join(self.cache_dir, prefix + key)
+
+    def load(self, db_path, table, start_date, end_date, query):
+        """
+        Membaca snapshot yang cocok.
+
+        :return: DataFrame, atau None jika tidak ada snapshot yang cocok
+        """
+        _, base = self._snapshot_base(db_path, table, start_date, end_date, query)
+        if base is None:
+            return None
+        return self._read(base)
+
+    def _read(self, base):
+        """Baca file .parquet atau .pkl untuk path tanpa ekstensi, None jika tidak ada"""
+        for extension, reader in (('.parquet', pd.read_parquet), ('.pkl', pd.read_pickle)):
+            path = base + extension
+            if not os.path.exists(path):
+                continue
+            try:
+                return reader(path)
+            except Exception as e:
+                self.logger.warning("Snapshot %s tidak dapat dibaca, diabaikan: %s", path, e)
+        return None
+
+    def save(self, db_path, table, start_date, end_date, query, df):
+        """
+        Menyimpan snapshot dan menghapus snapshot lama untuk (database, tabel, rentang) yang sama.
+
+        :return: Path file snapshot, atau None jika tidak disimpan
+        """
+        prefix, base = self._snapshot_base(db_path, table, start_date, end_date, query)
+        if base is None:
+            return None
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._write(df, base)
+        except Exception as e:
+            self.logger.warning("Snapshot %s gagal disimpan: %s", base, e)
+            return None
+
+        for old_path in glob.glob(os.path.join(self.cache_dir, glob.escape(prefix) + '*')):
+            if os.path.splitext(old_path)[0] != base:
+                self._remove(old_path)
+        return path
+
+    def _write(self, df, base):
+        """Tulis ke file sementara lalu rename, agar pembaca tidak melihat file setengah jadi"""
+        if PARQUET_ENGINE is not None:
+            path = base + '.parquet'
+            try:
+                df.to_parquet(path + '.tmp', engine=PARQUET_ENGINE, index=False)
+                os.replace(path + '.tmp', path)
+                return path
+            except Exception as e:
+                # Kolom object campuran (mis. angka dengan NULL) tidak selalu bisa ditulis ke Parquet
+                self._remove(path + '.tmp')
+                self.logger.debug("Parquet gagal untuk %s, memakai pickle: %s", base, e)
+
+        path = base + '.pkl'
+        df.to_pickle(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        return path
+
+    def fetch(self, connector, table, start_date, end_date, query, loader=None):
+        """
+        Mengambil data dari snapshot, atau dari database lalu menyimpannya sebagai snapshot.
+
+        :param connector: FirebirdConnector (db_path dipakai sebagai kunci snapshot)
+        :param table: Nama tabel bulanan, mis. FFBSCANNERDATA05
+        :param start_date: Awal rentang tanggal (bagian dari kunci)
+        :param end_date: Akhir rentang tanggal (bagian dari kunci)
+        :param query: Teks query (bagian dari kunci)
+        :param loader: Fungsi tanpa argumen yang mengembalikan DataFrame
+                       (default: execute_query tanpa result_cache + to_pandas untuk query)
+        :return: pandas.DataFrame
+        """
+        if loader is None:
+            # Data bulanan disimpan di snapshot, tidak perlu disalin ke result_cache connector
+            loader = lambda: connector.to_pandas(connector.execute_query(query, cache=False))
+        if not self.enabled:
+            return loader()
+
+        if not self.refresh:
+            df = self.load(connector.db_path, table, start_date, end_date, query)
+            if df is not None:
+                self.hits += 1
+                self.logger.info("Snapshot %s %s s/d %s dipakai, database tidak dibaca", table, start_date, end_date)
+                return df
+
+        self.misses += 1
+        df = loader()
+        self.save(connector.db_path, table, start_date, end_date, query, df)
+        return df
+
+    def sync(self, connector, table, start_date, end_date, query,
+             id_column='a.ID', timestamp_columns=('a.LASTUPDATED', 'a.UPLOADDATETIME')):
+        """
+        Mengambil data dari salinan lokal yang diperbarui secara inkremental.
+
+        Jika file database tidak berubah sejak sinkronisasi terakhir, salinan lokal dipakai
+        tanpa query. Jika berubah, hanya baris dengan ID di atas ID tertinggi salinan lokal,
+        atau dengan timestamp_columns sejak nilai tertinggi salinan lokal, yang diambil lalu
+        digabung dengan deduplikasi pada ID (baris terbaru dipakai). Baris yang dihapus di
+        database tetap ada di salinan lokal sampai refresh=True atau invalidate().
+
+        :param connector: FirebirdConnector (db_path dipakai sebagai kunci salinan lokal)
+        :param table: Nama tabel bulanan, mis. FFBSCANNERDATA05
+        :param start_date: Awal rentang tanggal (bagian dari kunci)
+        :param end_date: Akhir rentang tanggal (bagian dari kunci)
+        :param query: Query dengan klausa WHERE di akhir; kondisi delta ditambahkan dengan AND
+        :param id_column: Kolom ID di query (dengan alias tabel)
+        :param timestamp_columns: Kolom waktu perubahan di query (dengan alias tabel)
+        :return: pandas.DataFrame
+        """
+        # Salinan lokal sudah menyimpan hasilnya; result_cache connector tidak pernah kena untuk query ini
+        load = lambda sql: connector.to_pandas(connector.execute_query(sql, cache=False))
+        signature = self._db_signature(connector.db_path)
+        if not self.enabled or signature is None:
+            return load(query)
+
+        normalized_query = ' '.join(query.split())
+        key = hashlib.sha256(json.dumps([signature[0], normalized_query]).encode('utf-8')).hexdigest()[:16]
+        base = os.path.join(self.sync_dir, self._prefix(signature[0], table, start_date, end_date) + key)
+
+        local = state = None
+        if not self.refresh:
+            local = self._read(base)
+            state = self._read_state(base) if local is not None else None
+
+        if local is not None and state is not None and state.get('signature') == list(signature):
+            self.hits += 1
+            self.logger.info("Salinan lokal %s %s s/d %s dipakai, database tidak berubah", table, start_date, end_date)
+            return local
+
+        id_name = id_column.split('.')[-1]
+        condition = self._delta_condition(local, id_column, timestamp_columns) if local is not None else None
+        if condition is None:
+            self.misses += 1
+            df = load(query)
+        else:
+            delta = load(f"{query.rstrip()}\n  AND ({condition})")
+            self.hits += 1
+            self.delta_rows += len(delta)
+            self.logger.info("Salinan lokal %s %s s/d %s diperbarui: %d baris baru/berubah",
+                             table, start_date, end_date, len(delta))
+            df = local
+            if not delta.empty:
+                df = pd.concat([normalize_key_columns(local), normalize_key_columns(delta)], ignore_index=True)
+                df = df.drop_duplicates(subset=[id_name], keep='last').reset_index(drop=True)
+
+        try:
+            os.makedirs(self.sync_dir, exist_ok=True)
+            if df is not local:
+                self._write(df, base)
+            self._write_state(base, {'signature': list(signature)})
+        except Exception as e:
+            self.logger.warning("Salinan lokal %s gagal disimpan: %s", base, e)
+        return df
+
+    @staticmethod
+    def _delta_condition(local, id_column, timestamp_columns):
+        """Kondisi SQL untuk baris baru/berubah terhadap salinan lokal, None jika tidak ada watermark"""
+        conditions = []
+        id_name = id_column.split('.')[-1]
+        if id_name not in local.columns:
+            return None
+        max_id = pd.to_numeric(local[id_name], errors='coerce').max()
+        if pd.isna(max_id):
+            return None
+        conditions.append(f"{id_column} > {int(max_id)}")
+
+        for column in timestamp_columns:
+            name = column.split('.')[-1]
+            if name not in local.columns:
+                continue
+            latest = pd.to_datetime(local[name], errors='coerce').max()
+            if pd.notna(latest):
+                # >= agar perubahan pada detik yang sama tidak terlewat; duplikatnya dibuang lewat ID
+                conditions.append(f"{column} >= '{latest:%Y-%m-%d %H:%M:%S}'")
+        return ' OR '.join(conditions)
+
+    @staticmethod
+    def _read_state(base):
+        try:
+            with open(base + '.json', 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_state(base, state):
+        with open(base + '.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(base + '.json.tmp', base + '.json')
+
+    def invalidate(self, db_path=None, table=None):
+        """
+        Menghapus snapshot dan salinan lokal sync() secara eksplisit.
+
+        :param db_path: Hanya snapshot database ini (default: semua database)
+        :param table: Hanya snapshot tabel ini (default: semua tabel)
+        :return: Jumlah file yang dihapus
+        """
+        if db_path is not None:
+            db_file = os.path.normcase(os.path.abspath(db_path))
+            pattern = glob.escape(self._prefix(db_file)) + (f"{glob.escape(table)}__*" if table else '*')
+        else:
+            pattern = f"*__{glob.escape(table)}__*" if table else '*'
+
+        removed = 0
+        for directory in (self.cache_dir, self.sync_dir):
+            for path in glob.glob(os.path.join(directory, pattern)):
+                if path.endswith(('.parquet', '.pkl')) and self._remove(path):
+                    removed += 1
+                elif path.endswith('.json'):
+                    self._remove(path)
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+class ReferenceCache:
+    """
+    Cache data referensi per database (REFERENCE_QUERIES) sebagai dict kunci -> nilai.
+
+    Setiap tabel referensi dimuat sekali per database, disimpan di memori dan di disk
+    (JSON) selama ttl detik, sehingga dipakai bersama oleh semua estate, semua run dan
+    semua program yang memakai shared().
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir=None, ttl=DEFAULT_REFERENCE_TTL, enabled=True, refresh=False):
+        """
+        :param cache_dir: Direktori file JSON (default: DEFAULT_CACHE_DIR/reference)
+        :param ttl: Umur maksimum data referensi dalam detik
+        :param enabled: False untuk selalu membaca dari database
+        :param refresh: True untuk membaca ulang dari database dan menimpa cache
+        """
+        self.cache_dir = cache_dir or os.path.join(DEFAULT_CACHE_DIR, 'reference')
+        self.ttl = ttl
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def __getstate__(self):
+        # Lock tidak bisa di-pickle (worker mode 'process'); proses tujuan membuat lock baru
+        state = self.__dict__.copy()
+        del state['_locks'], state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """Instance bersama untuk seluruh proses, dibuat saat pertama kali dipakai"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def build_mapping(df, key_column, value_column):
+        """
+        Membuat dict kunci -> nilai dari hasil query tanpa iterasi per baris.
+
+        Kolom dicari dengan nama persis, lalu dengan nama yang mengandung key_column /
+        value_column (hasil isql kadang menggabungkan atau memotong header). Nilai kosong
+        dilewati; untuk kunci ganda baris terakhir yang dipakai.
+
+        :return: dict string -> string (kosong jika kolom tidak ditemukan)
+        """
+        def find(name):
+            columns = [str(col) for col in df.columns]
+            for col in columns:
+                if col.strip().upper() == name:
+                    return col
+            for col in columns:
+                if name in col.upper():
+                    return col
+            return None
+
+        key_col, value_col = find(key_column), find(value_column)
+        if df.empty or key_col is None or value_col is None:
+            return {}
+
+        if key_col == value_col:
+            # Header gabungan, mis. 'ID FIELDNO': setiap sel berisi "<kunci> <nilai>"
+            parts = df[key_col].astype('string').str.strip().str.split(n=1, expand=True)
+            if parts.shape[1] < 2:
+                return {}
+            keys, values = parts[0], parts[1].str.strip()
+        else:
+            keys = df[key_col].astype('string').str.strip()
+            values = df[value_col].astype('string').str.strip()
+        valid = keys.fillna('').ne('') & values.fillna('').ne('')
+        return dict(zip(keys[valid].tolist(), values[valid].tolist()))
+
+    def _path(self, db_file, name):
+        return os.path.join(self.cache_dir, SnapshotCache._prefix(db_file) + name + '.json')
+
+    def get(self, connector, name):
+        """
+        Mengambil data referensi untuk database connector.
+
+        :param connector: FirebirdConnector
+        :param name: Nama di REFERENCE_QUERIES, mis. 'employee'
+        :return: Salinan dict kunci -> nilai
+        """
+        query, key_column, value_column = REFERENCE_QUERIES[name]
+        if not self.enabled:
+            return self.build_mapping(connector.to_pandas(connector.execute_query(query)), key_column, value_column)
+
+        db_file = os.path.normcase(os.path.abspath(str(connector.db_path)))
+        key = (db_file, name)
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        # Satu loader per (database, tabel): estate lain yang butuh data yang sama menunggu hasilnya
+        with key_lock:
+            cached = self._cached(db_file, name)
+            if cached is not None:
+                self.hits += 1
+                return dict(cached)
+
+            self.misses += 1
+            return dict(self._store(connector, db_file, name, connector.execute_query(query)))
+
+    def _cached(self, db_file, name):
+        """Mapping dari memori atau disk jika belum kedaluwarsa, selain itu None"""
+        if self.refresh:
+            return None
+        key = (db_file, name)
+        cached = self._memory.get(key)
+        if cached is None:
+            cached = self._read(self._path(db_file, name))
+            if cached is not None:
+                self._memory[key] = cached
+        if cached is not None and time.time() - cached[0] < self.ttl:
+            return cached[1]
+        return None
+
+    def _store(self, connector, db_file, name, result):
+        """Membuat mapping dari hasil execute_query lalu menyimpannya di memori dan disk"""
+        _, key_column, value_column = REFERENCE_QUERIES[name]
+        now = time.time()
+        mapping = self.build_mapping(connector.to_pandas(result), key_column, value_column)
+        self._memory[(db_file, name)] = (now, mapping)
+        self._write(self._path(db_file, name), now, mapping)
+        self.logger.info("Data referensi %s dimuat dari %s: %d baris", name, db_file, len(mapping))
+        return mapping
+
+    def _read(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data['loaded_at'], data['mapping']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write(self, path, loaded_at, mapping):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'loaded_at': loaded_at, 'mapping': mapping}, f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            self.logger.warning("Data referensi %s gagal disimpan: %s", path, e)
+
+    def invalidate(self, db_path=None):
+        """
+        Menghapus data referensi dari memori dan disk.
+
+        :param db_path: Hanya database ini (default: semua database)
+        :return: Jumlah file yang dihapus
+        """
+        db_file = os.path.normcase(os.path.abspath(db_path)) if db_path is not None else None
+        with self._lock:
+            for key in list(self._memory):
+                if db_file is None or key[0] == db_file:
+                    del self._memory[key]
+
+        pattern = glob.escape(SnapshotCache._prefix(db_file)) + '*.json' if db_file else '*.json'
+        return sum(1 for path in glob.glob(os.path.join(self.cache_dir, pattern)) if SnapshotCache._remove(path))
+
+
+class QueryResultCache:
+    """
+    Cache hasil execute_query di memori (LRU) dengan tier disk opsional.
+
+    Kunci: (path database, mtime, ukuran file, as_dict, teks query yang dinormalisasi), sehingga
+    hasil lama tidak dipakai lagi setelah file database berubah. Hanya query SELECT pada file
+    database lokal dengan hasil kecil (<= max_result_rows baris) yang disimpan; data besar
+    ditangani SnapshotCache. Hasil yang dikembalikan dipakai bersama dan tidak boleh diubah pemanggil.
+    """
+
+    def __init__(self, max_entries=256, max_result_rows=10000, ttl=None, cache_dir=None):
+        """
+        :param max_entries: Jumlah hasil maksimum di memori; yang paling lama tidak dipakai dibuang
+        :param max_result_rows: Hasil dengan baris lebih banyak tidak disimpan
+        :param ttl: Umur maksimum hasil dalam detik (default: tidak kedaluwarsa)
+        :param cache_dir: Direktori tier disk (default: tanpa tier disk)
+        """
+        self.max_entries = max_entries
+        self.max_result_rows = max_result_rows
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def __getstate__(self):
+        # Lock tidak bisa di-pickle (worker mode 'process'); proses tujuan membuat lock baru
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(db_path, query, as_dict=True):
+        """Kunci cache, atau None jika query tidak boleh di-cache (bukan SELECT atau bukan file lokal)"""
+        normalized_query = ' '.join(query.split())
+        if not normalized_query.upper().startswith('SELECT'):
+            return None
+        signature = SnapshotCache._db_signature(str(db_path))
+        if signature is None:
+            return None
+        return (*signature, bool(as_dict), normalized_query)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()[:24]
+        return os.path.join(self.cache_dir, digest + '.pkl')
+
+    def _fresh(self, stored_at):
+        return self.ttl is None or time.time() - stored_at < self.ttl
+
+    def get(self, key):
+        """Hasil yang tersimpan untuk key, atau None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+        if self.cache_dir:
+            try:
+                stored = pd.read_pickle(self._disk_path(key))
+                if stored['key'] == key and self._fresh(stored['stored_at']):
+                    self._store(key, stored['stored_at'], stored['result'])
+                    with self._lock:
+                        self.disk_hits += 1
+                    return stored['result']
+            except Exception:
+                pass
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Menyimpan hasil execute_query jika cukup kecil"""
+        rows = sum(len(rs.get("rows", [])) for rs in result or [])
+        if rows > self.max_result_rows:
+            return
+        stored_at = time.time()
+        self._store(key, stored_at, result)
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                pd.to_pickle({'key': key, 'stored_at': stored_at, 'result': result}, path + '.tmp')
+                os.replace(path + '.tmp', path)
+            except Exception as e:
+                self.logger.warning("Hasil query gagal disimpan ke %s: %s", path, e)
+
+    def _store(self, key, stored_at, result):
+        with self._lock:
+            self._entries[key] = (stored_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, disk=False):
+        """Mengosongkan cache memori (dan tier disk jika disk=True)"""
+        with self._lock:
+            self._entries.clear()
+        if disk and self.cache_dir:
+            for path in glob.glob(os.path.join(self.cache_dir, '*.pkl')):
+                SnapshotCache._remove(path)
+
+    def stats(self):
+        """Penghitung cache: hits, disk_hits, misses, evictions, entries"""
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'entries': len(self._entries)}
+
+
+class IsqlProbe:
+    """
+    Hasil deteksi isql, dipakai bersama oleh semua FirebirdConnector dalam satu proses dan
+    disimpan di DEFAULT_CACHE_DIR/isql_probe.json: path isql hasil deteksi otomatis, versinya,
+    dan cara pemanggilan (VARIANTS) yang terbukti berfungsi per mode koneksi ('direct' untuk
+    -d path, 'localhost' untuk localhost:path). Data untuk suatu path dibuang jika file isql
+    berubah (mtime/ukuran).
+    """
+    DEFAULT_PATHS = [
+        r'C:\Program Files (x86)\Firebird\Firebird_1_5\bin\isql.exe',
+        r'C:\Program Files (x86)\Firebird-1.5.6.5026-0_win32_Manual\bin\isql.exe',
+        r'C:\Program Files (x86)\Firebird\bin\isql.exe',
+        r'C:\Program Files\Firebird\Firebird_2_5\bin\isql.exe',
+        r'C:\Program Files\Firebird\Firebird_3_0\bin\isql.exe',
+        r'C:\Program Files\Firebird\bin\isql.exe'
+    ]
+    # Cara pemanggilan isql tanpa sesi, urutan default dari yang paling murah
+    VARIANTS = ('pipe', 'output_file', 'stdout_file', 'stdin_localhost')
+    VERSION_PATTERN = re.compile(r'\b[A-Z]{2}-[A-Z]\d+(?:\.\d+)+')
+
+    cache_path = os.path.join(DEFAULT_CACHE_DIR, 'isql_probe.json')
+    _probes = {}
+    _detected = None
+    _lock = threading.RLock()
+
+    def __init__(self, isql_path, signature, version=None, variants=None):
+        self.isql_path = isql_path
+        self.signature = signature
+        self.version = version
+        self.variants = dict(variants or {})
+
+    @staticmethod
+    def _signature(isql_path):
+        try:
+            stat = os.stat(isql_path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @classmethod
+    def detect(cls):
+        """
+        Path isql.exe yang berfungsi: hasil deteksi sebelumnya jika masih ada, selain itu
+        DEFAULT_PATHS lalu PATH. Setiap kandidat diuji sekali dengan isql -z.
+        """
+        with cls._lock:
+            if cls._detected and os.path.exists(cls._detected):
+                return cls._detected
+
+            path = cls._load().get('detected')
+            if path and os.path.exists(path):
+                try:
+                    cls.for_path(path)
+                    cls._detected = path
+                    return path
+                except OSError:
+                    pass
+
+            candidates = list(cls.DEFAULT_PATHS)
+            on_path = shutil.which('isql.exe')
+            if on_path:
+                candidates.append(on_path)
+
+            logger = logging.getLogger(__name__)
+            for path in candidates:
+                if not os.path.exists(path):
+                    continue
+                try:
+                    cls.for_path(path)
+                except OSError as e:
+                    logger.warning("Found ISQL at %s but test failed: %s", path, e)
+                    continue
+                cls._detected = path
+                cls._update_disk(lambda data: data.update(detected=path))
+                return path
+
+        raise FileNotFoundError("Tidak dapat menemukan isql.exe yang berfungsi. Harap tentukan path secara manual.")
+
+    @classmethod
+    def for_path(cls, isql_path):
+        """
+        Probe untuk path isql: dari memori, dari disk, atau dengan menjalankan isql -z sekali.
+
+        :raises OSError: isql tidak dapat dijalankan
+        """
+        key = os.path.normcase(os.path.abspath(isql_path))
+        signature = cls._signature(isql_path)
+        with cls._lock:
+            probe = cls._probes.get(key)
+            if probe is not None and probe.signature == signature:
+                return probe
+
+            stored = cls._load().get('probes', {}).get(key)
+            if stored and stored.get('signature') == signature:
+                probe = cls(isql_path, signature, stored.get('version'), stored.get('variants'))
+            else:
+                probe = cls(isql_path, signature, cls.read_version(isql_path))
+                probe._save()
+            cls._probes[key] = probe
+            return probe
+
+    @classmethod
+    def read_version(cls, isql_path):
+        """
+        Versi isql dari output isql -z (stdin kosong agar isql langsung keluar).
+
+        :return: String versi, atau None jika tidak terbaca (mis. timeout)
+        :raises OSError: isql tidak dapat dijalankan
+        """
+        try:
+            result = subprocess.run([isql_path, "-z"], input='', capture_output=True, text=True,
+                                    errors='replace', timeout=10)
+        except subprocess.TimeoutExpired:
+            return None
+        match = cls.VERSION_PATTERN.search((result.stdout or '') + (result.stderr or ''))
+        return match.group(0) if match else None
+
+    def preferred_variants(self, mode):
+        """VARIANTS dengan variant yang terbukti berfungsi untuk mode ini di depan"""
+        known = self.variants.get(mode)
+        return [known] + [v for v in self.VARIANTS if v != known] if known in self.VARIANTS else list(self.VARIANTS)
+
+    def record_variant(self, mode, variant):
+        """Mencatat variant yang berhasil untuk mode koneksi ini"""
+        with self._lock:
+            self.variants[mode] = variant
+            self._save()
+
+    def _save(self):
+        key = os.path.normcase(os.path.abspath(self.isql_path))
+        entry = {'signature': self.signature, 'version': self.version, 'variants': self.variants}
+        self._update_disk(lambda data: data.setdefault('probes', {}).__setitem__(key, entry))
+
+    @classmethod
+    def _load(cls):
+        try:
+            with open(cls.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @classmethod
+    def _update_disk(cls, update):
+        """Baca-ubah-tulis file probe; kegagalan menulis hanya dicatat di log"""
+        data = cls._load()
+        update(data)
+        try:
+            os.makedirs(os.path.dirname(cls.cache_path), exist_ok=True)
+            tmp_path = f"{cls.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp_path, cls.cache_path)
+        except OSError as e:
+            logging.getLogger(__name__).warning("Hasil deteksi isql gagal disimpan: %s", e)
+
+
 class FirebirdConnector:
     """
-    Utilitas untuk koneksi ke database Firebird menggunakan isql
+    Utilitas untuk koneksi ke database Firebird menggunakan isql atau driver DB-API
     """
-    def __init__(self, db_path=None, username='sysdba', password='masterkey', isql_path=None, use_localhost=False):
+    BACKENDS = ('auto', 'driver', 'isql')
+
+    def __init__(self, db_path=None, username='sysdba', password='masterkey', isql_path=None, use_localhost=False,
+                 backend='auto', charset=None, result_cache=None, timeout=300):
         """
         Inisialisasi koneksi Firebird
 
@@ -21,11 +1542,38 @@ class FirebirdConnector:
         :param password: Password untuk koneksi (default: masterkey)
         :param isql_path: Path ke executable isql.exe (default: auto-detect)
         :param use_localhost: Jika True, gunakan format localhost:path untuk koneksi
+        :param backend: 'driver' (fdb/firebird-driver), 'isql', atau 'auto' (driver jika terpasang)
+        :param charset: Character set untuk koneksi driver (default: bawaan database)
+        :param result_cache: QueryResultCache untuk execute_query (default: tanpa cache);
+                             satu instance dapat dipakai bersama oleh beberapa connector
+        :param timeout: Batas waktu (detik) satu proses isql tanpa sesi (default: 300)
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend tidak dikenal: {backend} (pilihan: {', '.join(self.BACKENDS)})")
+
         self.db_path = db_path
         self.username = username
         self.password = password
         self.use_localhost = use_localhost
+        self.charset = charset
+        self.result_cache = result_cache
+        self.timeout = timeout
+        self._session = None
+        self.logger = logging.getLogger(__name__)
+        # Catatan waktu per query (spawn, db, parse, rows, bytes), terbaru di akhir
+        self.query_stats = deque(maxlen=200)
+
+        if backend != 'isql' and firebird_driver is not None:
+            self.backend = 'driver'
+        else:
+            if backend == 'driver':
+                self.logger.warning("Driver Firebird (fdb / firebird-driver) tidak terpasang, memakai isql")
+            self.backend = 'isql'
+
+        # Dengan backend driver, isql tidak wajib ada
+        if self.backend == 'driver' and isql_path is None:
+            self.isql_path = None
+            return
 
         # Auto-detect isql_path jika tidak disediakan
         if isql_path is None:
@@ -38,31 +1586,25 @@ class FirebirdConnector:
             raise FileNotFoundError(f"isql.exe tidak ditemukan di: {self.isql_path}")
 
     def _detect_isql_path(self):
-        """Deteksi otomatis lokasi isql.exe"""
-        default_paths = [
-            r'C:\Program Files (x86)\Firebird\Firebird_1_5\bin\isql.exe',
-            r'C:\Program Files (x86)\Firebird-1.5.6.5026-0_win32_Manual\bin\isql.exe',
-            r'C:\Program Files (x86)\Firebird\bin\isql.exe',
-            r'C:\Program Files\Firebird\Firebird_2_5\bin\isql.exe',
-            r'C:\Program Files\Firebird\Firebird_3_0\bin\isql.exe',
-            r'C:\Program Files\Firebird\bin\isql.exe'
-        ]
+        """Deteksi otomatis lokasi isql.exe (hasilnya di-cache per proses dan di disk, lihat IsqlProbe)"""
+        return IsqlProbe.detect()
 
-        for path in default_paths:
-            if os.path.exists(path):
-                # Verify that the ISQL is working
-                if self.test_isql(path):
-                    return path
-                print(f"Found ISQL at {path} but test failed")
+    @property
+    def concurrent_safe(self):
+        """True jika query boleh dijalankan bersamaan dari beberapa thread (tidak di dalam sesi isql)"""
+        return self._session is None
 
-        raise FileNotFoundError("Tidak dapat menemukan isql.exe yang berfungsi. Harap tentukan path secara manual.")
+    @property
+    def isql_version(self):
+        """Versi isql (mis. 'WI-V1.5.6.5026'), atau None jika tidak diketahui"""
+        return IsqlProbe.for_path(self.isql_path).version if self.isql_path else None
 
     def test_isql(self, isql_path):
         """Test apakah ISQL dapat dijalankan"""
         try:
             # In Firebird 1.5, the -z option may not be supported
             # Just test if the executable exists and can be started
-            print(f"Testing ISQL at: {isql_path}")
+            self.logger.debug("Testing ISQL at: %s", isql_path)
 
             # Try to run isql with a simple help command instead
             # Use -h which should be supported in most versions
@@ -72,537 +1614,514 @@ class FirebirdConnector:
                                    timeout=10)  # Increased timeout
 
             # If we got this far, the executable ran, even if it returned an error code
-            print(f"ISQL test successful. Return code: {result.returncode}")
+            self.logger.debug("ISQL test successful. Return code: %s", result.returncode)
             return True
         except subprocess.TimeoutExpired:
             # Handle timeout specially - in some cases this might still be valid
             # as the tool might be waiting for input
-            print(f"ISQL test timed out but executable exists. Assuming it works.")
+            self.logger.debug("ISQL test timed out but executable exists. Assuming it works.")
             return True
         except Exception as e:
-            print(f"ISQL test failed: {e}")
+            self.logger.warning("ISQL test failed: %s", e)
 
             # Even if the test command failed, check if the file exists and is executable
             if os.path.exists(isql_path) and os.access(isql_path, os.X_OK):
-                print(f"ISQL exists and appears to be executable, proceeding anyway")
+                self.logger.info("ISQL exists and appears to be executable, proceeding anyway")
                 return True
 
             return False
 
-    def execute_query(self, query, params=None, as_dict=True):
+    def session(self, timeout=300):
+        """
+        Membuka sesi isql jangka panjang untuk database ini.
+
+        :param timeout: Batas waktu (detik) untuk satu query di dalam sesi
+        :return: IsqlSession yang dapat dipakai sebagai context manager
+        """
+        if self.backend == 'driver':
+            # Backend driver sudah memakai pool koneksi, sesi isql tidak diperlukan
+            return nullcontext()
+        return IsqlSession(self, timeout=timeout)
+
+    def execute_query(self, query, params=None, as_dict=True, cache=True):
         """
         Menjalankan query SQL dan mengembalikan hasilnya
 
         :param query: Query SQL yang akan dijalankan
         :param params: Parameter untuk query (not used in current implementation)
         :param as_dict: Jika True, hasil dikembalikan sebagai list dari dictionaries
+        :param cache: False untuk tidak memakai result_cache (data yang sudah disimpan SnapshotCache)
         :return: Hasil query dalam format JSON
         """
-        # Buat file SQL untuk query
-        fd, sql_path = tempfile.mkstemp(suffix='.sql')
-        output_fd, output_path = tempfile.mkstemp(suffix='.txt')
-
-        try:
-            # Pastikan file executable isql ada
-            if not os.path.exists(self.isql_path):
-                raise FileNotFoundError(f"ISQL executable tidak ditemukan: {self.isql_path}")
-
-            # Pastikan file database ada
-            if not os.path.exists(self.db_path):
-                raise FileNotFoundError(f"File database tidak ditemukan: {self.db_path}")
-
-            # Buat connection string dengan format yang sesuai
-            # Format bisa berupa path langsung atau localhost:path
-            if self.use_localhost:
-                connection_string = f"localhost:{self.db_path}"
-            else:
-                connection_string = self.db_path
-
-            with os.fdopen(fd, 'w') as sql_file:
-                # Jangan gunakan CONNECT untuk Firebird 1.5, gunakan parameter koneksi dari command line
-                # sql_file.write(f"CONNECT \"{connection_string}\" USER {self.username} PASSWORD {self.password};\n")
-
-                # Untuk Firebird 1.5, hindari menggunakan SET commands yang mungkin tidak didukung
-                # Langsung tulis query saja
-                sql_file.write(f"{query};\n")
-                sql_file.write("COMMIT;\n")
-                sql_file.write("EXIT;\n")
+        if self.result_cache is None or not cache:
+            return self._execute(query, as_dict)
+
+        key = QueryResultCache.make_key(self.db_path, query, as_dict)
+        if key is None:
+            return self._execute(query, as_dict)
+        result = self.result_cache.get(key)
+        if result is None:
+            result = self._execute(query, as_dict)
+            self.result_cache.put(key, result)
+        return result
+
+    def _execute(self, query, as_dict=True):
+        """Menjalankan query tanpa cache hasil"""
+        if self.backend == 'driver':
+            return self._execute_driver(query)
+
+        if self._session is not None:
+            try:
+                spawn_before = self._session.spawn_time
+                started = time.perf_counter()
+                output_text = self._session.execute(query)
+                fetched = time.perf_counter()
+                result = self._parse_isql_output(output_text, as_dict)
+                spawn_time = self._session.spawn_time - spawn_before
+                self._record_query(query, 'session', spawn_time, fetched - started - spawn_time,
+                                   time.perf_counter() - fetched, result, len(output_text))
+                return result
+            except IsqlSessionError as e:
+                self.logger.warning("Sesi isql gagal (%s), kembali ke mode satu proses per query", e)
+
+        return self._execute_isql(query, as_dict)
+
+    def _get_pool(self):
+        """Pool koneksi driver untuk database ini"""
+        dsn = f"localhost:{self.db_path}" if self.use_localhost else self.db_path
+        return FirebirdConnectionPool.get(dsn, self.username, self.password, self.charset)
+
+    def _execute_driver(self, query):
+        """
+        Menjalankan query lewat driver DB-API.
 
-            print(f"Executing query via ISQL: {query[:100]}...")
-            print(f"Database path: {self.db_path}")
-
-            # Debug info - tampilkan file SQL
-            with open(sql_path, 'r') as f:
-                print(f"SQL File Contents:\n{f.read()}")
-
-            # Close the output file handle to prevent access errors
-            os.close(output_fd)
-
-            # Untuk Firebird 1.5, gunakan format yang lebih sederhana
-            # Gunakan format parameter yang sesuai berdasarkan mode koneksi
-            if self.use_localhost:
-                # Format untuk localhost:path
-                cmd = [
-                    self.isql_path,
-                    "-u", self.username,
-                    "-p", self.password,
-                    connection_string,
-                    "-i", sql_path,
-                    "-o", output_path
-                ]
-            else:
-                # Format untuk path langsung dengan -database
-                cmd = [
-                    self.isql_path,
-                    "-u", self.username,
-                    "-p", self.password,
-                    "-d", connection_string,
-                    "-i", sql_path,
-                    "-o", output_path
-                ]
-            print(f"Running command: {' '.join(cmd)}")
-
-            process_result = subprocess.run(cmd, check=False, capture_output=True, timeout=300)  # Increased timeout to 5 minutes
-            print(f"ISQL process completed with return code: {process_result.returncode}")
-
-            # Log informasi debug
-            if process_result.stdout:
-                print(f"STDOUT: {process_result.stdout}")
-            if process_result.stderr:
-                print(f"STDERR: {process_result.stderr}")
-
-            # Jika proses gagal, coba dengan argumen koneksi alternatif
-            if process_result.returncode != 0:
-                print("Command gagal, mencoba metode alternatif...")
-
-                # Coba metode alternatif yang lebih sederhana
-                if self.use_localhost:
-                    alt_cmd = [
-                        self.isql_path,
-                        connection_string,
-                        "-u", self.username,
-                        "-p", self.password
-                    ]
-                else:
-                    alt_cmd = [
-                        self.isql_path,
-                        "-d", connection_string,
-                        "-u", self.username,
-                        "-p", self.password
-                    ]
-
-                # Tambahkan file input
-                alt_cmd.extend(["-i", sql_path])
-                print(f"Running alternative command: {' '.join(alt_cmd)}")
-
-                process_result = subprocess.run(alt_cmd, check=False, capture_output=True, timeout=300)  # Increased timeout to 5 minutes
-                print(f"Alternative command completed with return code: {process_result.returncode}")
-
-                if process_result.stdout:
-                    print(f"STDOUT: {process_result.stdout}")
-                if process_result.stderr:
-                    print(f"STDERR: {process_result.stderr}")
-
-                # Jika masih gagal, coba tanpa parameter output
-                if process_result.returncode != 0:
-                    print("Alternatif pertama gagal, mencoba metode ketiga...")
-
-                    # Coba dengan format yang sangat sederhana
-                    if self.use_localhost:
-                        simpler_cmd = [
-                            self.isql_path,
-                            connection_string,
-                            "-u", self.username,
-                            "-p", self.password,
-                            "-i", sql_path
-                        ]
-                    else:
-                        simpler_cmd = [
-                            self.isql_path,
-                            "-d", connection_string,
-                            "-u", self.username,
-                            "-p", self.password,
-                            "-i", sql_path
-                        ]
-                    print(f"Running simpler command: {' '.join(simpler_cmd)}")
-
-                    # Redirect output langsung ke file
-                    with open(output_path, 'w') as output_file:
-                        process_result = subprocess.run(simpler_cmd, check=False,
-                                                     stdout=output_file, stderr=subprocess.PIPE,
-                                                     text=True, timeout=300)  # Increased timeout to 5 minutes
-
-                    print(f"Simpler command completed with return code: {process_result.returncode}")
-                    if process_result.stderr:
-                        print(f"STDERR: {process_result.stderr}")
-
-            # Baca hasil dari file output
-            if os.path.exists(output_path):
-                try:
-                    with open(output_path, 'r') as output_file:
-                        output_text = output_file.read()
-
-                    print(f"ISQL output: {len(output_text)} bytes")
-                    if output_text:
-                        print("First 500 chars of output:")
-                        print(output_text[:500])
-                    else:
-                        print("WARNING: Output file kosong!")
-                except Exception as e:
-                    print(f"Error reading output file: {e}")
-                    output_text = ""
-            else:
-                print("WARNING: Output file tidak ditemukan")
-                output_text = ""
-
-            # Jika output masih kosong, coba jalankan langsung tanpa file
-            if len(output_text) == 0:
-                print("WARNING: Output masih kosong! Mencoba gunakan cara alternatif...")
-                # Gunakan cara alternatif tanpa file output
-                # Coba dengan format yang paling sederhana - gunakan localhost format
-                # Untuk Firebird 1.5, localhost format lebih reliable
-                connection_string_local = f"localhost:{self.db_path}"
-                direct_cmd = [
-                    self.isql_path,
-                    connection_string_local,
-                    "-u", self.username,
-                    "-p", self.password
+        Nilai kolom dikembalikan dengan tipe aslinya (int, date, Decimal, None untuk NULL);
+        string CHAR di-strip seperti pada hasil isql.
+        """
+        # isql memakai ';' sebagai terminator, DSQL tidak menerimanya
+        statement = query.strip().rstrip(';').strip()
+
+        started = time.perf_counter()
+        with self._get_pool().connection() as conn:
+            connected = time.perf_counter()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(statement)
+                if cursor.description is None:
+                    return []
+                headers = [desc[0].strip() for desc in cursor.description]
+                records = cursor.fetchall()
+                fetched = time.perf_counter()
+                rows = [
+                    {header: value.strip() if isinstance(value, str) else value
+                     for header, value in zip(headers, record)}
+                    for record in records
                 ]
+            finally:
+                cursor.close()
 
-                # Buat file SQL sederhana untuk dibaca dari stdin
-                simple_sql_fd, simple_sql_path = tempfile.mkstemp(suffix='.sql')
-                with os.fdopen(simple_sql_fd, 'w') as simple_sql:
-                    # Untuk Firebird 1.5, gunakan query yang sangat sederhana
-                    # Tidak lagi membatasi jumlah baris yang diambil
-                    simple_sql.write(f"{query};\n")
-                    # Add EXIT command to properly terminate the session
-                    simple_sql.write("EXIT;\n")
-
-                try:
-                    with open(simple_sql_path, 'r') as sql_input:
-                        direct_process = subprocess.run(
-                            direct_cmd,
-                            stdin=sql_input,
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE,
-                            text=True,
-                            check=True,
-                            timeout=600  # Increased timeout to 10 minutes
-                        )
-                        output_text = direct_process.stdout
-                        if output_text:
-                            print(f"Direct command output: {len(output_text)} bytes")
-                            print(output_text[:500])
-                finally:
-                    if os.path.exists(simple_sql_path):
-                        os.unlink(simple_sql_path)
-
-            # Parse hasil ke JSON
-            result = self._parse_isql_output(output_text, as_dict)
-            return result
-
-        except subprocess.CalledProcessError as cpe:
-            print(f"ISQL command failed with return code {cpe.returncode}")
-            print(f"STDOUT: {cpe.stdout}")
-            print(f"STDERR: {cpe.stderr}")
-            stderr_msg = cpe.stderr
-            if isinstance(stderr_msg, bytes):
-                stderr_msg = stderr_msg.decode()
-            raise Exception(f"Error executing query: {stderr_msg if stderr_msg else 'Unknown error'}")
-        except Exception as e:
-            print(f"Error executing query: {e}")
-            import traceback
-            traceback.print_exc()
-            raise
-        finally:
-            # Cleanup
-            if os.path.exists(sql_path):
-                os.unlink(sql_path)
-            if os.path.exists(output_path):
-                os.unlink(output_path)
+        result = [{"headers": headers, "rows": rows}]
+        self._record_query(query, 'driver', connected - started, fetched - connected,
+                           time.perf_counter() - fetched, result, None)
+        return result
 
-    def _parse_isql_output(self, output_text, as_dict=True):
+    def iter_query(self, query, chunksize=50000):
         """
-        Parse output dari isql ke format yang lebih terstruktur
+        Menjalankan query dan menghasilkan DataFrame per potongan (chunk) selagi
+        hasil masih dibaca, tanpa menyimpan seluruh output atau list row dict.
 
-        :param output_text: Teks output dari isql
-        :param as_dict: Jika True, hasil dikembalikan sebagai list dari dictionaries
-        :return: Data terstruktur dari hasil query
+        :param query: Query SQL
+        :param chunksize: Jumlah baris maksimum per DataFrame
+        :return: Generator pandas.DataFrame
         """
-        lines = output_text.strip().split('\n')
-        if not lines:
-            return []
+        started = time.perf_counter()
+        rows = 0
+        counted = None
 
-        print(f"Original ISQL output ({len(lines)} lines):")
-        for i, line in enumerate(lines[:30]):  # Print first 30 lines for debugging
-            print(f"Line {i+1}: {line}")
+        if self.backend == 'driver':
+            chunks = self._iter_driver(query, chunksize)
+        else:
+            if self._session is not None:
+                lines = self._session.iter_lines(query)
+            else:
+                lines = self._iter_isql_lines(query)
+            counted = _CountingLines(lines)
+            chunks = (IsqlOutputParser.to_frame(result_set)
+                      for result_set in IsqlOutputParser().iter_chunks(counted, chunksize))
+
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+
+        # Waktu spawn, DB dan parse bercampur saat streaming; dicatat sebagai db_time
+        self._record_query(query, 'iter', 0.0, time.perf_counter() - started, None, rows,
+                           counted.bytes if counted is not None else None)
+
+    def _iter_driver(self, query, chunksize):
+        """Versi iter_query untuk backend driver: fetchmany per chunk"""
+        statement = query.strip().rstrip(';').strip()
+
+        with self._get_pool().connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(statement)
+                if cursor.description is None:
+                    return
+                headers = [desc[0].strip() for desc in cursor.description]
+
+                def to_frame(records):
+                    columns = [
+                        [value.strip() if isinstance(value, str) else value for value in column]
+                        for column in zip(*records)
+                    ] if records else [[] for _ in headers]
+                    return IsqlOutputParser.to_frame({"headers": headers, "columns": columns})
+
+                # Chunk pertama selalu dikirim agar nama kolom tersedia walau hasil kosong
+                records = cursor.fetchmany(chunksize)
+                yield to_frame(records)
+                while len(records) == chunksize:
+                    records = cursor.fetchmany(chunksize)
+                    if not records:
+                        break
+                    yield to_frame(records)
+            finally:
+                cursor.close()
+
+    def _isql_command(self):
+        """Command line isql untuk database ini, membaca SQL dari stdin"""
+        if self.use_localhost:
+            return [
+                self.isql_path,
+                f"localhost:{self.db_path}",
+                "-u", self.username,
+                "-p", self.password
+            ]
+        return [
+            self.isql_path,
+            "-u", self.username,
+            "-p", self.password,
+            "-d", self.db_path
+        ]
 
-        result_data = []
-        current_result = None
-        headers = None
-        header_positions = []
-        data_started = False
-        prev_line = ""
+    def _iter_isql_lines(self, query):
+        """Menjalankan satu proses isql dan menghasilkan baris stdout selagi isql menulis"""
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"File database tidak ditemukan: {self.db_path}")
 
-        # Detection variables
-        has_separator_line = False
-        possible_header_line = None
-        data_lines = []
+        statement = query.strip().rstrip(';')
+        try:
+            process = subprocess.Popen(
+                self._isql_command(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,  # pesan error ikut dibaca dan dideteksi di bawah
+                text=True,
+                errors='replace'
+            )
+        except OSError as e:
+            raise IsqlSessionError(f"Gagal menjalankan isql: {e}")
+        # stdin ditulis dari thread lain: isql menulis prompt dan hasil selagi membaca skrip,
+        # sehingga skrip yang lebih besar dari buffer pipe tidak membuat kedua sisi saling menunggu
+        writer = threading.Thread(target=self._write_stdin, args=(process.stdin, f"{statement};\nEXIT;\n"),
+                                  daemon=True)
+        writer.start()
+        error_lines = []
+        try:
+            for line in self._read_lines(process, process.stdout):
+                if error_lines or line.strip().startswith(IsqlSession.ERROR_MARKERS):
+                    error_lines.append(line.strip())
+                    continue
+                yield line
 
-        for i, line in enumerate(lines):
-            line = line.rstrip()
+            returncode = process.wait()
+        finally:
+            if process.poll() is None:
+                # Konsumen berhenti lebih awal
+                process.kill()
+                process.wait()
+            writer.join()
+            process.stdout.close()
+
+        if error_lines:
+            raise IsqlQueryError(f"Error executing query: {' '.join(l for l in error_lines if l)}")
+        if returncode != 0:
+            # Tanpa pesan error SQL: isql tidak dapat terhubung atau argumen tidak dikenali
+            raise IsqlSessionError(f"isql keluar dengan kode {returncode}")
+
+    def _read_lines(self, process, stream):
+        """
+        Menghasilkan baris dari stream proses isql sampai EOF.
 
-            # Skip certain lines
-            if not line or line.startswith('SQL>') or "rows affected" in line.lower():
-                continue
+        Stream dibaca oleh thread lain, sehingga menunggu baris berikutnya dapat dibatasi
+        self.timeout sejak pembacaan dimulai; jika terlewati proses dihentikan.
+        """
+        lines = queue.Queue()
+        reader = threading.Thread(target=IsqlSession._read_stdout, args=(stream, lines), daemon=True)
+        reader.start()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                line = lines.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                process.kill()
+                process.wait()
+                raise IsqlTimeoutError(f"Timeout {self.timeout} detik menunggu hasil isql")
+            if line is None:
+                return
+            yield line
+
+    def _execute_isql(self, query, as_dict=True):
+        """
+        Menjalankan query dengan satu proses isql baru (mode tanpa sesi).
 
-            # Look for separator line with ===== or -----
-            if ('=' * 3) in line or ('-' * 3) in line:
-                if i > 0 and not has_separator_line:
-                    possible_header_line = lines[i-1].rstrip()
-                    has_separator_line = True
-                    # Get column positions from separator
-                    header_positions = self._get_column_positions(line)
+        Cara pemanggilan (IsqlProbe.VARIANTS) dicoba mulai dari yang terakhir terbukti
+        berfungsi untuk isql ini, sehingga biasanya hanya satu proses isql yang dijalankan.
+        Default-nya 'pipe': SQL lewat stdin dan hasil dibaca dari stdout tanpa file sementara.
+        """
+        mode = 'localhost' if self.use_localhost else 'direct'
+        probe = IsqlProbe.for_path(self.isql_path)
+        known = probe.variants.get(mode)
+        runners = {
+            'pipe': self._execute_isql_pipe,
+            'output_file': self._execute_isql_output_file,
+            'stdout_file': self._execute_isql_stdout_file,
+            'stdin_localhost': self._execute_isql_stdin_localhost,
+        }
+
+        last_error = None
+        for variant in probe.preferred_variants(mode):
+            try:
+                result = runners[variant](query, as_dict, trusted=variant == known)
+            except IsqlTimeoutError:
+                # Query lambat, bukan cara pemanggilan yang salah: variant lain tidak dicoba
+                raise
+            except IsqlSessionError as e:
+                # isql tidak dapat dijalankan dengan cara ini; SQL error (IsqlQueryError) tidak diulang
+                self.logger.info("isql variant %s gagal: %s", variant, e)
+                last_error = e
                 continue
+            if variant != known:
+                probe.record_variant(mode, variant)
+            return result
 
-            # If we found header/separator, collect data rows
-            if has_separator_line and possible_header_line:
-                # Skip lines immediately after separator that might be empty or contain column info
-                if i > 0 and lines[i-1].rstrip() and ('=' * 3) in lines[i-1] or ('-' * 3) in lines[i-1]:
-                    continue
+        self.logger.error("Error executing query: %s", last_error)
+        raise Exception(f"Error executing query: {last_error}")
+
+    def _execute_isql_pipe(self, query, as_dict=True, trusted=True):
+        """Menjalankan query lewat stdin/stdout isql dan mem-parse hasil selagi dibaca"""
+        started = time.perf_counter()
+        counted = _CountingLines(self._iter_isql_lines(query))
+        result = self._parse_isql_output(counted, as_dict)
+        if counted.bytes == 0 and not trusted:
+            # Belum terbukti: isql interaktif selalu mencetak prompt, output kosong berarti
+            # isql mengabaikan SQL dari stdin
+            raise IsqlSessionError("Output isql kosong dengan variant pipe")
+        # Waktu spawn, DB dan parse bercampur saat streaming; dicatat sebagai db_time
+        self._record_query(query, 'pipe', 0.0, time.perf_counter() - started, None, result, counted.bytes)
+        return result
+
+    def _connection_args(self):
+        """Argumen database untuk command line isql: positional localhost:path atau -d path"""
+        if self.use_localhost:
+            return [f"localhost:{self.db_path}"]
+        return ["-d", self.db_path]
+
+    @contextmanager
+    def _isql_files(self, query):
+        """File input SQL dan file output sementara (variant berbasis file), dihapus setelah dipakai"""
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"File database tidak ditemukan: {self.db_path}")
 
-                data_lines.append(line)
-
-        # Process collected data if we have a header
-        if has_separator_line and possible_header_line and header_positions:
-            # Parse headers from the header line
-            print(f"Found header line: {possible_header_line}")
-            print(f"Header positions: {header_positions}")
-
-            headers = []
-            for start, end in header_positions:
-                if start < len(possible_header_line):
-                    if end <= len(possible_header_line):
-                        header = possible_header_line[start:end].strip()
-                    else:
-                        header = possible_header_line[start:].strip()
-                    headers.append(header)
-
-            print(f"Extracted headers: {headers}")
-
-            # Parse data rows
-            rows = []
-            for line in data_lines:
-                # Skip empty lines
-                if not line.strip():
-                    continue
-
-                row = {}
-                for i, (start, end) in enumerate(header_positions):
-                    if i >= len(headers):
-                        continue
-                    col_name = headers[i]
-                    if start < len(line):
-                        if end <= len(line):
-                            value = line[start:end].strip()
-                        else:
-                            value = line[start:].strip()
-                    else:
-                        value = ""
-                    row[col_name] = value
-
-                # Only add rows that actually have data
-                if any(v.strip() for v in row.values()):
-                    rows.append(row)
-
-            # Create result set
-            result = {"headers": headers, "rows": rows}
-            result_data.append(result)
-
-            print(f"Parsed {len(rows)} data rows")
-            if rows:
-                print(f"Sample first row: {rows[0]}")
-
-        # If no proper data found with standard parsing, try alternative parsing
-        if not result_data:
-            print("No results from standard parsing, trying alternative method...")
-
-            # Try to parse FireBird tabular output format (works with newer versions)
-            in_table = False
-            headers = []
-            rows = []
-            current_row = {}
-
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
+        fd, sql_path = tempfile.mkstemp(suffix='.sql')
+        output_fd, output_path = tempfile.mkstemp(suffix='.txt')
+        os.close(output_fd)
+        try:
+            with os.fdopen(fd, 'w') as sql_file:
+                # Firebird 1.5: tanpa CONNECT dan SET, koneksi lewat parameter command line
+                sql_file.write(f"{query};\n")
+                sql_file.write("COMMIT;\n")
+                sql_file.write("EXIT;\n")
+            self.logger.debug("isql query db=%s sql=%s", self.db_path, query)
+            yield sql_path, output_path
+        finally:
+            for path in (sql_path, output_path):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    def _finish_file_variant(self, query, as_dict, trusted, variant, process_result, spawn_time,
+                             started, output_path):
+        """Cek hasil variant berbasis file lalu parse file output"""
+        stderr_text = (process_result.stderr or '').strip()
+        if any(line.strip().startswith(IsqlSession.ERROR_MARKERS) for line in stderr_text.splitlines()):
+            raise IsqlQueryError(f"Error executing query: {stderr_text}")
+        if process_result.returncode != 0:
+            raise IsqlSessionError(f"isql keluar dengan kode {process_result.returncode}: {stderr_text}")
+
+        output_size = os.path.getsize(output_path)
+        if output_size == 0 and not trusted:
+            # Belum terbukti: output kosong bisa berarti isql mengabaikan cara ini
+            raise IsqlSessionError(f"Output isql kosong dengan variant {variant}")
+
+        fetched = time.perf_counter()
+        with open(output_path, 'r') as output_file:
+            result = self._parse_isql_output(output_file, as_dict)
+        self._record_query(query, 'isql', spawn_time, fetched - started - spawn_time,
+                           time.perf_counter() - fetched, result, output_size)
+        return result
+
+    def _execute_isql_output_file(self, query, as_dict=True, trusted=True):
+        """Variant file: -i file SQL dan -o file output"""
+        with self._isql_files(query) as (sql_path, output_path):
+            cmd = [self.isql_path, "-u", self.username, "-p", self.password, *self._connection_args(),
+                   "-i", sql_path, "-o", output_path]
+            started = time.perf_counter()
+            try:
+                process_result, spawn_time = self._run_isql(cmd)
+            except OSError as e:
+                raise IsqlSessionError(f"Gagal menjalankan isql: {e}")
+            return self._finish_file_variant(query, as_dict, trusted, 'output_file', process_result,
+                                             spawn_time, started, output_path)
+
+    def _execute_isql_stdout_file(self, query, as_dict=True, trusted=True):
+        """Variant file: -i file SQL, stdout diarahkan ke file output (isql tanpa dukungan -o)"""
+        with self._isql_files(query) as (sql_path, output_path):
+            cmd = [self.isql_path, *self._connection_args(), "-u", self.username, "-p", self.password,
+                   "-i", sql_path]
+            started = time.perf_counter()
+            try:
+                with open(output_path, 'w') as output_file:
+                    process_result, spawn_time = self._run_isql(cmd, stdout=output_file)
+            except OSError as e:
+                raise IsqlSessionError(f"Gagal menjalankan isql: {e}")
+            return self._finish_file_variant(query, as_dict, trusted, 'stdout_file', process_result,
+                                             spawn_time, started, output_path)
+
+    def _execute_isql_stdin_localhost(self, query, as_dict=True, trusted=True):
+        """Variant terakhir: format localhost:path, SQL lewat stdin, stderr terpisah"""
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"File database tidak ditemukan: {self.db_path}")
+
+        cmd = [self.isql_path, f"localhost:{self.db_path}", "-u", self.username, "-p", self.password]
+        started = time.perf_counter()
+        try:
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, text=True, errors='replace')
+        except OSError as e:
+            raise IsqlSessionError(f"Gagal menjalankan isql: {e}")
+        spawn_time = time.perf_counter() - started
+
+        # Stdout dibaca selagi isql menulis: stdin ditulis dari thread lain agar tidak saling menunggu
+        writer = threading.Thread(target=self._write_stdin, args=(process.stdin, f"{query};\nEXIT;\n"),
+                                  daemon=True)
+        writer.start()
+        # stdin sudah ditutup oleh writer: communicate() tidak bisa dipakai (flush stdin gagal),
+        # stderr dibaca di thread sendiri agar isql tidak tertahan saat menulis pesan panjang
+        stderr_parts = []
+        stderr_reader = threading.Thread(target=lambda: stderr_parts.append(process.stderr.read()),
+                                         daemon=True)
+        stderr_reader.start()
+        try:
+            counted = _CountingLines(self._read_lines(process, process.stdout))
+            result = self._parse_isql_output(counted, as_dict)
+            process.wait()
+        finally:
+            writer.join()
+            stderr_reader.join()
+            for stream in (process.stdout, process.stderr):
+                stream.close()
+        stderr_text = ''.join(stderr_parts)
+
+        if any(line.strip().startswith(IsqlSession.ERROR_MARKERS) for line in (stderr_text or '').splitlines()):
+            raise IsqlQueryError(f"Error executing query: {stderr_text.strip()}")
+        if process.returncode != 0:
+            raise IsqlSessionError(f"isql keluar dengan kode {process.returncode}: {(stderr_text or '').strip()}")
+        if counted.bytes == 0 and not trusted:
+            raise IsqlSessionError("Output isql kosong dengan variant stdin_localhost")
+        self._record_query(query, 'isql', spawn_time, time.perf_counter() - started - spawn_time,
+                           None, result, counted.bytes)
+        return result
+
+    @staticmethod
+    def _write_stdin(stream, text):
+        try:
+            stream.write(text)
+            stream.close()
+        except (OSError, ValueError):
+            pass
 
-                # Check for table headers (ID, COLUMNNAME, etc.)
-                if not in_table and any(common_col in line.upper() for common_col in ["ID", "CODE", "NAME", "DATE", "TIME"]):
-                    # This line may contain headers
-                    potential_headers = [h.strip() for h in line.split() if h.strip()]
-                    if len(potential_headers) > 2:  # At least 3 columns to be considered a header
-                        headers = potential_headers
-                        in_table = True
-                        print(f"Alternative parser found headers: {headers}")
-                # If we're in a table, try to parse data rows
-                elif in_table and line and line[0].isdigit():
-                    # This might be a data row
-                    values = line.split()
-                    if len(values) >= len(headers):
-                        row = {headers[i]: values[i] for i in range(len(headers))}
-                        rows.append(row)
-
-            if headers and rows:
-                result_data.append({"headers": headers, "rows": rows})
-                print(f"Alternative parser found {len(rows)} rows")
-
-        # If still no results or empty result sets, return a default set
-        if not result_data or not any(r.get("rows") for r in result_data):
-            # Try to automatically detect headers and data from text content
-            print("Trying final fallback detection method...")
-
-            # Look for tables with well-formatted columns
-            table_start_indices = []
-            for i, line in enumerate(lines):
-                # Look for lines that might be table headers
-                if i+1 < len(lines) and i-1 >= 0:
-                    prev = lines[i-1].strip()
-                    current = line.strip()
-                    next = lines[i+1].strip()
-
-                    # If current line has content, previous is empty, and next contains separator chars
-                    if current and not prev and ('=' in next or '-' in next):
-                        table_start_indices.append(i)
-
-            for start_idx in table_start_indices:
-                if start_idx+1 >= len(lines):
-                    continue
+    def _run_isql(self, cmd, stdout=subprocess.PIPE):
+        """
+        Menjalankan isql sampai selesai (paling lama self.timeout detik).
 
-                header_line = lines[start_idx].strip()
-                separator_line = lines[start_idx+1].strip()
+        :return: Tuple (CompletedProcess, waktu spawn proses dalam detik)
+        """
+        self.logger.debug("Menjalankan isql: %s", ' '.join(cmd))
+        started = time.perf_counter()
+        process = subprocess.Popen(cmd, stdout=stdout, stderr=subprocess.PIPE, text=True, errors='replace')
+        spawn_time = time.perf_counter() - started
+        try:
+            out, err = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise IsqlTimeoutError(f"Timeout {self.timeout} detik menunggu hasil isql")
 
-                # Extract headers and their positions
-                header_positions = self._get_column_positions(separator_line)
-                if not header_positions:
-                    continue
+        self.logger.debug("isql selesai returncode=%s stdout=%r stderr=%r",
+                          process.returncode, (out or '')[:500], (err or '')[:500])
+        return subprocess.CompletedProcess(cmd, process.returncode, out, err), spawn_time
 
-                headers = []
-                for start, end in header_positions:
-                    if start < len(header_line):
-                        if end <= len(header_line):
-                            header = header_line[start:end].strip()
-                        else:
-                            header = header_line[start:].strip()
-                        headers.append(header)
+    def _record_query(self, query, mode, spawn_time, db_time, parse_time, result, output_bytes):
+        """
+        Menyimpan catatan waktu satu query di self.query_stats dan menulisnya ke log.
 
-                if not headers:
-                    continue
+        :param mode: 'pipe', 'isql' (file sementara), 'session', 'driver' atau 'iter' (iter_query)
+        :param parse_time: None jika parsing berjalan bersamaan dengan pembacaan hasil
+        :param result: Hasil execute_query (list result set) atau jumlah baris
+        """
+        if isinstance(result, int):
+            rows = result
+        else:
+            rows = sum(len(rs.get("rows", [])) for rs in result or [])
+
+        record = {
+            "query": ' '.join(query.split())[:200],
+            "mode": mode,
+            "spawn_time": round(spawn_time, 4),
+            "db_time": round(db_time, 4),
+            "parse_time": round(parse_time, 4) if parse_time is not None else None,
+            "rows": rows,
+            "bytes": output_bytes,
+            "finished_at": datetime.now().isoformat(timespec='seconds')
+        }
+        self.query_stats.append(record)
+        self.logger.info("query selesai mode=%s rows=%d bytes=%s spawn=%.3fs db=%.3fs parse=%s",
+                         mode, rows, output_bytes, spawn_time, db_time,
+                         f"{parse_time:.3f}s" if parse_time is not None else "-")
+
+    @property
+    def last_query_stats(self):
+        """Catatan waktu query terakhir, atau None"""
+        return self.query_stats[-1] if self.query_stats else None
+
+    def _parse_isql_output(self, output, as_dict=True):
+        """
+        Parse output dari isql ke format yang lebih terstruktur
 
-                # Look for data rows after the header/separator
-                rows = []
-                for i in range(start_idx+2, len(lines)):
-                    line = lines[i].strip()
-                    if not line:
-                        continue
+        :param output: Teks output dari isql, atau iterable baris (file / pipe) untuk parsing streaming
+        :param as_dict: Jika True, hasil dikembalikan sebagai list dari dictionaries
+        :return: Data terstruktur dari hasil query
+        """
+        if isinstance(output, str):
+            output = io.StringIO(output)
 
-                    # Stop when we reach another separator or SQL prompt
-                    if '===' in line or '---' in line or line.startswith('SQL>'):
-                        break
+        result_sets = IsqlOutputParser().parse(output)
 
-                    row = {}
-                    for j, (start, end) in enumerate(header_positions):
-                        if j >= len(headers):
-                            continue
-                        col_name = headers[j]
-                        if start < len(line):
-                            if end <= len(line):
-                                value = line[start:end].strip()
-                            else:
-                                value = line[start:].strip()
-                        else:
-                            value = ""
-                        row[col_name] = value
-
-                    # Only add rows that actually have data
-                    if any(v.strip() for v in row.values()):
-                        rows.append(row)
-
-                if headers and rows:
-                    result_data.append({"headers": headers, "rows": rows})
-                    print(f"Fallback method found {len(rows)} rows with headers: {headers}")
-                    break  # Take the first valid table we find
-
-            # If we still have no results, create a placeholder result
-            if not result_data:
-                print("All parsing methods failed, returning empty result with headers")
-                # Create a placeholder with the headers from the query
-                if "select" in output_text.lower():
-                    try:
-                        # Try to extract column names from the SELECT statement
-                        select_match = re.search(r'select\s+(.*?)\s+from', output_text.lower())
-                        if select_match:
-                            select_clause = select_match.group(1).strip()
-                            # Split by commas, handle special case where commas are in functions
-                            column_parts = []
-                            current_part = ""
-                            paren_level = 0
-
-                            for char in select_clause:
-                                if char == '(':
-                                    paren_level += 1
-                                    current_part += char
-                                elif char == ')':
-                                    paren_level -= 1
-                                    current_part += char
-                                elif char == ',' and paren_level == 0:
-                                    column_parts.append(current_part.strip())
-                                    current_part = ""
-                                else:
-                                    current_part += char
-
-                            if current_part:
-                                column_parts.append(current_part.strip())
-
-                            # Extract column names/aliases
-                            headers = []
-                            for part in column_parts:
-                                # If has alias (AS keyword)
-                                if ' as ' in part.lower():
-                                    headers.append(part.split(' as ')[1].strip())
-                                # Check for alias without AS keyword (just space)
-                                elif ' ' in part and '(' not in part.split(' ')[-1]:
-                                    headers.append(part.split(' ')[-1].strip())
-                                # Check for qualified names (a.ID, etc.)
-                                elif '.' in part:
-                                    headers.append(part.split('.')[-1].strip())
-                                else:
-                                    headers.append(part.strip())
-
-                            # Clean up headers (remove aliases, quotes, etc.)
-                            cleaned_headers = []
-                            for h in headers:
-                                h = h.strip('"\'').strip()
-                                if ' ' in h:  # Take last part if still has spaces
-                                    h = h.split(' ')[-1]
-                                cleaned_headers.append(h)
-
-                            result_data.append({"headers": cleaned_headers, "rows": []})
-                            print(f"Created placeholder result with headers: {cleaned_headers}")
-                    except Exception as e:
-                        print(f"Error extracting columns from query: {e}")
-                        result_data.append({"headers": ["STATUS"], "rows": [{"STATUS": "No data found"}]})
-
-        # Final check and summary
-        print(f"Final parsing result: {len(result_data)} result sets")
+        result_data = [
+            {"headers": result_set["headers"], "rows": IsqlOutputParser.to_rows(result_set)}
+            for result_set in result_sets
+        ]
         for i, rs in enumerate(result_data):
-            headers = rs.get("headers", [])
-            rows = rs.get("rows", [])
-            print(f"Result set {i+1}: {len(headers)} columns, {len(rows)} rows")
-            print(f"Headers: {headers}")
-            if rows:
-                print(f"First row: {rows[0]}")
+            self.logger.debug("Result set %d: %d columns, %d rows", i + 1, len(rs['headers']), len(rs['rows']))
 
         return result_data
 
@@ -613,55 +2132,7 @@ class FirebirdConnector:
         :param separator_line: Baris dengan karakter separator (===)
         :return: List dari tuple (start, end) untuk setiap kolom
         """
-        if not separator_line:
-            return []
-
-        print(f"Analyzing column positions from line: {separator_line}")
-        positions = []
-        in_column = False
-        start = None
-
-        for i, char in enumerate(separator_line):
-            # Check if this is a separator character
-            is_separator = char in '=-'
-
-            # If we find a separator char and we're not in a column, start a column
-            if is_separator and not in_column:
-                start = i
-                in_column = True
-            # If we find a non-separator char and we are in a column, end the column
-            elif not is_separator and in_column:
-                positions.append((start, i))
-                in_column = False
-                start = None
-
-        # If the line ends with a separator character, add the final column
-        if in_column and start is not None:
-            positions.append((start, len(separator_line)))
-
-        # Special handling: if no positions found, try alternate approach
-        if not positions:
-            # Try to detect columns by looking at word boundaries
-            words = []
-            word_start = None
-
-            for i, char in enumerate(separator_line):
-                if char.strip():  # Non-whitespace
-                    if word_start is None:
-                        word_start = i
-                elif word_start is not None:  # Whitespace after word
-                    words.append((word_start, i))
-                    word_start = None
-
-            # Add last word if it goes to the end of the line
-            if word_start is not None:
-                words.append((word_start, len(separator_line)))
-
-            if words:
-                positions = words
-
-        print(f"Detected positions: {positions}")
-        return positions
+        return IsqlOutputParser.column_positions(separator_line)
 
     def test_connection(self):
         """
@@ -670,10 +2141,11 @@ class FirebirdConnector:
         :return: True jika koneksi berhasil, False jika gagal
         """
         try:
-            result = self.execute_query("SELECT 'Connection Test' FROM RDB$DATABASE")
+            # Tanpa result_cache: tes koneksi harus selalu menghubungi database
+            result = self._execute("SELECT 'Connection Test' FROM RDB$DATABASE", True)
             return True
         except Exception as e:
-            print(f"Kesalahan koneksi: {e}")
+            self.logger.warning("Kesalahan koneksi: %s", e)
             return False
 
     def get_tables(self):
@@ -708,7 +2180,7 @@ class FirebirdConnector:
         # Buat query SELECT * FROM table LIMIT 100
         query = f"SELECT FIRST 100 * FROM {table_name}"
 
-        print(f"Generated example query: {query}")
+        self.logger.debug("Generated example query: %s", query)
         return query
 
     def to_pandas(self, result_data):
@@ -723,4 +2195,13 @@ class FirebirdConnector:
 
         # Ambil data dari result set pertama
         rows = result_data[0]["rows"]
-        return pd.DataFrame(rows)
+        df = pd.DataFrame(rows)
+
+        # Kolom integer yang berisi NULL dijadikan float oleh pandas (12 -> 12.0, None -> NaN);
+        # pertahankan sebagai int/None agar str(x) dan pengecekan "if x" tetap seperti sebelumnya
+        for col in df.columns[df.dtypes == 'float64']:
+            sample = next((row.get(col) for row in rows if row.get(col) is not None), None)
+            if isinstance(sample, int):
+                df[col] = pd.Series([row.get(col) for row in rows], index=df.index, dtype=object)
+
+        return df
@@ -11,7 +11,7 @@ from collections import defaultdict
 
 sys.path.append(os.path.join(os.path.dirname(__file__), 'all_transaksi'))
 
-from firebird_connector import FirebirdConnector
+from firebird_connector import FirebirdConnector, ReferenceCache
 
 def get_employee_role_corrected(recordtag):
     """
@@ -50,35 +50,7 @@ def generate_excel_report():
     print("Menghubungkan ke database...")
     connector = FirebirdConnector(DB_PATH)
     
-    if not connector.test_connection():
-        print("Koneksi database gagal!")
-        return
-    
-    print("Koneksi database berhasil")
-    
-    # Get employee mapping
-    print("Mendapatkan mapping karyawan...")
-    emp_query = "SELECT ID, NAME FROM EMP"
-    
-    try:
-        result = connector.execute_query(emp_query)
-        emp_df = connector.to_pandas(result)
-        
-        employee_mapping = {}
-        if not emp_df.empty:
-            for _, row in emp_df.iterrows():
-                emp_id = str(row.iloc[0]).strip()
-                emp_name = str(row.iloc[1]).strip()
-                if emp_id and emp_name:
-                    employee_mapping[emp_id] = emp_name
-            print(f"Berhasil mapping {len(employee_mapping)} karyawan")
-        
-    except Exception as e:
-        print(f"Error mengambil data EMP: {e}")
-        employee_mapping = {}
-    
     # Query untuk mendapatkan semua transaksi dengan divisi
-    print("Mengambil data transaksi...")
     query = """
     SELECT 
         a.ID, 
@@ -102,8 +74,33 @@ def generate_excel_report():
     ORDER BY c.DIVNAME, a.SCANUSERID, a.TRANSDATE
     """
     
+    # Satu sesi isql untuk tes koneksi, data EMP dan data transaksi: attach database sekali
+    with connector.session():
+        if not connector.test_connection():
+            print("Koneksi database gagal!")
+            return
+        
+        print("Koneksi database berhasil")
+        
+        # Get employee mapping
+        print("Mendapatkan mapping karyawan...")
+        try:
+            employee_mapping = ReferenceCache.shared().get(connector, 'employee')
+            if employee_mapping:
+                print(f"Berhasil mapping {len(employee_mapping)} karyawan")
+            
+        except Exception as e:
+            print(f"Error mengambil data EMP: {e}")
+            employee_mapping = {}
+        
+        print("Mengambil data transaksi...")
+        try:
+            result = connector.execute_query(query)
+        except Exception as e:
+            print(f"Error mengambil data transaksi: {e}")
+            return
+    
     try:
-        result = connector.execute_query(query)
         df = connector.to_pandas(result)
         
         if df.empty:
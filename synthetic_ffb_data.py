@@ -0,0 +1,303 @@
+"""
+Generator data FFB scanner sintetis untuk benchmark tanpa database estate asli.
+
+Menulis file SQLite dengan tabel dan kolom yang sama seperti database IFESS
+(FFBSCANNERDATA01..12, EMP, OCFIELD, CRDIVISION, LOOKUP, serta RDB$DATABASE dan
+RDB$RELATIONS). File ini dibaca oleh fake_isql.py, pengganti isql yang mencetak
+hasil query dalam format tabel isql Firebird 1.5, sehingga connector, parser dan
+analisis dapat di-benchmark secara offline di Linux.
+
+Setiap transaksi Kerani (RECORDTAG PM) dapat diverifikasi Mandor (P1) dan/atau
+Asisten (P5) dengan TRANSNO yang sama; sebagian verifikasi memiliki jumlah janjang
+yang berbeda. TRANSSTATUS berisi 704/731/732.
+
+Contoh:
+    python synthetic_ffb_data.py --output /tmp/PTRJ_SYN.FDB --start-date 2025-04-01 --end-date 2025-05-31
+    python benchmark_duplicate_transno.py --db-path /tmp/PTRJ_SYN.FDB --isql-path ./fake_isql.py --month 5 --year 2025
+"""
+import argparse
+import os
+import sqlite3
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Tipe kolom Firebird per nama kolom; dipakai untuk skema SQLite dan lebar kolom output fake_isql.py
+COLUMN_TYPES = {
+    'ID': 'INTEGER', 'SCANUSERID': 'INTEGER', 'OCID': 'INTEGER', 'WORKERID': 'INTEGER',
+    'CARRIERID': 'INTEGER', 'FIELDID': 'INTEGER', 'TASKNO': 'VARCHAR(10)',
+    'RIPEBCH': 'INTEGER', 'UNRIPEBCH': 'INTEGER', 'BLACKBCH': 'INTEGER', 'ROTTENBCH': 'INTEGER',
+    'LONGSTALKBCH': 'INTEGER', 'RATDMGBCH': 'INTEGER', 'LOOSEFRUIT': 'INTEGER',
+    'TRANSNO': 'VARCHAR(20)', 'TRANSDATE': 'DATE', 'TRANSTIME': 'TIME', 'UPLOADDATETIME': 'TIMESTAMP',
+    'RECORDTAG': 'VARCHAR(2)', 'TRANSSTATUS': 'INTEGER', 'TRANSTYPE': 'SMALLINT', 'LASTUSER': 'VARCHAR(20)',
+    'LASTUPDATED': 'TIMESTAMP', 'OVERRIPEBCH': 'INTEGER', 'UNDERRIPEBCH': 'INTEGER',
+    'ABNORMALBCH': 'INTEGER', 'LOOSEFRUIT2': 'INTEGER',
+    'NAME': 'VARCHAR(50)', 'FIELDNO': 'VARCHAR(10)', 'DIVID': 'INTEGER', 'DIVCODE': 'VARCHAR(10)',
+    'DIVNAME': 'VARCHAR(30)', 'SHORTCODE': 'VARCHAR(10)',
+    'RDB$RELATION_ID': 'SMALLINT', 'RDB$RELATION_NAME': 'CHAR(31)', 'RDB$SYSTEM_FLAG': 'SMALLINT',
+}
+
+FFB_COLUMNS = ['ID', 'SCANUSERID', 'OCID', 'WORKERID', 'CARRIERID', 'FIELDID', 'TASKNO',
+               'RIPEBCH', 'UNRIPEBCH', 'BLACKBCH', 'ROTTENBCH', 'LONGSTALKBCH', 'RATDMGBCH',
+               'LOOSEFRUIT', 'TRANSNO', 'TRANSDATE', 'TRANSTIME', 'UPLOADDATETIME',
+               'RECORDTAG', 'TRANSSTATUS', 'TRANSTYPE', 'LASTUSER', 'LASTUPDATED',
+               'OVERRIPEBCH', 'UNDERRIPEBCH', 'ABNORMALBCH', 'LOOSEFRUIT2']
+
+TABLES = {
+    'EMP': ['ID', 'NAME'],
+    'OCFIELD': ['ID', 'OCID', 'FIELDNO', 'DIVID'],
+    'CRDIVISION': ['ID', 'OCID', 'DIVCODE', 'DIVNAME'],
+    'LOOKUP': ['ID', 'SHORTCODE', 'NAME'],
+    'RDB$DATABASE': ['RDB$RELATION_ID'],
+    'RDB$RELATIONS': ['RDB$RELATION_NAME', 'RDB$SYSTEM_FLAG'],
+}
+TABLES.update({f"FFBSCANNERDATA{month:02d}": FFB_COLUMNS for month in range(1, 13)})
+
+# Rata-rata (Poisson) jumlah per transaksi untuk kolom janjang dan brondolan
+BUNCH_MEANS = {
+    'RIPEBCH': 28.0, 'UNRIPEBCH': 0.6, 'BLACKBCH': 0.2, 'ROTTENBCH': 0.1, 'LONGSTALKBCH': 0.4,
+    'RATDMGBCH': 0.1, 'LOOSEFRUIT': 4.0, 'OVERRIPEBCH': 0.3, 'UNDERRIPEBCH': 0.3, 'ABNORMALBCH': 0.05,
+}
+
+# TRANSSTATUS -> (SHORTCODE, NAME) di LOOKUP, dan peluangnya untuk Kerani dan verifikator
+TRANSSTATUS = {704: ('704', 'VERIFIED'), 731: ('731', 'UPLOADED'), 732: ('732', 'EDITED')}
+KERANI_STATUS_P = {704: 0.3, 731: 0.5, 732: 0.2}
+VERIFIER_STATUS_P = {704: 0.9, 731: 0.07, 732: 0.03}
+
+FIRST_NAMES = ['AGUS', 'BUDI', 'DEDI', 'EKO', 'HENDRA', 'IWAN', 'JOKO', 'RUDI', 'SITI', 'SRI',
+               'WAHYU', 'YANTO', 'ANDI', 'DWI', 'FAJAR', 'HERI', 'RINA', 'TONI', 'YUDI', 'ZAINAL']
+
+
+def sqlite_type(fb_type):
+    return 'INTEGER' if fb_type in ('INTEGER', 'SMALLINT') else 'TEXT'
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _employee_names(ids, role, rng):
+    first = rng.choice(FIRST_NAMES, size=len(ids))
+    return [f"{name} {role}{emp_id}" for name, emp_id in zip(first, ids)]
+
+
+def _reference_data(divisions, fields_per_division, kerani_per_division, mandor_per_division,
+                    asisten_per_division, workers_per_division, rng):
+    """Tabel referensi dan pembagian karyawan per divisi"""
+    division_ids = np.arange(1, divisions + 1)
+    crdivision = pd.DataFrame({
+        'ID': division_ids, 'OCID': 1,
+        'DIVCODE': [f"D{d:02d}" for d in division_ids],
+        'DIVNAME': [f"DIVISI {d:02d}" for d in division_ids],
+    })
+    field_div = np.repeat(division_ids, fields_per_division)
+    ocfield = pd.DataFrame({
+        'ID': np.arange(1, len(field_div) + 1), 'OCID': 1,
+        'FIELDNO': [f"D{d:02d}F{k:03d}" for d, k in zip(field_div, np.tile(np.arange(1, fields_per_division + 1), divisions))],
+        'DIVID': field_div,
+    })
+
+    roles = {}
+    names = []
+    next_id = 1
+    for role, per_division in (('K', kerani_per_division), ('M', mandor_per_division),
+                               ('A', asisten_per_division), ('W', workers_per_division)):
+        ids = np.arange(next_id, next_id + per_division * divisions).reshape(divisions, per_division)
+        next_id += ids.size
+        roles[role] = ids
+        names.append(pd.DataFrame({'ID': ids.ravel(), 'NAME': _employee_names(ids.ravel(), role, rng)}))
+    emp = pd.concat(names, ignore_index=True)
+
+    lookup = pd.DataFrame([(status, code, name) for status, (code, name) in TRANSSTATUS.items()],
+                          columns=['ID', 'SHORTCODE', 'NAME'])
+    # Field diperlakukan seperti peran: ID field per divisi
+    roles['F'] = ocfield['ID'].to_numpy().reshape(divisions, fields_per_division)
+    return {'CRDIVISION': crdivision, 'OCFIELD': ocfield, 'EMP': emp, 'LOOKUP': lookup}, roles
+
+
+def _status(rng, probabilities, size):
+    return rng.choice(list(probabilities), size=size, p=list(probabilities.values()))
+
+
+def _timestamps(days, minutes):
+    """Teks TIMESTAMP format isql (YYYY-MM-DD HH:MM:SS.0000) dari tanggal dan menit sejak tengah malam"""
+    stamps = pd.to_datetime(days) + pd.to_timedelta(minutes, unit='min')
+    return stamps.dt.strftime('%Y-%m-%d %H:%M:%S.0000')
+
+
+def _month_transactions(days, roles, transactions_per_day, mandor_rate, asisten_rate,
+                        difference_rate, rng):
+    """Transaksi PM beserta verifikasi P1/P5 untuk daftar tanggal dalam satu bulan"""
+    divisions = roles['K'].shape[0]
+    counts = rng.poisson(transactions_per_day, size=(len(days), divisions))
+    day_index = np.repeat(np.repeat(np.arange(len(days)), divisions), counts.ravel())
+    div_index = np.repeat(np.tile(np.arange(divisions), len(days)), counts.ravel())
+    n = len(day_index)
+    if n == 0:
+        return pd.DataFrame(columns=FFB_COLUMNS)
+
+    def pick(pool):
+        return pool[div_index, rng.integers(0, pool.shape[1], size=n)]
+
+    transdate = pd.Series(np.array(days, dtype='datetime64[D]')[day_index])
+    pm_minutes = rng.integers(6 * 60, 13 * 60, size=n)
+
+    pm = pd.DataFrame({
+        'SCANUSERID': pick(roles['K']),
+        'OCID': 1,
+        'WORKERID': pick(roles['W']),
+        'CARRIERID': rng.integers(1, 40, size=n),
+        'FIELDID': pick(roles['F']),
+        'TASKNO': 'TK0' + pd.Series(rng.integers(1, 10, size=n)).astype(str),
+        'TRANSDATE': transdate,
+        'MINUTES': pm_minutes,
+        'RECORDTAG': 'PM',
+        'TRANSSTATUS': _status(rng, KERANI_STATUS_P, n),
+        'DIV': div_index,
+    })
+    for column, mean in BUNCH_MEANS.items():
+        pm[column] = rng.poisson(mean, size=n)
+    pm['LOOSEFRUIT2'] = 0
+    # TRANSNO: Kerani + tanggal + nomor urut, unik dalam bulan (diawali nol, tetap teks)
+    pm['TRANSNO'] = (pm['SCANUSERID'].astype(str).str.zfill(4) + transdate.dt.strftime('%y%m%d')
+                     + pd.Series(np.arange(n)).astype(str).str.zfill(6))
+
+    frames = [pm]
+    for tag, role, rate in (('P1', 'M', mandor_rate), ('P5', 'A', asisten_rate)):
+        chosen = rng.random(n) < rate
+        verifier = pm[chosen].copy()
+        m = len(verifier)
+        verifier['RECORDTAG'] = tag
+        verifier['SCANUSERID'] = roles[role][verifier['DIV'].to_numpy(), rng.integers(0, roles[role].shape[1], size=m)]
+        verifier['TRANSSTATUS'] = _status(rng, VERIFIER_STATUS_P, m)
+        verifier['MINUTES'] = np.minimum(verifier['MINUTES'] + rng.integers(10, 240, size=m), 23 * 60)
+        # Sebagian verifikasi menghitung janjang berbeda dengan Kerani
+        differs = rng.random(m) < difference_rate
+        delta = rng.integers(1, 4, size=m) * rng.choice([-1, 1], size=m)
+        verifier.loc[differs, 'RIPEBCH'] = np.maximum(verifier.loc[differs, 'RIPEBCH'] + delta[differs], 0)
+        unripe = differs & (rng.random(m) < 0.3)
+        verifier.loc[unripe, 'UNRIPEBCH'] += 1
+        frames.append(verifier)
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values(['TRANSDATE', 'MINUTES'], kind='stable').reset_index(drop=True)
+    # Upload ke server setelah kembali dari lapangan (mulai pukul 14:00)
+    upload_minutes = np.maximum(df['MINUTES'].to_numpy() + 30, 14 * 60) + rng.integers(0, 240, size=len(df))
+    df['TRANSTIME'] = ((df['MINUTES'] // 60).astype(str).str.zfill(2) + ':'
+                       + (df['MINUTES'] % 60).astype(str).str.zfill(2) + ':00.0000')
+    df['UPLOADDATETIME'] = _timestamps(df['TRANSDATE'], upload_minutes)
+    df['LASTUPDATED'] = df['UPLOADDATETIME']
+    df['TRANSDATE'] = df['TRANSDATE'].dt.strftime('%Y-%m-%d')
+    df['TRANSTYPE'] = 1
+    df['LASTUSER'] = 'SCANNER'
+    return df
+
+
+def generate_database(path, start_date, end_date, divisions=6, fields_per_division=20,
+                      kerani_per_division=6, mandor_per_division=2, asisten_per_division=1,
+                      workers_per_division=40, transactions_per_day=120, mandor_rate=0.35,
+                      asisten_rate=0.1, difference_rate=0.05, seed=0):
+    """
+    Membuat database sintetis (SQLite) di path; file lama ditimpa.
+
+    Args:
+        path: Path file output (mis. /tmp/PTRJ_SYN.FDB)
+        start_date: Tanggal awal data (date atau YYYY-MM-DD)
+        end_date: Tanggal akhir data, inklusif (date atau YYYY-MM-DD)
+        divisions: Jumlah divisi (CRDIVISION)
+        fields_per_division: Jumlah field (OCFIELD) per divisi
+        kerani_per_division, mandor_per_division, asisten_per_division, workers_per_division:
+            Jumlah karyawan (EMP) per peran per divisi
+        transactions_per_day: Rata-rata transaksi Kerani per divisi per hari
+        mandor_rate: Peluang transaksi Kerani diverifikasi Mandor (P1)
+        asisten_rate: Peluang transaksi Kerani diverifikasi Asisten (P5)
+        difference_rate: Peluang jumlah janjang verifikator berbeda dengan Kerani
+        seed: Seed random; seed yang sama menghasilkan data yang sama
+
+    Returns:
+        dict: Nama tabel -> jumlah baris
+    """
+    start = date.fromisoformat(str(start_date))
+    end = date.fromisoformat(str(end_date))
+    rng = np.random.default_rng(seed)
+
+    reference, roles = _reference_data(divisions, fields_per_division, kerani_per_division,
+                                               mandor_per_division, asisten_per_division,
+                                               workers_per_division, rng)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        for table, columns in TABLES.items():
+            definition = ', '.join(f"{column} {sqlite_type(COLUMN_TYPES[column])}" for column in columns)
+            conn.execute(f'CREATE TABLE "{table}" ({definition})')
+        for column in ('TRANSDATE', 'TRANSNO'):
+            for month in range(1, 13):
+                conn.execute(f"CREATE INDEX FFB{month:02d}_{column} ON FFBSCANNERDATA{month:02d} ({column})")
+
+        counts = {}
+        reference['RDB$DATABASE'] = pd.DataFrame({'RDB$RELATION_ID': [128]})
+        reference['RDB$RELATIONS'] = pd.DataFrame({
+            'RDB$RELATION_NAME': [t for t in TABLES if not t.startswith('RDB$')], 'RDB$SYSTEM_FLAG': 0})
+        for table, df in reference.items():
+            _insert(conn, table, df[TABLES[table]])
+            counts[table] = len(df)
+
+        next_id = 1
+        month = _month_start(start)
+        while month <= end:
+            following = _month_start(month + timedelta(days=31))
+            days = [max(month, start) + timedelta(days=i)
+                    for i in range((min(following - timedelta(days=1), end) - max(month, start)).days + 1)]
+            df = _month_transactions(days, roles, transactions_per_day, mandor_rate,
+                                     asisten_rate, difference_rate, rng)
+            df['ID'] = np.arange(next_id, next_id + len(df))
+            next_id += len(df)
+            table = f"FFBSCANNERDATA{month.month:02d}"
+            _insert(conn, table, df[FFB_COLUMNS])
+            counts[table] = counts.get(table, 0) + len(df)
+            month = following
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
+def _insert(conn, table, df):
+    placeholders = ', '.join('?' * len(df.columns))
+    # tolist() mengubah nilai numpy ke tipe Python yang diterima sqlite3
+    conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})',
+                     zip(*(df[column].tolist() for column in df.columns)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Membuat database FFB scanner sintetis untuk benchmark offline.')
+    parser.add_argument('--output', type=str, required=True, help='Path file database output (mis. /tmp/PTRJ_SYN.FDB)')
+    parser.add_argument('--start-date', type=str, required=True, help='Tanggal awal data (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=str, required=True, help='Tanggal akhir data, inklusif (YYYY-MM-DD)')
+    parser.add_argument('--divisions', type=int, default=6, help='Jumlah divisi (default: 6)')
+    parser.add_argument('--fields-per-division', type=int, default=20, help='Field per divisi (default: 20)')
+    parser.add_argument('--kerani-per-division', type=int, default=6, help='Kerani per divisi (default: 6)')
+    parser.add_argument('--transactions-per-day', type=float, default=120,
+                        help='Rata-rata transaksi Kerani per divisi per hari (default: 120)')
+    parser.add_argument('--mandor-rate', type=float, default=0.35, help='Peluang verifikasi Mandor/P1 (default: 0.35)')
+    parser.add_argument('--asisten-rate', type=float, default=0.1, help='Peluang verifikasi Asisten/P5 (default: 0.1)')
+    parser.add_argument('--difference-rate', type=float, default=0.05,
+                        help='Peluang jumlah janjang verifikator berbeda (default: 0.05)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed random (default: 0)')
+    args = parser.parse_args()
+
+    counts = generate_database(args.output, args.start_date, args.end_date, divisions=args.divisions,
+                               fields_per_division=args.fields_per_division,
+                               kerani_per_division=args.kerani_per_division,
+                               transactions_per_day=args.transactions_per_day, mandor_rate=args.mandor_rate,
+                               asisten_rate=args.asisten_rate, difference_rate=args.difference_rate,
+                               seed=args.seed)
+    for table, count in counts.items():
+        print(f"{table:<18} {count:>9} baris")
+    print(f"Database sintetis: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
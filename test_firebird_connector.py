@@ -0,0 +1,198 @@
+"""
+Unit test untuk konsistensi tipe kolom kunci (TRANSNO) di firebird_connector,
+pencarian TRANSNO duplikat per chunk, dan eksekusi isql lewat fake_isql.py.
+"""
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from firebird_connector import (FirebirdConnector, IsqlOutputParser, IsqlProbe, IsqlTimeoutError,
+                                MonthPartition, QueryResultCache, SnapshotCache, fetch_partitions,
+                                normalize_key_columns)
+from analisis_perbedaan_panen import _get_duplicates_by_scan
+from synthetic_ffb_data import generate_database
+
+FAKE_ISQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_isql.py')
+
+
+def isql_output(rows):
+    """Output tabel isql: ID INTEGER (rata kanan), TRANSNO VARCHAR(20) (rata kiri)"""
+    lines = ['', f"{'ID':>11} {'TRANSNO':<20}", f"{'=' * 11} {'=' * 20}"]
+    lines += [f"{row_id:>11} {transno:<20}".rstrip() for row_id, transno in rows]
+    lines.append('')
+    return [line + '\n' for line in lines]
+
+
+class ChunkedConnector:
+    """Connector tiruan: iter_query mem-parse output isql per chunksize baris"""
+
+    def __init__(self, rows, chunksize):
+        self.lines = isql_output(rows)
+        self.chunksize = chunksize
+
+    def iter_query(self, query, chunksize=50000):
+        for result_set in IsqlOutputParser().iter_chunks(self.lines, self.chunksize):
+            yield IsqlOutputParser.to_frame(result_set)
+
+
+class TestKeyColumnTypes(unittest.TestCase):
+    """TRANSNO bertipe str di semua chunk dan partition"""
+
+    # Grup '0099' terpotong di batas chunk (chunksize=2); chunk pertama tampak numerik
+    ROWS = [(1, '1234'), (2, '5678'), (3, '0099'), (4, '1234')]
+
+    def test_text_column_not_converted_per_chunk(self):
+        chunks = list(IsqlOutputParser().iter_chunks(isql_output(self.ROWS), 2))
+        self.assertEqual([chunk['columns'][1] for chunk in chunks], [['1234', '5678'], ['0099', '1234']])
+        self.assertEqual([chunk['columns'][0] for chunk in chunks], [[1, 2], [3, 4]])
+
+    def test_normalize_key_columns(self):
+        df = pd.DataFrame({'ID': [1, 2, 3], 'TRANSNO': pd.Series([1234, '0099', None], dtype=object)})
+        result = normalize_key_columns(df)
+        self.assertEqual(result['TRANSNO'].tolist(), ['1234', '0099', None])
+        self.assertEqual(result['ID'].tolist(), [1, 2, 3])
+        # Frame asli tidak diubah
+        self.assertEqual(df['TRANSNO'].tolist()[0], 1234)
+
+    def test_fetch_partitions_concat_mixed_types(self):
+        frames = {
+            'FFBSCANNERDATA04': pd.DataFrame({'TRANSNO': [1234]}),
+            'FFBSCANNERDATA05': pd.DataFrame({'TRANSNO': ['1234', '0099']}),
+        }
+        partitions = [MonthPartition(table, None, None, None) for table in frames]
+        df = fetch_partitions(partitions, lambda partition: frames[partition.table], max_workers=1)
+        self.assertEqual(df['TRANSNO'].tolist(), ['1234', '1234', '0099'])
+        self.assertEqual(df['TRANSNO'].nunique(), 2)
+
+    def test_scan_group_across_chunk_boundary(self):
+        rows = [(1, '0042'), (2, '0099'), (3, '0099'), (4, '1234'), (5, '1234'), (6, '5678')]
+        for chunksize in (1, 2, 3, 4, 10):
+            with self.subTest(chunksize=chunksize):
+                df = _get_duplicates_by_scan(ChunkedConnector(rows, chunksize), 'FFBSCANNERDATA05',
+                                             '2025-05-01', '2025-06-01')
+                self.assertEqual(df['TRANSNO'].tolist(), ['0099', '0099', '1234', '1234'])
+                self.assertEqual(df['ID'].tolist(), [2, 3, 4, 5])
+
+    def test_scan_carry_with_mixed_types(self):
+        class MixedConnector:
+            def iter_query(self, query, chunksize=50000):
+                yield pd.DataFrame({'ID': [1, 2], 'TRANSNO': [1000, 1234]})
+                yield pd.DataFrame({'ID': [3, 4], 'TRANSNO': ['1234', '5678']})
+
+        df = _get_duplicates_by_scan(MixedConnector(), 'FFBSCANNERDATA05', '2025-05-01', '2025-06-01')
+        self.assertEqual(df['TRANSNO'].tolist(), ['1234', '1234'])
+        self.assertEqual(df['ID'].tolist(), [2, 3])
+
+
+class TestIsqlPipe(unittest.TestCase):
+    """Mode pipe (SQL lewat stdin, hasil dari stdout) terhadap fake_isql.py"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp_dir, 'PTRJ_SYN.FDB')
+        generate_database(cls.db_path, '2025-05-01', '2025-05-02', divisions=1, transactions_per_day=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def test_script_larger_than_pipe_buffer(self):
+        # isql mencetak prompt CON> untuk setiap baris yang dibaca; ~200 KB skrip menghasilkan
+        # ~150 KB prompt, jauh di atas buffer pipe (64 KB di Linux, lebih kecil di Windows)
+        ids = ''.join(f"{row_id},\n" for row_id in range(1, 30001))
+        query = f"SELECT COUNT(*) AS TOTAL FROM FFBSCANNERDATA05 WHERE ID IN (\n{ids}0)"
+        connector = FirebirdConnector(self.db_path, isql_path=FAKE_ISQL, backend='isql')
+        expected = connector.execute_query("SELECT COUNT(*) AS TOTAL FROM FFBSCANNERDATA05")
+
+        results = []
+        worker = threading.Thread(target=lambda: results.append(connector.execute_query(query)), daemon=True)
+        worker.start()
+        worker.join(timeout=120)
+        self.assertFalse(worker.is_alive(), "isql macet: stdin dan stdout saling menunggu")
+        self.assertEqual(results[0][0]['rows'], expected[0]['rows'])
+
+    def test_snapshot_loads_skip_result_cache(self):
+        # Data bulanan sudah disimpan SnapshotCache; result_cache hanya untuk query kecil yang berulang
+        result_cache = QueryResultCache()
+        connector = FirebirdConnector(self.db_path, isql_path=FAKE_ISQL, backend='isql', result_cache=result_cache)
+        snapshot_cache = SnapshotCache(cache_dir=os.path.join(self.tmp_dir, 'snapshots'))
+        query = "SELECT a.ID, a.TRANSNO FROM FFBSCANNERDATA05 a WHERE a.TRANSDATE >= '2025-05-01'"
+
+        synced = snapshot_cache.sync(connector, 'FFBSCANNERDATA05', '2025-05-01', '2025-05-02', query)
+        fetched = snapshot_cache.fetch(connector, 'FFBSCANNERDATA05', '2025-05-01', '2025-05-02', query)
+
+        self.assertFalse(synced.empty)
+        self.assertEqual(len(fetched), len(synced))
+        self.assertEqual(result_cache.stats()['entries'], 0)
+        connector.execute_query(query)
+        self.assertEqual(result_cache.stats()['entries'], 1)
+
+
+class TestIsqlStub(unittest.TestCase):
+    """Connector terhadap isql tiruan yang tidak berperilaku seperti isql; cache probe di direktori sementara"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'PTRJ_STUB.FDB')
+        with open(self.db_path, 'wb') as f:
+            f.write(b'fdb')
+        patchers = [patch.object(IsqlProbe, 'cache_path', os.path.join(self.tmp_dir, 'isql_probe.json')),
+                    patch.dict(IsqlProbe._probes, clear=True)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _stub(self, body):
+        path = os.path.join(self.tmp_dir, 'isql_stub.py')
+        with open(path, 'w') as f:
+            # -z (versi) dijawab seperti isql 1.5 agar deteksi versi tidak ikut menunggu
+            f.write(f"#!{sys.executable}\nimport sys, time\n"
+                    f"if '-z' in sys.argv:\n    print('ISQL Version: LI-V1.5.6.5026 Firebird 1.5')\n    sys.exit(0)\n"
+                    f"{body}\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return path
+
+    def test_pipe_timeout(self):
+        connector = FirebirdConnector(self.db_path, isql_path=self._stub("time.sleep(60)"),
+                                      backend='isql', timeout=1)
+        started = time.monotonic()
+        with self.assertRaises(IsqlTimeoutError):
+            connector.execute_query("SELECT 1 FROM RDB$DATABASE")
+        # Variant lain tidak dicoba setelah timeout
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(IsqlProbe.for_path(connector.isql_path).variants, {})
+
+    def test_empty_output_not_recorded(self):
+        # Membaca stdin lalu keluar dengan kode 0 tanpa output: tidak ada variant yang terbukti
+        connector = FirebirdConnector(self.db_path, isql_path=self._stub("if '-i' not in sys.argv:\n    sys.stdin.read()"),
+                                      backend='isql')
+
+        self.assertFalse(connector.test_connection())
+        with self.assertRaises(Exception):
+            connector.execute_query("SELECT 1 FROM RDB$DATABASE")
+        self.assertEqual(IsqlProbe.for_path(connector.isql_path).variants, {})
+        # Juga tidak tersimpan di file probe
+        IsqlProbe._probes.clear()
+        self.assertEqual(IsqlProbe.for_path(connector.isql_path).variants, {})
+
+    def test_stdin_localhost_timeout(self):
+        connector = FirebirdConnector(self.db_path, isql_path=self._stub("time.sleep(60)"),
+                                      backend='isql', timeout=1)
+        with self.assertRaises(IsqlTimeoutError):
+            connector._execute_isql_stdin_localhost("SELECT 1 FROM RDB$DATABASE", trusted=False)
+
+
+if __name__ == '__main__':
+    unittest.main()